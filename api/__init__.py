@@ -8,20 +8,38 @@ from .routes import (
     history,
     generate_audio_with_data,
     generate_audio_with_custom_data,
+    stream_audio_with_data,
+    batch_audio_with_data,
+    get_render,
     popular,
+    compounds,
+    metrics,
 )
 from .validation import (
     validate_algorithm,
     validate_and_parse_parameters,
     validate_spectrum_text_range,
+    validate_normalization,
+    validate_batch_request,
+    validate_render_handle,
+    validate_compound_search,
 )
 
 __all__ = [
     "history",
     "generate_audio_with_data",
     "generate_audio_with_custom_data",
+    "stream_audio_with_data",
+    "batch_audio_with_data",
+    "get_render",
     "popular",
+    "compounds",
+    "metrics",
     "validate_algorithm",
     "validate_and_parse_parameters",
     "validate_spectrum_text_range",
+    "validate_normalization",
+    "validate_batch_request",
+    "validate_render_handle",
+    "validate_compound_search",
 ]
@@ -1,12 +1,25 @@
-from flask import request, send_from_directory
+import base64
+import itertools
+import json
+import math
+import mmap
+import uuid
+from urllib.parse import quote
+from flask import Response, request, send_from_directory, stream_with_context
 from audio import parse_spectrum_text
 from db import get_search_history, get_popular_compounds
 from .validation import (
     validate_algorithm,
     validate_and_parse_parameters,
     validate_spectrum_text_range,
+    validate_normalization,
+    validate_batch_request,
+    validate_render_handle,
+    validate_compound_search,
 )
 from services import AudioGenerationService, CompoundDataService, NotificationService
+from utils.metrics import metrics_response
+from utils.timing import timed
 
 
 audio_service = AudioGenerationService()
@@ -32,6 +45,224 @@ def popular():
         return {"error": str(e)}, 500
 
 
+def compounds():
+    try:
+        search = validate_compound_search(request.args)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    try:
+        result = compound_service.search_compounds(
+            search["prefix"], search["limit"], search["offset"]
+        )
+        return {**result, "limit": search["limit"], "offset": search["offset"]}, 200
+    except Exception as e:
+        return {"error": "Internal server error"}, 500
+
+
+def compound_not_found(compound_name, error_msg="No records found"):
+    """Body of a 404 for an unknown compound, with the most similar names to try"""
+    try:
+        matches = compound_service.suggest_compounds(compound_name)
+        suggestions = [name for name, _ in matches]
+    except Exception:
+        suggestions = []
+    return {"error": error_msg, "suggestions": suggestions}
+
+
+def metrics():
+    body, content_type = metrics_response()
+    return Response(body, content_type=content_type)
+
+
+AUDIO_RESPONSE_TYPES = [
+    "application/json",
+    "multipart/form-data",
+    "multipart/mixed",
+    "audio/wav",
+]
+
+
+def render_metadata(compound_name, accession, transformed_data, algorithm, params):
+    """
+    Everything about a render except the audio itself. The spectrum is encoded as
+    params["spectrum_format"] asks; for "binary" it only describes the packed layout
+    and the bytes themselves come from packed_spectrum.
+    """
+    with timed("spectrum_encoding"):
+        spectrum = transformed_data.encode(params["spectrum_format"])
+    return {
+        "compound": compound_name,
+        "accession": accession,
+        "spectrum": spectrum,
+        "algorithm": algorithm,
+        "parameters": audio_service.get_algorithm_parameters(algorithm, params),
+        "audio_settings": {
+            "duration": params["duration"],
+            "sample_rate": params["sample_rate"],
+        },
+    }
+
+
+def packed_spectrum(transformed_data, params):
+    """Packed spectrum columns when the binary spectrum format was asked for, else None"""
+    if params["spectrum_format"] != "binary":
+        return None
+    return transformed_data.to_bytes()
+
+
+def audio_response(metadata, wav_bytes, spectrum_bytes=None):
+    """
+    Render response in the format picked by the Accept header:
+    - application/json (default): metadata plus the WAV as audio_base64 (and packed
+      spectrum columns as spectrum.data, base64 too), streamed by json_audio_response
+    - multipart/form-data or multipart/mixed: a "metadata" JSON part and an "audio"
+      part holding the WAV bytes as-is (no base64: ~25% smaller, no encoding pass),
+      plus a "spectrum" part with the packed spectrum columns
+    - audio/wav: just the WAV, with compound and accession in X- headers (and, for
+      previews, the full render's URL in X-Full-Render)
+    """
+    mimetype = request.accept_mimetypes.best_match(
+        AUDIO_RESPONSE_TYPES, default="application/json"
+    )
+
+    wav_size = memoryview(wav_bytes).nbytes
+    if mimetype == "audio/wav":
+        return Response(
+            bytes_chunks(wav_bytes),
+            mimetype="audio/wav",
+            headers={
+                "Content-Length": str(wav_size),
+                "X-Compound": quote(metadata["compound"]),
+                "X-Accession": metadata["accession"],
+                **preview_headers(metadata),
+            },
+        )
+
+    if mimetype.startswith("multipart/"):
+        boundary = uuid.uuid4().hex
+        with timed("serialization"):
+            metadata_json = json.dumps(metadata)
+        metadata_part = (
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="metadata"\r\n'
+            "Content-Type: application/json\r\n\r\n"
+            f"{metadata_json}\r\n"
+        ).encode()
+        parts = [metadata_part]
+        if spectrum_bytes is not None:
+            parts.append(
+                (
+                    f"--{boundary}\r\n"
+                    'Content-Disposition: form-data; name="spectrum"; '
+                    'filename="spectrum.bin"\r\n'
+                    "Content-Type: application/octet-stream\r\n\r\n"
+                ).encode()
+            )
+            parts.append(spectrum_bytes)
+            parts.append(b"\r\n")
+        parts.append(
+            (
+                f"--{boundary}\r\n"
+                'Content-Disposition: form-data; name="audio"; filename="audio.wav"\r\n'
+                "Content-Type: audio/wav\r\n\r\n"
+            ).encode()
+        )
+        tail = f"\r\n--{boundary}--\r\n".encode()
+        content_length = sum(len(part) for part in parts) + wav_size + len(tail)
+
+        # The WAV is sent as its own body part, never copied into a joined buffer
+        return Response(
+            itertools.chain(parts, bytes_chunks(wav_bytes), [tail]),
+            mimetype=f"{mimetype}; boundary={boundary}",
+            headers={"Content-Length": str(content_length)},
+        )
+
+    if spectrum_bytes is not None:
+        metadata["spectrum"]["data"] = base64.b64encode(spectrum_bytes).decode()
+    return json_audio_response(metadata, wav_bytes)
+
+
+# WSGI servers only write bytes: a WAV held in a memoryview is copied to the socket in
+# chunks of this size rather than as one bytes object of the whole file
+BODY_CHUNK_BYTES = 2**18
+
+
+def bytes_chunks(data):
+    """Response body of any bytes-like object, as bytes chunks"""
+    if isinstance(data, bytes):
+        yield data
+        return
+    with memoryview(data) as view, view.cast("B") as octets:
+        for start in range(0, len(octets), BODY_CHUNK_BYTES):
+            yield octets[start : start + BODY_CHUNK_BYTES].tobytes()
+
+
+# Multiple of 3, so every chunk encodes to base64 without padding
+BASE64_CHUNK_BYTES = 3 * 2**16
+
+
+def json_audio_response(metadata, wav_bytes):
+    """
+    metadata plus audio_base64 as a JSON response, base64-encoded chunk by chunk while it
+    is sent: neither the full base64 string nor the full JSON document is ever built
+
+    Render cache hits are encoded again on every request (about 2 ms per MB of WAV).
+    Caching the base64 text instead would take a third more memory than the WAV itself
+    per entry, so fewer renders would fit in the cache; clients that want hits without
+    the encoding pass ask for multipart or audio/wav.
+    """
+    wav = memoryview(wav_bytes).cast("B")
+    with timed("serialization"):
+        head = json.dumps(metadata)[:-1].encode() + b', "audio_base64": "'
+    tail = b'"}'
+    content_length = len(head) + 4 * math.ceil(len(wav) / 3) + len(tail)
+
+    def body():
+        yield head
+        for start in range(0, len(wav), BASE64_CHUNK_BYTES):
+            with timed("base64"):
+                chunk = base64.b64encode(wav[start : start + BASE64_CHUNK_BYTES])
+            yield chunk
+        yield tail
+
+    return Response(
+        body(),
+        mimetype="application/json",
+        headers={"Content-Length": str(content_length)},
+    )
+
+
+def render_audio(spectrum, algorithm, params, accession=None):
+    """Full render, or a preview plus a background full render when params["preview"]"""
+    if params["preview"]:
+        return audio_service.generate_preview_from_spectrum(
+            spectrum, algorithm, params, accession=accession
+        )
+    return audio_service.generate_audio_from_spectrum(
+        spectrum, algorithm, params, accession=accession
+    )
+
+
+def preview_metadata(audio_result):
+    """Preview settings and where to fetch the full render (empty for full renders)"""
+    if "handle" not in audio_result:
+        return {}
+    return {
+        "preview": audio_result["preview_settings"],
+        "full_render": {
+            "handle": audio_result["handle"],
+            "url": f"/renders/{audio_result['handle']}",
+        },
+    }
+
+
+def preview_headers(metadata):
+    if "full_render" not in metadata:
+        return {}
+    return {"X-Full-Render": metadata["full_render"]["url"]}
+
+
 def generate_audio_with_data(algorithm):
     try:
         validate_algorithm(algorithm)
@@ -40,16 +271,85 @@ def generate_audio_with_data(algorithm):
 
     data = request.get_json()
 
+    try:
+        with timed("validation"):
+            params = validate_and_parse_parameters(data)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    try:
+        compound_data = compound_service.get_compound_spectrum(
+            params["compound"], fuzzy=params["fuzzy"]
+        )
+
+        audio_result = render_audio(
+            compound_data["spectrum"],
+            algorithm,
+            params,
+            accession=compound_data["accession"],
+        )
+
+        compound_service.log_compound_search(
+            compound_data["compound_name"], compound_data["accession"]
+        )
+
+        notification_service.notify_audio_generated(
+            compound_data["compound_name"],
+            compound_data["accession"],
+            algorithm,
+            params["duration"],
+            params["sample_rate"],
+        )
+
+        metadata = render_metadata(
+            compound_data["compound_name"],
+            compound_data["accession"],
+            audio_result["transformed_data"],
+            algorithm,
+            params,
+        )
+        metadata.update(preview_metadata(audio_result))
+        if "fuzzy_match" in compound_data:
+            metadata["fuzzy_match"] = compound_data["fuzzy_match"]
+
+        return audio_response(
+            metadata,
+            audio_result["wav_bytes"],
+            packed_spectrum(audio_result["transformed_data"], params),
+        )
+
+    except ValueError as e:
+        error_msg = str(e)
+        if "No records found" in error_msg:
+            return compound_not_found(params["compound"], error_msg), 404
+        else:
+            return {"error": error_msg}, 400
+    except Exception as e:
+        return {"error": "Internal server error"}, 500
+
+
+def stream_audio_with_data(algorithm):
+    try:
+        validate_algorithm(algorithm)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    data = request.get_json()
+
     try:
         params = validate_and_parse_parameters(data)
+        normalization = data.get("normalization", "exact")
+        validate_normalization(normalization)
     except ValueError as e:
         return {"error": str(e)}, 400
 
     try:
-        compound_data = compound_service.get_compound_spectrum(params["compound"])
+        compound_data = compound_service.get_compound_spectrum(
+            params["compound"], fuzzy=params["fuzzy"]
+        )
 
-        audio_result = audio_service.generate_audio_from_spectrum(
-            compound_data["spectrum"], algorithm, params
+        audio_stream = audio_service.stream_audio_from_spectrum(
+            compound_data["spectrum"], algorithm, params, normalization=normalization
         )
 
         compound_service.log_compound_search(
@@ -64,31 +364,147 @@ def generate_audio_with_data(algorithm):
             params["sample_rate"],
         )
 
-        response_data = {
-            "compound": compound_data["compound_name"],
-            "accession": compound_data["accession"],
-            "audio_base64": audio_result["audio_base64"],
-            "spectrum": audio_result["transformed_data"],
-            "algorithm": algorithm,
-            "parameters": audio_service.get_algorithm_parameters(algorithm, params),
-            "audio_settings": {
-                "duration": params["duration"],
-                "sample_rate": params["sample_rate"],
-            },
+        headers = {
+            "Content-Length": str(audio_stream["wav_size"]),
+            "X-Compound": quote(compound_data["compound_name"]),
+            "X-Accession": compound_data["accession"],
         }
-
-        return response_data, 200
+        if "fuzzy_match" in compound_data:
+            headers["X-Requested-Compound"] = quote(params["compound"])
+        return Response(
+            stream_with_context(audio_stream["wav_chunks"]),
+            mimetype="audio/wav",
+            headers=headers,
+        )
 
     except ValueError as e:
         error_msg = str(e)
         if "No records found" in error_msg:
-            return {"error": error_msg}, 404
+            return compound_not_found(params["compound"], error_msg), 404
         else:
             return {"error": error_msg}, 400
     except Exception as e:
         return {"error": "Internal server error"}, 500
 
 
+def batch_audio_with_data(algorithm):
+    try:
+        validate_algorithm(algorithm)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    data = request.get_json()
+
+    try:
+        items = validate_batch_request(data)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    try:
+        spectra = compound_service.get_compound_spectra(
+            [params["compound"] for params in items]
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except Exception as e:
+        return {"error": "Internal server error"}, 500
+
+    def result_lines():
+        jobs = []
+        job_indices = []
+        for index, params in enumerate(items):
+            compound_data = spectra[params["compound"]]
+            if compound_data is None and params["fuzzy"]:
+                compound_data = fuzzy_compound_data(params["compound"])
+                spectra[params["compound"]] = compound_data
+            if compound_data is None:
+                yield _ndjson_line(
+                    {
+                        "index": index,
+                        "compound": params["compound"],
+                        "status": 404,
+                        **compound_not_found(params["compound"]),
+                    }
+                )
+                continue
+            jobs.append(
+                (
+                    compound_data["spectrum"],
+                    algorithm,
+                    params,
+                    compound_data["accession"],
+                )
+            )
+            job_indices.append(index)
+
+        for job_index, audio_result, error in audio_service.generate_audio_batch(jobs):
+            index = job_indices[job_index]
+            params = items[index]
+            if error is not None:
+                status = 400 if isinstance(error, ValueError) else 500
+                message = str(error) if status == 400 else "Internal server error"
+                yield _ndjson_line(
+                    {
+                        "index": index,
+                        "compound": params["compound"],
+                        "status": status,
+                        "error": message,
+                    }
+                )
+                continue
+
+            compound_data = spectra[params["compound"]]
+            compound_service.log_compound_search(
+                compound_data["compound_name"], compound_data["accession"]
+            )
+            notification_service.notify_audio_generated(
+                compound_data["compound_name"],
+                compound_data["accession"],
+                algorithm,
+                params["duration"],
+                params["sample_rate"],
+            )
+
+            metadata = render_metadata(
+                compound_data["compound_name"],
+                compound_data["accession"],
+                audio_result["transformed_data"],
+                algorithm,
+                params,
+            )
+            if "fuzzy_match" in compound_data:
+                metadata["fuzzy_match"] = compound_data["fuzzy_match"]
+            spectrum_bytes = packed_spectrum(audio_result["transformed_data"], params)
+            if spectrum_bytes is not None:
+                metadata["spectrum"]["data"] = base64.b64encode(spectrum_bytes).decode()
+            yield _ndjson_line(
+                {
+                    "index": index,
+                    "status": 200,
+                    **metadata,
+                    "audio_base64": base64.b64encode(
+                        audio_result["wav_bytes"]
+                    ).decode(),
+                }
+            )
+
+    return Response(
+        stream_with_context(result_lines()), mimetype="application/x-ndjson"
+    )
+
+
+def _ndjson_line(payload):
+    return json.dumps(payload) + "\n"
+
+
+def fuzzy_compound_data(compound_name):
+    """Spectrum data of the name most similar to compound_name, or None"""
+    try:
+        return compound_service.get_compound_spectrum(compound_name, fuzzy=True)
+    except Exception:
+        return None
+
+
 def generate_audio_with_custom_data(algorithm):
     try:
         validate_algorithm(algorithm)
@@ -107,36 +523,64 @@ def generate_audio_with_custom_data(algorithm):
         return {"error": str(e)}, 400
 
     try:
-        params = validate_and_parse_parameters(data, require_compound=False)
+        with timed("validation"):
+            params = validate_and_parse_parameters(data, require_compound=False)
     except ValueError as e:
         return {"error": str(e)}, 400
 
     try:
-        spectrum = parse_spectrum_text(data["spectrum_text"])
+        with timed("parse"):
+            spectrum = parse_spectrum_text(data["spectrum_text"])
 
-        audio_result = audio_service.generate_audio_from_spectrum(
-            spectrum, algorithm, params
-        )
+        audio_result = render_audio(spectrum, algorithm, params)
 
         compound_name = "Custom Compound"
         accession = "CUSTOM-001"
 
-        response_data = {
-            "compound": compound_name,
-            "accession": accession,
-            "audio_base64": audio_result["audio_base64"],
-            "spectrum": audio_result["transformed_data"],
-            "algorithm": algorithm,
-            "parameters": audio_service.get_algorithm_parameters(algorithm, params),
-            "audio_settings": {
-                "duration": params["duration"],
-                "sample_rate": params["sample_rate"],
-            },
-        }
+        metadata = render_metadata(
+            compound_name,
+            accession,
+            audio_result["transformed_data"],
+            algorithm,
+            params,
+        )
+        metadata.update(preview_metadata(audio_result))
+
+        return audio_response(
+            metadata,
+            audio_result["wav_bytes"],
+            packed_spectrum(audio_result["transformed_data"], params),
+        )
+
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except Exception as e:
+        return {"error": "Internal server error"}, 500
 
-        return response_data, 200
 
+def get_render(handle):
+    try:
+        validate_render_handle(handle)
     except ValueError as e:
         return {"error": str(e)}, 400
+
+    try:
+        status, value = audio_service.get_full_render(handle)
     except Exception as e:
         return {"error": "Internal server error"}, 500
+
+    if status == "done":
+        response = Response(
+            bytes_chunks(value),
+            mimetype="audio/wav",
+            headers={"Content-Length": str(memoryview(value).nbytes)},
+        )
+        # A render store hit maps the file: unmap it once the body has been sent
+        if isinstance(value, mmap.mmap):
+            response.call_on_close(value.close)
+        return response
+    if status == "pending":
+        return {"status": "pending"}, 202, {"Retry-After": "1"}
+    if status == "failed":
+        return {"error": value}, 500
+    return {"error": "Render not found"}, 404
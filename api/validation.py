@@ -1,7 +1,25 @@
+from audio import (
+    FREQUENCY_ALGORITHMS,
+    PRECISIONS,
+    QUALITY_PRESETS,
+    SPECTRUM_FORMATS,
+    algorithm_parameter_defaults,
+)
+
+
+def _choices(values):
+    """'a' or 'b' / 'a', 'b', or 'c' for an error message"""
+    names = [f"'{value}'" for value in values]
+    if len(names) <= 2:
+        return " or ".join(names)
+    return f"{', '.join(names[:-1])}, or {names[-1]}"
+
+
 def validate_algorithm(algorithm):
-    if algorithm not in ["linear", "inverse", "modulo"]:
+    if algorithm not in FREQUENCY_ALGORITHMS:
         raise ValueError(
-            f"Unsupported algorithm: '{algorithm}'. Must be 'linear', 'inverse', or 'modulo'"
+            f"Unsupported algorithm: '{algorithm}'. "
+            f"Must be {_choices(FREQUENCY_ALGORITHMS)}"
         )
 
 
@@ -31,23 +49,15 @@ def validate_and_parse_parameters(data, require_compound=True):
     else:
         compound = data.get("compound", None)
 
-    try:
-        offset = float(data.get("offset", 300))
-    except (ValueError, TypeError):
-        raise ValueError("Invalid offset. Must be a float.")
-    validate_number_range(offset, "offset")
-
-    try:
-        scale = float(data.get("scale", 100000))
-    except (ValueError, TypeError):
-        raise ValueError("Invalid scale. Must be a float.")
-    validate_number_range(scale, "scale")
-
-    try:
-        shift = float(data.get("shift", 1))
-    except (ValueError, TypeError):
-        raise ValueError("Invalid shift. Must be a float.")
-    validate_number_range(shift, "shift")
+    # Parameters of every registered frequency algorithm
+    algorithm_parameters = {}
+    for name, default in algorithm_parameter_defaults().items():
+        try:
+            value = float(data.get(name, default))
+        except (ValueError, TypeError):
+            raise ValueError(f"Invalid {name}. Must be a float.")
+        validate_number_range(value, name)
+        algorithm_parameters[name] = value
 
     try:
         duration = float(data.get("duration", 5))
@@ -59,23 +69,32 @@ def validate_and_parse_parameters(data, require_compound=True):
     except (ValueError, TypeError):
         raise ValueError("Invalid sample_rate. Must be an integer.")
 
-    try:
-        factor = float(data.get("factor", 10))
-    except (ValueError, TypeError):
-        raise ValueError("Invalid factor. Must be a float.")
-    validate_number_range(factor, "factor")
-
-    try:
-        modulus = float(data.get("modulus", 500))
-    except (ValueError, TypeError):
-        raise ValueError("Invalid modulus. Must be a float.")
-    validate_number_range(modulus, "modulus")
-
-    try:
-        base = float(data.get("base", 100))
-    except (ValueError, TypeError):
-        raise ValueError("Invalid base. Must be a float.")
-    validate_number_range(base, "base")
+    precision = data.get("precision")
+    # Registry membership is a dict lookup: lists and objects must not reach it
+    if precision is not None and (
+        not isinstance(precision, str) or precision not in PRECISIONS
+    ):
+        raise ValueError(f"Invalid precision. Must be {_choices(PRECISIONS)}.")
+
+    quality = data.get("quality")
+    if quality is not None and (
+        not isinstance(quality, str) or quality not in QUALITY_PRESETS
+    ):
+        raise ValueError(f"Invalid quality. Must be {_choices(QUALITY_PRESETS)}.")
+
+    preview = data.get("preview", False)
+    if not isinstance(preview, bool):
+        raise ValueError("Invalid preview. Must be a boolean.")
+
+    fuzzy = data.get("fuzzy", False)
+    if not isinstance(fuzzy, bool):
+        raise ValueError("Invalid fuzzy. Must be a boolean.")
+
+    spectrum_format = data.get("spectrum_format", "columns")
+    if spectrum_format not in SPECTRUM_FORMATS:
+        raise ValueError(
+            "Invalid spectrum_format. Must be 'columns', 'rows', or 'binary'."
+        )
 
     if not (0.01 <= duration <= 30):
         raise ValueError("Duration must be between 0.01 and 30 seconds.")
@@ -84,14 +103,14 @@ def validate_and_parse_parameters(data, require_compound=True):
         raise ValueError("Sample rate must be between 3500 and 192000.")
 
     result = {
-        "offset": offset,
-        "scale": scale,
-        "shift": shift,
+        **algorithm_parameters,
         "duration": duration,
         "sample_rate": sample_rate,
-        "factor": factor,
-        "modulus": modulus,
-        "base": base,
+        "precision": precision,
+        "quality": quality,
+        "preview": preview,
+        "fuzzy": fuzzy,
+        "spectrum_format": spectrum_format,
     }
 
     if require_compound or compound is not None:
@@ -103,3 +122,95 @@ def validate_and_parse_parameters(data, require_compound=True):
 def validate_spectrum_text_range(text):
     if not (3 <= len(text) <= 100000):
         raise ValueError("Spectrum data must be between 3 and 100,000 characters.")
+
+
+def validate_normalization(normalization):
+    if normalization not in ["exact", "bound"]:
+        raise ValueError(
+            f"Unsupported normalization: '{normalization}'. Must be 'exact' or 'bound'"
+        )
+
+
+MAX_BATCH_ITEMS = 50
+
+
+def validate_batch_request(data):
+    """
+    Expand a batch request into the parameters of every item.
+
+    Items are every compound in "compounds" combined with every entry of
+    "parameter_sets"; top-level fields apply to all items and a parameter set
+    overrides them. Without "compounds", each parameter set names its own compound.
+    """
+    if not data:
+        raise ValueError("No JSON data provided")
+
+    compounds = data.get("compounds")
+    parameter_sets = data.get("parameter_sets")
+
+    if compounds is None and parameter_sets is None:
+        raise ValueError("No compounds or parameter_sets provided")
+    if compounds is not None and (
+        not isinstance(compounds, list)
+        or not compounds
+        or not all(isinstance(compound, str) for compound in compounds)
+    ):
+        raise ValueError("compounds must be a non-empty list of compound names.")
+    if parameter_sets is not None and (
+        not isinstance(parameter_sets, list)
+        or not parameter_sets
+        or not all(isinstance(parameter_set, dict) for parameter_set in parameter_sets)
+    ):
+        raise ValueError("parameter_sets must be a non-empty list of objects.")
+
+    compounds = compounds or [None]
+    parameter_sets = parameter_sets or [{}]
+    if len(compounds) * len(parameter_sets) > MAX_BATCH_ITEMS:
+        raise ValueError(f"Batch is too large. Maximum is {MAX_BATCH_ITEMS} items.")
+
+    shared = {
+        key: value
+        for key, value in data.items()
+        if key not in ["compounds", "parameter_sets"]
+    }
+    items = []
+    for compound in compounds:
+        for parameter_set in parameter_sets:
+            item = {**shared, **parameter_set}
+            if compound is not None:
+                item["compound"] = compound
+            if not isinstance(item.get("compound", ""), str):
+                raise ValueError(f"Item {len(items)}: Compound must be a string.")
+            try:
+                items.append(validate_and_parse_parameters(item))
+            except ValueError as e:
+                raise ValueError(f"Item {len(items)}: {e}")
+
+    return items
+
+
+MAX_COMPOUND_SEARCH_LIMIT = 100
+
+
+def validate_compound_search(args):
+    """prefix, limit and offset of a compound name search (query string args)"""
+    prefix = args.get("prefix", "")
+    if len(prefix) > 349:
+        raise ValueError("Prefix must be at most 349 characters.")
+
+    try:
+        limit = int(args.get("limit", 20))
+        offset = int(args.get("offset", 0))
+    except ValueError:
+        raise ValueError("Invalid limit or offset. Must be integers.")
+    if not (1 <= limit <= MAX_COMPOUND_SEARCH_LIMIT):
+        raise ValueError(f"Limit must be between 1 and {MAX_COMPOUND_SEARCH_LIMIT}.")
+    if offset < 0:
+        raise ValueError("Offset must not be negative.")
+
+    return {"prefix": prefix, "limit": limit, "offset": offset}
+
+
+def validate_render_handle(handle):
+    if len(handle) != 64 or any(c not in "0123456789abcdef" for c in handle):
+        raise ValueError("Invalid render handle")
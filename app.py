@@ -1,15 +1,24 @@
+import multiprocessing
 import os
 import time
 import psycopg2
 from flask import Flask, send_from_directory
 from flask_cors import CORS
-from db import init_pool
+from db import init_pool, warm_spectrum_cache
+from utils import init_request_metrics, init_request_timing, start_background_task
+from utils.metrics import clear_multiprocess_dir
 from api import (
     history,
     generate_audio_with_data,
     generate_audio_with_custom_data,
+    stream_audio_with_data,
+    batch_audio_with_data,
+    get_render,
     popular,
+    compounds,
+    metrics,
 )
+from api.routes import compound_service
 
 
 def wait_for_database():
@@ -28,13 +37,34 @@ def wait_for_database():
                 raise
 
 
-wait_for_database()
+def start_services():
+    wait_for_database()
+    # Every worker imports this module: without a peak store each one loads its own
+    # compound name and trigram indexes and fills its own spectrum cache; with one, both
+    # indexes are mapped from the store's files and there is nothing to warm up
+    start_background_task("compound_index", compound_service.prepare_name_index)
+    if compound_service.peak_store is None:
+        start_background_task("spectrum_cache_warmup", warm_spectrum_cache)
+
+
+if __name__ == "__main__":
+    # Started without gunicorn (whose on_starting does this), e.g. by the debug reloader on
+    # every code change: drop the metric files of the previous process
+    clear_multiprocess_dir()
+
+# Under python app.py, render pool processes (spawned, see audio/parallel.py) import this
+# file as their main module too: only the server process starts the services
+if multiprocessing.parent_process() is None:
+    start_services()
 
 app = Flask(__name__, static_folder="static", static_url_path="")
 
 if os.getenv("FLASK_ENV") == "development":
     CORS(app)
 
+init_request_timing(app)
+init_request_metrics(app)
+
 
 @app.route("/")
 def serve_index():
@@ -45,8 +75,9 @@ def serve_index():
 def serve_static_or_spa(path):
     if (
         path.startswith("api/")
-        or path in ["history", "popular"]
+        or path in ["history", "popular", "compounds", "metrics"]
         or path.startswith("massbank/")
+        or path.startswith("renders/")
     ):
         return app.send_static_file(path)
 
@@ -58,8 +89,13 @@ def serve_static_or_spa(path):
 
 app.route("/history", methods=["GET"])(history)
 app.route("/massbank/<algorithm>", methods=["POST"])(generate_audio_with_data)
+app.route("/massbank/<algorithm>/stream", methods=["POST"])(stream_audio_with_data)
+app.route("/massbank/<algorithm>/batch", methods=["POST"])(batch_audio_with_data)
+app.route("/renders/<handle>", methods=["GET"])(get_render)
 app.route("/custom/<algorithm>", methods=["POST"])(generate_audio_with_custom_data)
 app.route("/popular", methods=["GET"])(popular)
+app.route("/compounds", methods=["GET"])(compounds)
+app.route("/metrics", methods=["GET"])(metrics)
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -5,21 +5,61 @@ Creates the audio file, and keeps track of data transformations.
 """
 
 from .audio_generation import (
-    generate_sine_wave,
     generate_combined_wav_bytes_and_data,
-    parse_spectrum_text,
+    generate_wav_stream_and_data,
+    generate_transformed_data,
+    transform_spectrum,
+)
+from .spectrum_parsing import parse_spectrum_text, SPECTRUM_TEXT_LAYOUTS
+from .synthesis import (
+    generate_sine_wave,
+    SYNTHESIS_ENGINES,
+    DEFAULT_BLOCK_SIZE,
+    DEFAULT_CHUNK_SIZE,
+    PHASOR_ERROR_BOUND,
+    PRECISIONS,
+    measure_snr_db,
 )
+from .peak_planner import plan_peaks, QUALITY_PRESETS
+from .wav_encoding import encode_wav, wav_file_size, wav_header
+from .transformed_spectrum import TransformedSpectrum, SPECTRUM_FORMATS, BINARY_COLUMNS
 from .frequency_algorithms import (
     mz_to_frequency_linear,
     mz_to_frequency_inverse,
     mz_to_frequency_modulo,
+    FREQUENCY_ALGORITHMS,
+    algorithm_parameter_defaults,
+    get_frequency_algorithm,
+    register_algorithm,
 )
 
 __all__ = [
     "generate_sine_wave",
     "generate_combined_wav_bytes_and_data",
+    "generate_wav_stream_and_data",
+    "generate_transformed_data",
+    "transform_spectrum",
     "parse_spectrum_text",
+    "SPECTRUM_TEXT_LAYOUTS",
     "mz_to_frequency_linear",
     "mz_to_frequency_inverse",
     "mz_to_frequency_modulo",
+    "FREQUENCY_ALGORITHMS",
+    "algorithm_parameter_defaults",
+    "get_frequency_algorithm",
+    "register_algorithm",
+    "SYNTHESIS_ENGINES",
+    "DEFAULT_BLOCK_SIZE",
+    "DEFAULT_CHUNK_SIZE",
+    "PHASOR_ERROR_BOUND",
+    "PRECISIONS",
+    "measure_snr_db",
+    "plan_peaks",
+    "QUALITY_PRESETS",
+    "encode_wav",
+    "wav_file_size",
+    "wav_header",
+    "TransformedSpectrum",
+    "SPECTRUM_FORMATS",
+    "BINARY_COLUMNS",
 ]
@@ -1,7 +1,9 @@
 """
 Array Reuse Strategy:
-- time_array: Pre-allocated array of time points in seconds [0.0, 0.0000227, 0.0000454, ...]
+- time_array: Time points in seconds for one chunk of samples [0.0, 0.0000227, 0.0000454, ...]
 - wave_buffer: Pre-allocated array that gets overwritten for each peak [0, 15000, -8000, ...]
+- Peaks are rendered by a synthesis engine (see synthesis.py), chunk by chunk in time
+- With workers != 1 the chunks are spread over a process pool (see parallel.py)
 
 Audio Amplitude Scaling:
 - np.iinfo(np.int16).max = 32,767 (max positive value for 16-bit audio)
@@ -22,25 +24,90 @@ Key NumPy Functions:
 """
 
 import numpy as np
-from scipy.io.wavfile import write
-import io
-from .frequency_algorithms import (
-    mz_to_frequency_linear,
-    mz_to_frequency_inverse,
-    mz_to_frequency_modulo,
+from .frequency_algorithms import get_frequency_algorithm
+from .synthesis import (
+    DEFAULT_BLOCK_SIZE,
+    DEFAULT_CHUNK_SIZE,
+    create_oscillator_bank,
+    measure_peak_amplitude,
+    precision_dtype,
 )
-import re
+from .parallel import render_oscillator_bank_parallel
+from .peak_planner import plan_peaks
+from .transformed_spectrum import TransformedSpectrum
+from .wav_encoding import encode_wav, wav_header
+from utils.timing import timed
 
 
-def generate_sine_wave(freq, intensity, time_array, wave_buffer):
-    """Generate sine wave into provided buffer (reusable array)"""
-    amplitude = np.iinfo(np.int16).max * intensity
-    np.sin(2 * np.pi * freq * time_array, out=wave_buffer)
-    wave_buffer *= amplitude
-    return wave_buffer
+def transform_spectrum(
+    spectrum_data,
+    algorithm: str = "linear",
+    offset: float = 300,
+    scale: float = 100000,
+    shift: float = 1,
+    factor: float = 10,
+    modulus: float = 500,
+    base: float = 100,
+):
+    """
+    Map peaks to frequencies and normalized amplitudes.
 
+    Returns:
+        (transformed_data, frequencies, normalized_intensities), one entry per peak;
+        transformed_data is a TransformedSpectrum
+    """
+    mapping = get_frequency_algorithm(algorithm)
+    peaks = np.asarray(spectrum_data, dtype=np.float64).reshape(-1, 2)
+    if len(peaks) == 0:
+        raise ValueError("Spectrum has no peaks")
+    mz, intensities = peaks[:, 0], peaks[:, 1]
 
-def generate_combined_wav_bytes_and_data(
+    # Whole spectrum mapped in one vectorized call
+    frequencies = mapping.to_frequencies(
+        mz,
+        offset=offset,
+        scale=scale,
+        shift=shift,
+        factor=factor,
+        modulus=modulus,
+        base=base,
+    )
+
+    # Pre-normalize intensities to prevent huge numbers
+    max_intensity = intensities.max()
+    if not max_intensity > 0:
+        raise ValueError("Spectrum needs at least one positive intensity")
+    normalized_intensities = intensities / max_intensity
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amplitudes_db = np.where(
+            normalized_intensities > 0, 20 * np.log10(normalized_intensities), -np.inf
+        )
+
+    # Store transformation data with the normalized amplitude, one column per field
+    transformed_data = TransformedSpectrum(
+        mz=mz,
+        frequency=frequencies,
+        intensity=intensities,  # Keep original intensity
+        amplitude_linear=normalized_intensities,  # 0-1 range
+        amplitude_db=amplitudes_db,
+    )
+
+    return transformed_data, frequencies, normalized_intensities
+
+
+def _plan_render(spectrum_data, algorithm, sample_rate, duration, quality, **mapping):
+    """Transform the spectrum and pick the peaks to synthesize, flagging each peak"""
+    transformed_data, frequencies, normalized_intensities = transform_spectrum(
+        spectrum_data, algorithm=algorithm, **mapping
+    )
+    rendered_frequencies, rendered_intensities, rendered = plan_peaks(
+        frequencies, normalized_intensities, sample_rate, duration, quality=quality
+    )
+    transformed_data.rendered = rendered
+    return transformed_data, rendered_frequencies, rendered_intensities
+
+
+def generate_transformed_data(
     spectrum_data,
     offset: float = 300,
     scale: float = 100000,
@@ -51,87 +118,173 @@ def generate_combined_wav_bytes_and_data(
     factor: float = 10,
     modulus: float = 500,
     base: float = 100,
+    quality: str = "exact",
 ):
-    # Time array: represents sample points from 0 to duration
-    time_array = np.linspace(0, duration, int(sample_rate * duration), False)
+    """transformed_data exactly as a render would report it, without synthesizing audio"""
+    transformed_data, _, _ = _plan_render(
+        spectrum_data,
+        algorithm,
+        sample_rate,
+        duration,
+        quality,
+        offset=offset,
+        scale=scale,
+        shift=shift,
+        factor=factor,
+        modulus=modulus,
+        base=base,
+    )
+    return transformed_data
 
-    # Final output: will contain the sum of all sine waves
-    combined_wave = np.zeros_like(time_array)
 
-    # Reusable buffer that gets overwritten for each peak
-    sine_wave_buffer = np.zeros_like(time_array)
+def _sample_grid(duration, sample_rate):
+    """Number of sample points from 0 to duration, and the spacing between them"""
+    num_samples = int(sample_rate * duration)
+    time_step = duration / num_samples if num_samples else 0.0
+    return num_samples, time_step
 
-    transformed_data = []
 
-    # Pre-normalize intensities to prevent huge numbers
-    max_intensity = max(intensity for mz, intensity in spectrum_data)
-
-    for mz, intensity in spectrum_data:
-        if algorithm == "linear":
-            freq = mz_to_frequency_linear(mz, offset=offset)
-        elif algorithm == "inverse":
-            freq = mz_to_frequency_inverse(mz, scale=scale, shift=shift)
-        elif algorithm == "modulo":
-            freq = mz_to_frequency_modulo(mz, factor=factor, modulus=modulus, base=base)
-        else:
-            raise ValueError(f"Unknown algorithm: {algorithm}")
-
-        # Normalize intensity to 0-1 range BEFORE generating sine wave
-        normalized_intensity = intensity / max_intensity
-
-        # Store transformation data with the normalized amplitude
-        transformed_data.append(
-            {
-                "mz": mz,
-                "frequency": freq,
-                "intensity": intensity,  # Keep original intensity
-                "amplitude_linear": normalized_intensity,  # 0-1 range
-                "amplitude_db": (
-                    20 * np.log10(normalized_intensity)
-                    if normalized_intensity > 0
-                    else -np.inf
-                ),
-            }
-        )
+def generate_combined_wav_bytes_and_data(
+    spectrum_data,
+    offset: float = 300,
+    scale: float = 100000,
+    shift: float = 1,
+    duration: float = 5,
+    sample_rate: int = 44100,
+    algorithm: str = "linear",
+    factor: float = 10,
+    modulus: float = 500,
+    base: float = 100,
+    engine: str = "blocked",
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    precision: str = "float64",
+    quality: str = "exact",
+    workers: int = 1,
+    partition_size: int = None,
+):
+    """
+    workers: processes rendering the time range in parallel (1 = serial in this process,
+        0 = one per CPU); small renders always stay serial. Output does not depend on it.
+    partition_size: samples per parallel task, defaults to an even split across workers
+    """
+    num_samples, time_step = _sample_grid(duration, sample_rate)
 
-        if freq <= 0:
-            continue
+    with timed("transform"):
+        transformed_data, rendered_frequencies, rendered_intensities = _plan_render(
+            spectrum_data,
+            algorithm,
+            sample_rate,
+            duration,
+            quality,
+            offset=offset,
+            scale=scale,
+            shift=shift,
+            factor=factor,
+            modulus=modulus,
+            base=base,
+        )
 
-        # Generate sine wave using pre-allocated arrays
-        sine_wave = generate_sine_wave(
-            freq, normalized_intensity, time_array, sine_wave_buffer
+    # Final output: the sum of all sine waves, rendered by the selected engine
+    with timed("synthesis"):
+        combined_wave = render_oscillator_bank_parallel(
+            engine,
+            rendered_frequencies,
+            rendered_intensities,
+            time_step,
+            num_samples,
+            workers=workers,
+            chunk_size=chunk_size,
+            partition_size=partition_size,
+            block_size=block_size,
+            dtype=precision_dtype(precision),
         )
 
-        combined_wave += sine_wave
+    # Final normalization and int16 conversion, in place into the WAV file itself
+    with timed("wav_encoding"):
+        wav_buffer = encode_wav(combined_wave, sample_rate)
 
-    # Final normalization
-    if np.max(np.abs(combined_wave)) > 0:
-        combined_wave = combined_wave / np.max(np.abs(combined_wave))
-    combined_wave = np.int16(combined_wave * np.iinfo(np.int16).max)
+    return wav_buffer, transformed_data
 
-    wav_buffer = io.BytesIO()
-    write(wav_buffer, sample_rate, combined_wave)
-    wav_buffer.seek(0)
 
-    return wav_buffer, transformed_data
+def generate_wav_stream_and_data(
+    spectrum_data,
+    offset: float = 300,
+    scale: float = 100000,
+    shift: float = 1,
+    duration: float = 5,
+    sample_rate: int = 44100,
+    algorithm: str = "linear",
+    factor: float = 10,
+    modulus: float = 500,
+    base: float = 100,
+    engine: str = "blocked",
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    precision: str = "float64",
+    quality: str = "exact",
+    normalization: str = "exact",
+):
+    """
+    Same WAV as generate_combined_wav_bytes_and_data, produced chunk_size samples at a time.
+
+    normalization:
+        'exact': a first pass over the chunks finds the true peak (output is identical
+            to the in-memory path, at twice the synthesis cost)
+        'bound': scale by the sum of amplitudes, the largest the peak could ever be
+            (single pass and never clips, but usually quieter)
+
+    Returns:
+        (wav_chunks, transformed_data) where wav_chunks is a generator of bytes: the
+        header first, then the PCM samples of each chunk
+    """
+    num_samples, time_step = _sample_grid(duration, sample_rate)
 
+    transformed_data, rendered_frequencies, rendered_intensities = _plan_render(
+        spectrum_data,
+        algorithm,
+        sample_rate,
+        duration,
+        quality,
+        offset=offset,
+        scale=scale,
+        shift=shift,
+        factor=factor,
+        modulus=modulus,
+        base=base,
+    )
+
+    bank = create_oscillator_bank(
+        engine,
+        rendered_frequencies,
+        rendered_intensities,
+        time_step,
+        block_size=block_size,
+        num_samples=num_samples,
+        dtype=precision_dtype(precision),
+    )
+
+    if normalization == "exact":
+        peak = measure_peak_amplitude(bank, num_samples, chunk_size=chunk_size)
+    elif normalization == "bound":
+        peak = np.iinfo(np.int16).max * np.sum(np.abs(rendered_intensities))
+    else:
+        raise ValueError(
+            f"Unknown normalization: '{normalization}'. Must be 'exact' or 'bound'"
+        )
 
-def parse_spectrum_text(text_input):
-    try:
-        values = re.split(r"\s+", text_input.strip())
-        float_values = [float(x) for x in values if x]
+    def wav_chunks():
+        yield wav_header(num_samples, sample_rate)
 
-        if len(float_values) % 2 != 0:
-            raise ValueError(
-                "Spectrum data must have an even number of values (pairs of mz/intensity)"
-            )
+        chunk_wave = np.empty(min(chunk_size, num_samples), dtype=bank.dtype)
+        for start in range(0, num_samples, chunk_size):
+            wave = chunk_wave[: min(chunk_size, num_samples - start)]
+            wave.fill(0)
+            bank.render_into(wave, start)
 
-        spectrum_data = []
-        for i in range(0, len(float_values), 2):
-            mz = float_values[i]
-            intensity = float_values[i + 1]
-            spectrum_data.append((mz, intensity))
+            # Same normalization as the in-memory path, one chunk at a time
+            if peak > 0:
+                wave = wave / peak
+            yield np.int16(wave * np.iinfo(np.int16).max).astype("<i2").tobytes()
 
-        return spectrum_data
-    except (ValueError, IndexError) as e:
-        raise ValueError(f"Invalid spectrum data format: {e}")
+    return wav_chunks(), transformed_data
@@ -1,11 +1,85 @@
+"""
+Frequency Algorithms (m/z -> Hz):
+- Every mapping is plain arithmetic, so the same function maps one m/z value or a whole NumPy
+  array of them in a single vectorized call
+- FREQUENCY_ALGORITHMS is the registry: each entry declares its parameters (name -> default)
+  and its implementation; validation, parameter reporting and synthesis all look algorithms
+  up there, so adding a mapping is one registered function
+"""
+
+import numpy as np
+
+
+class FrequencyAlgorithm:
+    """A named m/z -> Hz mapping and the parameters it takes (name -> default)"""
+
+    def __init__(self, name, parameters, mapping):
+        self.name = name
+        self.parameters = parameters
+        self.mapping = mapping
+
+    def to_frequencies(self, mz, **parameters):
+        """
+        Map an array of m/z values to frequencies (Hz) in one call.
+        Parameters this algorithm does not take are ignored; missing ones use defaults.
+
+        Raises:
+            ValueError: if any frequency is not finite (e.g. a zero modulus or mz = -shift)
+        """
+        values = {
+            name: parameters.get(name, default)
+            for name, default in self.parameters.items()
+        }
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            frequencies = self.mapping(np.asarray(mz, dtype=np.float64), **values)
+
+        if not np.all(np.isfinite(frequencies)):
+            raise ValueError(
+                f"The {self.name} algorithm produced non-finite frequencies with "
+                + ", ".join(f"{name}={value}" for name, value in values.items())
+            )
+        return frequencies
+
+
+FREQUENCY_ALGORITHMS = {}
+
+
+def register_algorithm(name, **parameters):
+    """Decorator adding a vectorized mapping to FREQUENCY_ALGORITHMS"""
+
+    def register(mapping):
+        FREQUENCY_ALGORITHMS[name] = FrequencyAlgorithm(name, parameters, mapping)
+        return mapping
+
+    return register
+
+
+def get_frequency_algorithm(name):
+    try:
+        return FREQUENCY_ALGORITHMS[name]
+    except KeyError:
+        raise ValueError(f"Unknown algorithm: {name}")
+
+
+def algorithm_parameter_defaults():
+    """Every registered parameter and its default, in registration order"""
+    defaults = {}
+    for algorithm in FREQUENCY_ALGORITHMS.values():
+        defaults.update(algorithm.parameters)
+    return defaults
+
+
+@register_algorithm("linear", offset=300)
 def mz_to_frequency_linear(mz, offset: float = 300):
     return mz + offset
 
 
+@register_algorithm("inverse", scale=100000, shift=1)
 def mz_to_frequency_inverse(mz, scale: float = 100000, shift: float = 1):
     return scale / (mz + shift)
 
 
+@register_algorithm("modulo", factor=10, modulus=500, base=100)
 def mz_to_frequency_modulo(
     mz, factor: float = 10, modulus: float = 500, base: float = 100
 ):
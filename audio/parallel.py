@@ -0,0 +1,210 @@
+"""
+Parallel Rendering (time-partitioned):
+- Every sample of the summed partials is independent of every other one, so the sample range
+  is split into contiguous partitions and each partition is rendered by a separate process
+- Workers write straight into one shared_memory output array; only the peak list travels to
+  them and nothing but a completion flag travels back
+- Partitions start on chunk_size boundaries and each worker renders chunk_size samples at a
+  time, so every render_into call sees exactly the ranges the serial path would: the output is
+  bit-for-bit identical to render_oscillator_bank for every engine
+- The caller normalizes and converts to int16 once, after all partitions are done
+
+Serial Fallback:
+- One worker, fewer than PARALLEL_MIN_WORK peak-samples (spawning work costs more than it
+  saves), a single partition, or the "ifft" engine (its single FFT is already computed when
+  the bank is built, so there is nothing left to split)
+
+Process Pool:
+- One pool per worker count, created on first use and reused for the life of the process
+- "spawn" start method: forking a threaded gunicorn/Flask worker is not safe. Spawned
+  processes import the parent's main module, so under `python app.py` app.py must not start
+  its services when imported by one (it checks multiprocessing.parent_process())
+- A pool whose process died (killed, out of memory) is broken for good: it is dropped and the
+  render retried once on a new pool, then rendered serially
+"""
+
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .synthesis import (
+    DEFAULT_CHUNK_SIZE,
+    create_oscillator_bank,
+    render_oscillator_bank,
+    select_engine,
+)
+
+PARALLEL_MIN_WORK = 2**25
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def resolve_workers(workers):
+    """Worker count for a setting: 0 means one per CPU"""
+    if workers < 0:
+        raise ValueError("workers must be 0 (one per CPU) or a positive number")
+    return workers or os.cpu_count() or 1
+
+
+def get_process_pool(workers):
+    """Shared process pool with the given number of workers"""
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            _pools[workers] = pool
+        return pool
+
+
+def discard_process_pool(workers, pool):
+    """Forget a broken pool, so the next get_process_pool(workers) starts a new one"""
+    with _pools_lock:
+        if _pools.get(workers) is pool:
+            del _pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def partition_samples(num_samples, workers, chunk_size, partition_size=None):
+    """[start, stop) ranges covering num_samples, each starting on a chunk_size boundary"""
+    if partition_size is None:
+        partition_size = math.ceil(num_samples / workers) if num_samples else 1
+    partition_size = max(chunk_size, math.ceil(partition_size / chunk_size) * chunk_size)
+    return [
+        (start, min(start + partition_size, num_samples))
+        for start in range(0, num_samples, partition_size)
+    ]
+
+
+def render_oscillator_bank_parallel(
+    engine,
+    frequencies,
+    intensities,
+    time_step,
+    num_samples,
+    workers=0,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    partition_size=None,
+    **options,
+):
+    """
+    Render the full waveform of an engine's bank across a process pool.
+
+    Args:
+        engine: Synthesis engine name ('auto' picks one by size)
+        frequencies: Rendered peak frequencies (Hz)
+        intensities: Rendered peak intensities (0-1)
+        time_step: Seconds between samples
+        num_samples: Length of the waveform
+        workers: Process count, 0 for one per CPU
+        chunk_size: Samples per render_into call inside a worker
+        partition_size: Samples per task, defaults to an even split across workers
+        **options: Engine options (block_size, dtype, ...), as for create_oscillator_bank
+
+    Returns:
+        The float waveform, identical to render_oscillator_bank's
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    workers = resolve_workers(workers)
+    if engine == "auto":
+        engine = select_engine(len(frequencies), num_samples)
+    options["num_samples"] = num_samples
+
+    partitions = partition_samples(num_samples, workers, chunk_size, partition_size)
+    if (
+        workers == 1
+        or len(partitions) < 2
+        or engine == "ifft"
+        or len(frequencies) * num_samples < PARALLEL_MIN_WORK
+    ):
+        bank = create_oscillator_bank(
+            engine, frequencies, intensities, time_step, **options
+        )
+        return render_oscillator_bank(bank, num_samples, chunk_size=chunk_size)
+
+    dtype = np.dtype(options.get("dtype", np.float64))
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    intensities = np.asarray(intensities, dtype=np.float64)
+
+    shared = shared_memory.SharedMemory(create=True, size=num_samples * dtype.itemsize)
+    try:
+        combined_wave = None
+        for _ in range(2):
+            pool = get_process_pool(workers)
+            try:
+                futures = [
+                    pool.submit(
+                        _render_partition,
+                        shared.name,
+                        dtype.str,
+                        num_samples,
+                        start,
+                        stop,
+                        chunk_size,
+                        engine,
+                        frequencies,
+                        intensities,
+                        time_step,
+                        options,
+                    )
+                    for start, stop in partitions
+                ]
+                for future in futures:
+                    future.result()
+            except BrokenProcessPool:
+                discard_process_pool(workers, pool)
+                # Partitions add into the output: a retry starts from zeros again
+                np.ndarray(num_samples, dtype=dtype, buffer=shared.buf).fill(0)
+                continue
+            combined_wave = np.ndarray(
+                num_samples, dtype=dtype, buffer=shared.buf
+            ).copy()
+            break
+    finally:
+        shared.close()
+        shared.unlink()
+
+    if combined_wave is None:
+        bank = create_oscillator_bank(
+            engine, frequencies, intensities, time_step, **options
+        )
+        return render_oscillator_bank(bank, num_samples, chunk_size=chunk_size)
+    return combined_wave
+
+
+def _render_partition(
+    shared_name,
+    dtype,
+    num_samples,
+    start,
+    stop,
+    chunk_size,
+    engine,
+    frequencies,
+    intensities,
+    time_step,
+    options,
+):
+    """Worker task: render samples [start, stop) into the shared output array"""
+    bank = create_oscillator_bank(engine, frequencies, intensities, time_step, **options)
+    shared = shared_memory.SharedMemory(name=shared_name)
+    try:
+        combined_wave = np.ndarray(num_samples, dtype=dtype, buffer=shared.buf)
+        # Fresh shared memory is zero-filled, so render_into can add straight into it
+        for chunk_start in range(start, stop, chunk_size):
+            bank.render_into(
+                combined_wave[chunk_start : min(chunk_start + chunk_size, stop)],
+                chunk_start,
+            )
+        del combined_wave
+    finally:
+        shared.close()
@@ -0,0 +1,115 @@
+"""
+Peak Planning (runs after the m/z -> Hz mapping, before any samples are rendered):
+- Inaudible: after normalization a peak of relative amplitude a lands at roughly
+  20*log10(a) dBFS, and int16 cannot represent anything much below -90 dBFS (1 LSB = -90.3 dB),
+  so peaks under floor_db never change the output
+- Aliased: frequencies at or above sample_rate / 2 cannot be represented; they only fold back
+  as alias tones that are not part of the spectrum's mapping
+- Near-duplicate: two partials closer than 1 / duration Hz cannot be told apart within the
+  clip (they never complete a full beat), so they are merged into one partial at their
+  amplitude-weighted mean frequency with the summed amplitude
+
+Quality Presets (QUALITY_PRESETS):
+- "exact": no planning, every peak with freq > 0 is rendered exactly as before
+- "high": drop peaks below -96 dB and aliased peaks, merge within 1/4 of the resolution
+- "balanced": -90 dB floor, drop aliased peaks, merge within the resolution
+- "draft": -60 dB floor, drop aliased peaks, merge within 4x the resolution
+
+Every original peak is still reported in transformed_data; "rendered" says whether it was
+synthesized (on its own or merged into a neighbour).
+"""
+
+import numpy as np
+
+QUALITY_PRESETS = {
+    "exact": None,
+    "high": {"floor_db": -96, "drop_aliased": True, "merge_resolution": 0.25},
+    "balanced": {"floor_db": -90, "drop_aliased": True, "merge_resolution": 1.0},
+    "draft": {"floor_db": -60, "drop_aliased": True, "merge_resolution": 4.0},
+}
+
+
+def plan_peaks(frequencies, intensities, sample_rate, duration, quality="exact"):
+    """
+    Choose which peaks to synthesize under a quality budget.
+
+    Args:
+        frequencies: Frequency (Hz) of every peak
+        intensities: Normalized intensity (0-1) of every peak
+        sample_rate: Output sample rate in Hz
+        duration: Output duration in seconds
+        quality: Name of a QUALITY_PRESETS entry
+
+    Returns:
+        (rendered_frequencies, rendered_intensities, rendered) where rendered is a
+        boolean mask over the original peaks
+    """
+    if quality not in QUALITY_PRESETS:
+        raise ValueError(
+            f"Unknown quality: '{quality}'. Must be one of: {', '.join(QUALITY_PRESETS)}"
+        )
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    intensities = np.asarray(intensities, dtype=np.float64)
+
+    # Same rule as before planning existed: only non-positive frequencies are skipped
+    rendered = ~(frequencies <= 0)
+
+    budget = QUALITY_PRESETS[quality]
+    if budget is None:
+        return frequencies[rendered], intensities[rendered], rendered
+
+    rendered &= np.isfinite(frequencies)
+    rendered &= np.abs(intensities) >= 10 ** (budget["floor_db"] / 20)
+    if budget["drop_aliased"]:
+        rendered &= frequencies < sample_rate / 2
+
+    rendered_frequencies, rendered_intensities = merge_close_peaks(
+        frequencies[rendered],
+        intensities[rendered],
+        budget["merge_resolution"] / duration,
+    )
+    return rendered_frequencies, rendered_intensities, rendered
+
+
+def merge_close_peaks(frequencies, intensities, resolution):
+    """
+    Merge partials whose frequencies lie within resolution Hz of their group's lowest one.
+
+    Returns:
+        (frequencies, intensities) sorted by frequency, one entry per group
+    """
+    if len(frequencies) == 0 or resolution <= 0:
+        return frequencies, intensities
+
+    order = np.argsort(frequencies, kind="stable")
+    frequencies = frequencies[order]
+    intensities = intensities[order]
+
+    # Greedy grouping: a new group starts once a peak is a full resolution above the group start
+    group_ids = np.empty(len(frequencies), dtype=np.int64)
+    group_start = frequencies[0]
+    group = 0
+    for i, freq in enumerate(frequencies.tolist()):
+        if freq - group_start >= resolution:
+            group += 1
+            group_start = freq
+        group_ids[i] = group
+
+    num_groups = group + 1
+    if num_groups == len(frequencies):
+        return frequencies, intensities
+
+    merged_intensities = np.bincount(group_ids, weights=intensities, minlength=num_groups)
+    weights = np.abs(intensities)
+    weight_sums = np.bincount(group_ids, weights=weights, minlength=num_groups)
+    weighted_frequencies = np.bincount(
+        group_ids, weights=weights * frequencies, minlength=num_groups
+    )
+    first_frequencies = frequencies[np.searchsorted(group_ids, np.arange(num_groups))]
+    merged_frequencies = np.divide(
+        weighted_frequencies,
+        weight_sums,
+        out=first_frequencies.copy(),
+        where=weight_sums > 0,
+    )
+    return merged_frequencies, merged_intensities
@@ -0,0 +1,191 @@
+"""
+Spectrum Text Parsing (spectrum_text -> (n, 2) float64 array of m/z, intensity):
+- Tokens are found with str.split or one compiled regex and the list of strings is converted
+  to float64 by one np.array call, so no Python float or tuple is created per peak
+- The error path is the only one that walks tokens in Python: it finds the first token that is
+  not a number and reports where it is (token number, line, column)
+
+Accepted Layouts (SPECTRUM_TEXT_LAYOUTS, detected from the text):
+- "massbank": a MassBank record; peaks are the indented lines after "PK$PEAK:" up to "//"
+  (m/z, intensity, relative intensity: the relative intensity is ignored)
+- "mgf": one BEGIN IONS ... END IONS block; KEY=VALUE header lines are skipped, each peak
+  line is an m/z and an intensity
+- "csv": one m/z and intensity per line, separated by a comma or semicolon (and optional
+  whitespace); a leading header line such as "mz,intensity" is skipped
+- "pairs": whitespace-separated m/z intensity values, pairs may span lines (the original
+  format)
+
+Only the MassBank relative intensity column is dropped: any other line with more than two
+values is rejected with its line number rather than guessing which values are the peak.
+"""
+
+import re
+
+import numpy as np
+
+SPECTRUM_TEXT_LAYOUTS = ["massbank", "mgf", "csv", "pairs"]
+
+_MASSBANK_PEAKS = re.compile(r"^PK\$PEAK:[^\n]*(?:\n|$)", re.MULTILINE)
+# Peak lines are indented; any unindented line (usually "//") ends the block
+_MASSBANK_END = re.compile(r"^(?://|\S)", re.MULTILINE)
+_MGF_BEGIN = re.compile(
+    r"^[ \t]*BEGIN IONS[ \t]*\r?(?:\n|$)", re.MULTILINE | re.IGNORECASE
+)
+_MGF_END = re.compile(r"^[ \t]*END IONS", re.MULTILINE | re.IGNORECASE)
+_MGF_HEADER = re.compile(r"[ \t]*(?:[^\n=]*=[^\n]*)?\r?\n")
+# m/z and intensity of a peak line; whitespace, "," or ";" between them
+_PEAK_LINE = re.compile(
+    r"^[ \t]*([^\s,;]+)[ \t]*(?:[,;]|[ \t])[ \t]*([^\s,;]+)[ \t\r]*$", re.MULTILINE
+)
+# MassBank peak lines may add a relative intensity column
+_MASSBANK_PEAK_LINE = re.compile(
+    r"^[ \t]*([^\s,;]+)[ \t]+([^\s,;]+)(?:[ \t]+[^\s,;]+)?[ \t\r]*$", re.MULTILINE
+)
+_SEPARATORS_TO_SPACES = str.maketrans(",;\r", "   ")
+_NON_BLANK_LINE = re.compile(r"^[ \t\r]*\S", re.MULTILINE)
+_TOKEN = re.compile(r"\S+")
+
+
+def parse_spectrum_text(text_input):
+    """
+    Parse a pasted peak list into a contiguous (n, 2) float64 array of (m/z, intensity).
+
+    Raises:
+        ValueError: "Invalid spectrum data format: ..." naming the offending token or line
+    """
+    layout, start, end = detect_spectrum_layout(text_input)
+    try:
+        if layout == "pairs":
+            return _parse_pairs(text_input)
+        if layout == "massbank":
+            return _parse_peak_lines(text_input, start, end, _MASSBANK_PEAK_LINE, 3)
+        return _parse_peak_lines(text_input, start, end, _PEAK_LINE, 2)
+    except ValueError as e:
+        raise ValueError(f"Invalid spectrum data format: {e}")
+
+
+def detect_spectrum_layout(text):
+    """(layout, start, end): the layout of text and the span holding its peak lines"""
+    # Plain substring checks first: a multiline regex search of 100,000 characters costs
+    # more than parsing them
+    peaks = "PK$PEAK:" in text and _MASSBANK_PEAKS.search(text)
+    if peaks:
+        end = _MASSBANK_END.search(text, peaks.end())
+        return "massbank", peaks.end(), end.start() if end else len(text)
+
+    begin = ("IONS" in text or "ions" in text) and _MGF_BEGIN.search(text)
+    if begin:
+        start = begin.end()
+        # KEY=VALUE headers (and blank lines) come before the peaks
+        header = _MGF_HEADER.match(text, start)
+        while header and header.end() > start:
+            start = header.end()
+            header = _MGF_HEADER.match(text, start)
+        end = _MGF_END.search(text, start)
+        if _MGF_BEGIN.search(text, end.end() if end else start):
+            raise ValueError(
+                "Invalid spectrum data format: MGF text holds more than one spectrum"
+            )
+        return "mgf", start, end.start() if end else len(text)
+
+    if "," in text or ";" in text:
+        start = 0
+        first_line = _PEAK_LINE.search(text)
+        if first_line and not _is_number(first_line.group(1)):
+            start = first_line.end()  # header row
+        return "csv", start, len(text)
+
+    return "pairs", 0, len(text)
+
+
+def _parse_pairs(text):
+    tokens = text.split()
+    if len(tokens) % 2 != 0:
+        raise ValueError(
+            "Spectrum data must have an even number of values (pairs of mz/intensity)"
+        )
+    try:
+        return np.array(tokens, dtype=np.float64).reshape(-1, 2)
+    except ValueError:
+        pass
+
+    # Slow path, errors only: find the first token that is not a number
+    for number, token in enumerate(_TOKEN.finditer(text), start=1):
+        if not _is_number(token.group()):
+            _raise_not_a_number(text, token.group(), token.start(), f"token {number}")
+    raise ValueError("Spectrum data contains values that are not numbers")
+
+
+def _parse_peak_lines(text, start, end, peak_line, max_columns):
+    """
+    Peaks of the lines text[start:end], each matching peak_line: an m/z, an intensity
+    and up to max_columns - 2 ignored values
+    """
+    # Fast path: a table with the same number of numeric columns on every line
+    lines = text[start:end].translate(_SEPARATORS_TO_SPACES).split("\n")
+    rows = [line for line in lines if not line.isspace() and line]
+    if rows:
+        columns = len(rows[0].split())
+        tokens = " ".join(rows).split()
+        if 2 <= columns <= max_columns and len(tokens) == columns * len(rows):
+            try:
+                values = np.array(tokens, dtype=np.float64)
+                return np.ascontiguousarray(values.reshape(-1, columns)[:, :2])
+            except ValueError:
+                pass
+
+    # General path: one regex match per line; report the first line that does not match
+    fields = peak_line.findall(text, start, end)
+    if len(fields) != len(rows):
+        for line in _NON_BLANK_LINE.finditer(text, start, end):
+            if not peak_line.match(text, line.start(), end):
+                line_number, _ = _line_and_column(text, line.start())
+                line_end = text.find("\n", line.start(), end)
+                values = text[line.start() : end if line_end < 0 else line_end]
+                values = len(values.translate(_SEPARATORS_TO_SPACES).split())
+                if values > max_columns:
+                    raise ValueError(
+                        f"line {line_number} has {values} values, "
+                        "expected an m/z and an intensity value"
+                    )
+                raise ValueError(
+                    f"line {line_number} needs an m/z and an intensity value"
+                )
+        raise ValueError("Spectrum data has lines without an m/z and an intensity")
+    if not fields:
+        return np.empty((0, 2), dtype=np.float64)
+    try:
+        return np.array(fields, dtype=np.float64)
+    except ValueError:
+        pass
+
+    # Slow path, errors only: find the first m/z or intensity that is not a number
+    for number, peak in enumerate(peak_line.finditer(text, start, end), start=1):
+        for group, field in [(1, "m/z"), (2, "intensity")]:
+            if not _is_number(peak.group(group)):
+                description = f"{field} of peak {number}"
+                _raise_not_a_number(
+                    text, peak.group(group), peak.start(group), description
+                )
+    raise ValueError("Spectrum data contains values that are not numbers")
+
+
+def _raise_not_a_number(text, token, position, description):
+    line, column = _line_and_column(text, position)
+    raise ValueError(
+        f"'{token}' ({description}, line {line}, column {column}) is not a number"
+    )
+
+
+def _is_number(token):
+    try:
+        float(token)
+    except ValueError:
+        return False
+    return True
+
+
+def _line_and_column(text, position):
+    """1-based line and column of a character position in text"""
+    line_start = text.rfind("\n", 0, position) + 1
+    return text.count("\n", 0, position) + 1, position - line_start + 1
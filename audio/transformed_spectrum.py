@@ -0,0 +1,130 @@
+"""
+Transformed Spectrum (columnar transformed_data):
+- One NumPy array per field instead of one dict per peak: the mapping, normalization and dB
+  conversion each run once over the whole spectrum, and a render holds six arrays however many
+  peaks it has
+- Response encodings (SPECTRUM_FORMATS):
+  - "columns": {"mz": [...], "frequency": [...], ...}, one JSON list per field
+  - "binary": the columns packed back to back (little-endian float64, "rendered" as uint8),
+    described by BINARY_COLUMNS
+  - "rows": the original list of {"mz", "frequency", ...} dicts, for existing clients
+- Indexing and iterating still yield row dicts, so code written against the list of rows keeps
+  working unchanged
+"""
+
+import numpy as np
+
+SPECTRUM_FORMATS = ["columns", "rows", "binary"]
+
+# Field name -> packed dtype, in packing order
+BINARY_COLUMNS = {
+    "mz": "<f8",
+    "frequency": "<f8",
+    "intensity": "<f8",
+    "amplitude_linear": "<f8",
+    "amplitude_db": "<f8",
+    "rendered": "|u1",
+}
+
+
+class TransformedSpectrum:
+    """Per-peak transformation results as NumPy columns, one entry per peak"""
+
+    __slots__ = (
+        "mz",
+        "frequency",
+        "intensity",
+        "amplitude_linear",
+        "amplitude_db",
+        "rendered",
+    )
+
+    def __init__(
+        self, mz, frequency, intensity, amplitude_linear, amplitude_db, rendered=None
+    ):
+        self.mz = mz
+        self.frequency = frequency
+        self.intensity = intensity
+        self.amplitude_linear = amplitude_linear
+        self.amplitude_db = amplitude_db
+        # Boolean mask of synthesized peaks, None until the peaks are planned
+        self.rendered = rendered
+
+    @property
+    def fields(self):
+        """Names of the populated columns, in packing order"""
+        return [name for name in BINARY_COLUMNS if getattr(self, name) is not None]
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.fields)
+
+    def __len__(self):
+        return len(self.mz)
+
+    def __getitem__(self, index):
+        return {name: getattr(self, name)[index].item() for name in self.fields}
+
+    def __iter__(self):
+        return iter(self.to_rows())
+
+    def __eq__(self, other):
+        if not isinstance(other, TransformedSpectrum):
+            return NotImplemented
+        return self.fields == other.fields and all(
+            np.array_equal(getattr(self, name), getattr(other, name))
+            for name in self.fields
+        )
+
+    __hash__ = None
+
+    def to_columns(self):
+        """{field: list of values}, ready for JSON"""
+        return {name: getattr(self, name).tolist() for name in self.fields}
+
+    def to_rows(self):
+        """[{field: value}, ...], one dict per peak (the original transformed_data shape)"""
+        columns = self.to_columns()
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+    def to_bytes(self):
+        """Every populated column packed back to back with the dtypes of BINARY_COLUMNS"""
+        return b"".join(
+            getattr(self, name).astype(BINARY_COLUMNS[name], copy=False).tobytes()
+            for name in self.fields
+        )
+
+    @classmethod
+    def from_bytes(cls, data, length, fields=None):
+        """Inverse of to_bytes for a spectrum of length peaks"""
+        fields = fields or list(BINARY_COLUMNS)
+        columns = {}
+        offset = 0
+        for name in fields:
+            dtype = np.dtype(BINARY_COLUMNS[name])
+            column = np.frombuffer(data, dtype=dtype, count=length, offset=offset)
+            columns[name] = column.astype(bool if name == "rendered" else np.float64)
+            offset += length * dtype.itemsize
+        return cls(**columns)
+
+    def encode(self, spectrum_format):
+        """
+        JSON-ready form of the spectrum in one of SPECTRUM_FORMATS. "binary" gives a
+        descriptor of the packed layout; the packed bytes come from to_bytes.
+        """
+        if spectrum_format == "columns":
+            return self.to_columns()
+        if spectrum_format == "rows":
+            return self.to_rows()
+        if spectrum_format == "binary":
+            # A list, not an object: JSON encoders may reorder keys
+            return {
+                "length": len(self),
+                "columns": [
+                    {"name": name, "dtype": BINARY_COLUMNS[name]} for name in self.fields
+                ],
+            }
+        raise ValueError(
+            f"Unknown spectrum format: '{spectrum_format}'. "
+            f"Must be one of: {', '.join(SPECTRUM_FORMATS)}"
+        )
@@ -11,7 +11,14 @@ from .connection_pool import (
     close_all_connections,
 )
 from .queries import log_search, get_search_history, get_popular_compounds
-from .render_massbank_queries import get_massbank_peaks
+from .render_massbank_queries import (
+    get_massbank_peaks,
+    get_massbank_peaks_bulk,
+    warm_spectrum_cache,
+)
+from .compound_index import CompoundNameIndex, load_compound_index
+from .peak_store import PeakStore, build_peak_store
+from .spectrum_cache import SpectrumCache, invalidate_spectrum_cache
 
 __all__ = [
     "init_pool",
@@ -22,4 +29,12 @@ __all__ = [
     "get_search_history",
     "get_popular_compounds",
     "get_massbank_peaks",
+    "get_massbank_peaks_bulk",
+    "warm_spectrum_cache",
+    "CompoundNameIndex",
+    "load_compound_index",
+    "PeakStore",
+    "build_peak_store",
+    "SpectrumCache",
+    "invalidate_spectrum_cache",
 ]
@@ -0,0 +1,343 @@
+"""
+Compound Name Index (every name in compound_accessions, in memory):
+- Lower-cased names (str.lower(), like the lookups) in sorted order, packed into one UTF-8 array plus int64 offsets (a few MB
+  for 217k names instead of a Python string per name), with the display name and the first
+  accession (by accession order) of each
+- Exact lookups and prefix searches are binary searches: O(log n) string comparisons whatever
+  the prefix, and a page of results is a slice of the sorted names
+- Loaded once per worker from the peak store when there is one, otherwise with one query
+
+Fuzzy Matching (TrigramIndex, read from the peak store, else built from the index on first use
+or when the worker starts):
+- A name's trigrams are the 3-character substrings of "  name " (lower-cased), so the start
+  of a name weighs more, as with pg_trgm
+- Similarity is the Jaccard index of two trigram sets (shared / total distinct); a query
+  counts shared trigrams for every name at once with one np.bincount over the posting lists
+  of its trigrams, a few milliseconds for 217k names
+- Building it for 217k names takes about 3 s; it goes through the names in chunks with int32
+  trigram ids and positions, so it peaks at about 120 MB instead of several times the index
+"""
+
+import bisect
+import threading
+
+import numpy as np
+
+from db import get_connection, return_connection
+from utils.metrics import query_timer
+
+# Sorts after every string starting with the same prefix
+_PREFIX_END = "\U0010ffff"
+
+# pg_trgm's default similarity threshold
+MIN_SIMILARITY = 0.3
+
+# Names per step of a TrigramIndex build
+TRIGRAM_CHUNK_NAMES = 16384
+
+
+class StringColumn:
+    """Read-only sequence of the strings packed in a text array and an offsets array"""
+
+    __slots__ = ("text", "offsets")
+
+    def __init__(self, text, offsets):
+        self.text = text
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.text[start:end].tobytes().decode()
+
+    def find(self, value):
+        """Index of value in this sorted column, or None"""
+        index = bisect.bisect_left(self, value)
+        if index < len(self) and self[index] == value:
+            return index
+        return None
+
+    def prefix_range(self, prefix):
+        """[start, end) of the values of this sorted column that start with prefix"""
+        return (
+            bisect.bisect_left(self, prefix),
+            bisect.bisect_left(self, prefix + _PREFIX_END),
+        )
+
+
+def pack_strings(strings):
+    """(uint8 UTF-8 text, int64 offsets) of a list of strings"""
+    encoded = [s.encode() for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    text = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return text, offsets
+
+
+def lower_case_rows(rows):
+    """
+    Sorted (name, accession, display name) rows keyed by the display name's str.lower(),
+    one per name with its first accession. Lookups lower-case the requested name with
+    Python, and Postgres LOWER() can differ from it outside ASCII (collation, final sigma).
+    """
+    first = {}
+    for _, accession, display in sorted(rows, key=lambda row: row[1]):
+        first.setdefault(display.lower(), (accession, display))
+    return sorted((name, *first[name]) for name in first)
+
+
+class CompoundNameIndex:
+    """
+    Sorted compound names with their display names and accessions.
+
+    Args:
+        names: StringColumn of lower-cased names, sorted
+        display_names: StringColumn of the names as stored, aligned with names
+        name_accession: int64 array, index into accessions of each name's accession
+        accessions: StringColumn of accessions
+        trigram_index: TrigramIndex of names when one was built already (peak store),
+            else it is built on first use
+    """
+
+    def __init__(
+        self, names, display_names, name_accession, accessions, trigram_index=None
+    ):
+        self.names = names
+        self.display_names = display_names
+        self.name_accession = name_accession
+        self.accessions = accessions
+        self._trigrams = trigram_index
+        self._trigrams_lock = threading.Lock()
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Index of (lower-cased name, accession, display name) rows, in any order"""
+        rows = lower_case_rows(rows)
+        accessions = sorted({accession for _, accession, _ in rows})
+        accession_index = {accession: i for i, accession in enumerate(accessions)}
+        return cls(
+            StringColumn(*pack_strings([name for name, _, _ in rows])),
+            StringColumn(*pack_strings([display for _, _, display in rows])),
+            np.array(
+                [accession_index[accession] for _, accession, _ in rows],
+                dtype=np.int64,
+            ),
+            StringColumn(*pack_strings(accessions)),
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def find(self, compound_name):
+        """Position of a name (any case) in the index, or None"""
+        return self.names.find(compound_name.lower())
+
+    def resolve(self, compound_name):
+        """(accession, compound_actual) of a name (any case), or None"""
+        index = self.find(compound_name)
+        if index is None:
+            return None
+        return self.accession_at(index), self.display_names[index]
+
+    def accession_index_at(self, index):
+        return int(self.name_accession[index])
+
+    def accession_at(self, index):
+        return self.accessions[self.accession_index_at(index)]
+
+    def search_prefix(self, prefix, limit, offset=0):
+        """
+        Display names starting with prefix (any case), in sorted order.
+
+        Returns:
+            (names of the page [offset, offset + limit), total number of matches)
+        """
+        start, end = self.names.prefix_range(prefix.lower())
+        page = range(min(start + offset, end), min(start + offset + limit, end))
+        return [self.display_names[i] for i in page], end - start
+
+    def trigram_index(self):
+        """TrigramIndex of the names, built on first call"""
+        if self._trigrams is None:
+            with self._trigrams_lock:
+                if self._trigrams is None:
+                    self._trigrams = TrigramIndex.build(self.names)
+        return self._trigrams
+
+    def search_similar(self, compound_name, limit, min_similarity=MIN_SIMILARITY):
+        """
+        Names most similar to compound_name (any case), most similar first.
+
+        Returns:
+            List of (display name, similarity in (0, 1])
+        """
+        trigram_index = self.trigram_index()
+        matches = trigram_index.search(compound_name.lower(), limit, min_similarity)
+        return [(self.display_names[i], similarity) for i, similarity in matches]
+
+
+def trigram_keys(texts):
+    """
+    Trigrams of every text as int64 keys (three 21-bit code points), with the position of
+    the text each came from. A text's trigrams are the 3-character substrings of
+    "  text " (two spaces before, one after); duplicates are kept.
+    """
+    padded = [f"  {text} " for text in texts]
+    code_points = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32)
+    code_points = code_points.astype(np.int64)
+    lengths = np.array([len(text) for text in padded], dtype=np.int64)
+    counts = lengths - 2
+
+    # Start of every trigram: each text's first len - 2 characters
+    text_of = np.repeat(np.arange(len(padded)), counts)
+    text_starts = np.cumsum(lengths) - lengths
+    trigram_starts = np.cumsum(counts) - counts
+    starts = np.arange(counts.sum()) - np.repeat(trigram_starts - text_starts, counts)
+
+    keys = (
+        (code_points[starts] << 42)
+        | (code_points[starts + 1] << 21)
+        | code_points[starts + 2]
+    )
+    return keys, text_of
+
+
+def _sorted_unique(values):
+    """np.unique(values) by sorting (faster than its hash table for int64 keys)"""
+    values = np.sort(values)
+    distinct = np.ones(len(values), dtype=bool)
+    distinct[1:] = values[1:] != values[:-1]
+    return values[distinct]
+
+
+class TrigramIndex:
+    """
+    Posting lists of the names containing each trigram, as one int32 array (CSR layout).
+
+    Args:
+        trigrams: Sorted int64 keys of the distinct trigrams (see trigram_keys)
+        offsets: int64, the names containing trigrams[i] are postings[offsets[i]:offsets[i + 1]]
+        postings: int32 positions of the names, ascending within each trigram
+        trigram_counts: int32 number of distinct trigrams of each name
+    """
+
+    def __init__(self, trigrams, offsets, postings, trigram_counts):
+        self.trigrams = trigrams
+        self.offsets = offsets
+        self.postings = postings
+        self.trigram_counts = trigram_counts
+
+    @classmethod
+    def build(cls, names, chunk_size=TRIGRAM_CHUNK_NAMES):
+        """
+        TrigramIndex of a sequence of lower-cased names; results are positions in it.
+
+        Names are read chunk_size at a time, so the int64 temporaries of trigram_keys stay
+        small: the first pass collects the distinct trigrams, the second one each chunk's
+        (int32 trigram id, int32 position) pairs, which are then counting-sorted into the
+        posting lists.
+        """
+        texts = [names[i] for i in range(len(names))]
+        chunks = [
+            range(start, min(start + chunk_size, len(texts)))
+            for start in range(0, len(texts), chunk_size)
+        ]
+
+        def chunk_keys(chunk):
+            return trigram_keys(texts[chunk.start : chunk.stop])
+
+        trigrams = _sorted_unique(
+            np.concatenate(
+                [_sorted_unique(chunk_keys(chunk)[0]) for chunk in chunks]
+                + [np.empty(0, dtype=np.int64)]
+            )
+        )
+
+        # Distinct (trigram id, position) pairs of every chunk, sorted by id then position
+        pairs = []
+        trigram_counts = np.zeros(len(names), dtype=np.int32)
+        postings_per_trigram = np.zeros(len(trigrams), dtype=np.int64)
+        for chunk in chunks:
+            keys, positions = chunk_keys(chunk)
+            ids = np.searchsorted(trigrams, keys)
+            pair_codes = _sorted_unique(ids * len(chunk) + positions)
+            ids, positions = np.divmod(pair_codes, len(chunk))
+            trigram_counts[chunk.start : chunk.stop] = np.bincount(
+                positions, minlength=len(chunk)
+            )
+            postings_per_trigram += np.bincount(ids, minlength=len(trigrams))
+            pairs.append((ids.astype(np.int32), (positions + chunk.start).astype(np.int32)))
+
+        offsets = np.zeros(len(trigrams) + 1, dtype=np.int64)
+        np.cumsum(postings_per_trigram, out=offsets[1:])
+        postings = np.empty(offsets[-1], dtype=np.int32)
+        # Chunks are in name order, so appending each chunk's names to every posting list
+        # it touches keeps the lists ascending
+        ends = offsets[:-1].copy()
+        while pairs:
+            ids, positions = pairs.pop(0)
+            first = np.ones(len(ids), dtype=bool)
+            first[1:] = ids[1:] != ids[:-1]
+            group_starts = np.flatnonzero(first)
+            rank = np.arange(len(ids)) - np.repeat(
+                group_starts, np.diff(np.append(group_starts, len(ids)))
+            )
+            postings[ends[ids] + rank] = positions
+            ends += np.bincount(ids, minlength=len(trigrams))
+
+        return cls(trigrams, offsets, postings, trigram_counts)
+
+    def search(self, text, limit, min_similarity):
+        """(position, similarity) of the limit names most similar to text, best first"""
+        query = np.unique(trigram_keys([text])[0])
+        if len(self.trigrams) == 0 or limit <= 0:
+            return []
+        slots = np.searchsorted(self.trigrams, query)
+        slots = np.minimum(slots, len(self.trigrams) - 1)
+        slots = slots[self.trigrams[slots] == query]
+        if len(slots) == 0:
+            return []
+
+        postings = np.concatenate(
+            [self.postings[self.offsets[i] : self.offsets[i + 1]] for i in slots]
+        )
+        shared = np.bincount(postings, minlength=len(self.trigram_counts))
+        candidates = np.flatnonzero(shared)
+        common = shared[candidates]
+        similarity = common / (len(query) + self.trigram_counts[candidates] - common)
+
+        keep = similarity >= min_similarity
+        candidates, similarity = candidates[keep], similarity[keep]
+        if len(candidates) > limit:
+            top = np.argpartition(-similarity, limit - 1)[:limit]
+            candidates, similarity = candidates[top], similarity[top]
+        # Most similar first, ties in alphabetical order
+        order = np.lexsort((candidates, -similarity))
+        return [(int(candidates[i]), round(float(similarity[i]), 3)) for i in order]
+
+
+def load_compound_index():
+    """Index of every compound name, read from compound_accessions"""
+    conn = None
+    cursor = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        with query_timer("compound_index"):
+            cursor.execute(
+                """
+                SELECT DISTINCT ON (LOWER(compound_name))
+                    LOWER(compound_name), accession, compound_name
+                FROM compound_accessions
+                ORDER BY LOWER(compound_name), accession
+                """
+            )
+            rows = cursor.fetchall()
+        return CompoundNameIndex.from_rows(rows)
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            return_connection(conn)
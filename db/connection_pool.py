@@ -1,14 +1,19 @@
 import psycopg2.pool
 import os
+import threading
 from dotenv import load_dotenv
+from utils.metrics import DB_POOL_CONNECTIONS
 
 load_dotenv()
 
 connection_pool = None
+# One slot per connection: callers wait for a free connection instead of failing at once
+pool_slots = None
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
 
 
 def init_pool(config=None):
-    global connection_pool
+    global connection_pool, pool_slots
 
     # Prevent double initialization
     if connection_pool is not None:
@@ -28,22 +33,42 @@ def init_pool(config=None):
         }
 
     connection_pool = psycopg2.pool.SimpleConnectionPool(**config)
+    pool_slots = threading.BoundedSemaphore(config["maxconn"])
 
 
 def get_connection():
     if connection_pool is None:
         raise RuntimeError("Connection pool not initialized. Call init_pool() first.")
-    return connection_pool.getconn()
+
+    waiting = DB_POOL_CONNECTIONS.labels("waiting")
+    waiting.inc()
+    try:
+        acquired = pool_slots.acquire(timeout=POOL_TIMEOUT)
+    finally:
+        waiting.dec()
+    if not acquired:
+        raise psycopg2.pool.PoolError("connection pool exhausted")
+
+    try:
+        conn = connection_pool.getconn()
+    except BaseException:
+        pool_slots.release()
+        raise
+    DB_POOL_CONNECTIONS.labels("in_use").inc()
+    return conn
 
 
 def return_connection(conn):
     if connection_pool is None:
         raise RuntimeError("Connection pool not initialized. Call init_pool() first.")
     connection_pool.putconn(conn)
+    DB_POOL_CONNECTIONS.labels("in_use").dec()
+    pool_slots.release()
 
 
 def close_all_connections():
-    global connection_pool
+    global connection_pool, pool_slots
     if connection_pool is not None:
         connection_pool.closeall()
         connection_pool = None  # Allow re-initialization after close
+        pool_slots = None
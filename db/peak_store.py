@@ -0,0 +1,242 @@
+"""
+Peak Store (memory-mapped copy of compound_accessions + spectrum_data):
+- Built offline from Postgres:  python -m db.peak_store build [DIRECTORY]
+  (DIRECTORY defaults to PEAK_STORE_DIR); rebuild after MassBank is reimported
+- Every file is a .npy array opened with mmap_mode="r": all gunicorn workers share the same
+  page cache and nothing is parsed or copied when a worker starts
+- A lookup is two binary searches over sorted strings plus an array slice, microseconds with
+  no database round trip; CompoundDataService uses the store when PEAK_STORE_DIR holds one and
+  falls back to Postgres otherwise
+
+Files (STORE_FORMAT, in DIRECTORY):
+- peaks.npy: (total, 2) float64 m/z, intensity of every accession, one after another, each
+  sorted and deduplicated with intensity > 0 (the rows the Postgres query returns)
+- peak_offsets.npy: int64, peaks of accession i are peaks[peak_offsets[i]:peak_offsets[i + 1]]
+- accession_text.npy, accession_offsets.npy: UTF-8 accessions in sorted order, concatenated
+- name_text.npy, name_offsets.npy: lower-cased (str.lower()) compound names in sorted order
+- name_accession.npy: int64 index of each name's first accession (by accession order)
+- display_text.npy, display_offsets.npy: compound name as stored for that accession
+- trigrams.npy, trigram_offsets.npy, trigram_postings.npy, trigram_counts.npy: the names'
+  TrigramIndex, so no worker builds it at startup
+- meta.json: format version and counts
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from .compound_index import (
+    CompoundNameIndex,
+    StringColumn,
+    TrigramIndex,
+    lower_case_rows,
+    pack_strings,
+)
+
+STORE_FORMAT = 2
+
+_STRING_COLUMNS = ["accession", "name", "display"]
+
+
+class PeakStore:
+    """Read side of a built peak store (see the module docstring)"""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format") != STORE_FORMAT:
+            raise ValueError(
+                f"Unsupported peak store format {meta.get('format')} in {directory}"
+            )
+
+        def load(name):
+            # Plain ndarray views of the mapping: slices pickle and compare like any array
+            path = os.path.join(directory, f"{name}.npy")
+            return np.asarray(np.load(path, mmap_mode="r"))
+
+        self.directory = directory
+        self.meta = meta
+        self.peaks = load("peaks")
+        self.peak_offsets = load("peak_offsets")
+        self.accessions = StringColumn(load("accession_text"), load("accession_offsets"))
+        # The name files have the layout of a CompoundNameIndex, so they are used as one
+        self.name_index = CompoundNameIndex(
+            StringColumn(load("name_text"), load("name_offsets")),
+            StringColumn(load("display_text"), load("display_offsets")),
+            load("name_accession"),
+            self.accessions,
+            TrigramIndex(
+                load("trigrams"),
+                load("trigram_offsets"),
+                load("trigram_postings"),
+                load("trigram_counts"),
+            ),
+        )
+
+    @classmethod
+    def open(cls, directory):
+        """PeakStore of directory, or None when no store has been built there"""
+        if not directory or not os.path.exists(os.path.join(directory, "meta.json")):
+            return None
+        return cls(directory)
+
+    def get_peaks(self, accession):
+        """Read-only (n, 2) float64 view of an accession's peaks, or None"""
+        index = self.accessions.find(accession)
+        if index is None:
+            return None
+        return self._peaks_at(index)
+
+    def lookup(self, compound_name):
+        """(peaks, accession, compound_actual) like get_massbank_peaks, or None"""
+        index = self.name_index.find(compound_name)
+        if index is None:
+            return None
+        return (
+            self._peaks_at(self.name_index.accession_index_at(index)),
+            self.name_index.accession_at(index),
+            self.name_index.display_names[index],
+        )
+
+    def _peaks_at(self, accession_index):
+        start = self.peak_offsets[accession_index]
+        end = self.peak_offsets[accession_index + 1]
+        return self.peaks[start:end]
+
+
+def build_peak_store(directory, cursor):
+    """
+    Export every peak and compound name into a new store at directory.
+
+    The store is written next to directory and swapped in when complete, so running workers
+    keep reading the old files (already mapped) until they reopen the store.
+
+    Returns:
+        meta.json contents
+    """
+    from .render_massbank_queries import decode_peaks
+
+    # Same rows as get_massbank_peaks: distinct peaks with intensity > 0, packed per accession
+    cursor.execute(
+        """
+        SELECT accession, string_agg(
+            float8send(mz::float8) || float8send(intensity::float8), ''::bytea
+            ORDER BY mz, intensity
+        )
+        FROM (
+            SELECT DISTINCT accession, mz, intensity
+            FROM spectrum_data
+            WHERE intensity > 0
+        ) AS distinct_peaks
+        GROUP BY accession
+        """
+    )
+    spectra = {accession: decode_peaks(peaks) for accession, peaks in cursor}
+
+    cursor.execute(
+        """
+        SELECT DISTINCT ON (LOWER(compound_name))
+            LOWER(compound_name), accession, compound_name
+        FROM compound_accessions
+        ORDER BY LOWER(compound_name), accession
+        """
+    )
+    compounds = lower_case_rows(cursor.fetchall())
+
+    # Accessions without peaks are kept so their compounds still resolve (to no peaks)
+    accessions = sorted(set(spectra) | {accession for _, accession, _ in compounds})
+    accession_index = {accession: i for i, accession in enumerate(accessions)}
+    empty = np.empty((0, 2), dtype=np.float64)
+    peak_arrays = [spectra.get(accession, empty) for accession in accessions]
+
+    peak_offsets = np.zeros(len(accessions) + 1, dtype=np.int64)
+    np.cumsum([len(p) for p in peak_arrays], out=peak_offsets[1:])
+    arrays = {
+        "peaks": np.concatenate(peak_arrays) if peak_arrays else empty,
+        "peak_offsets": peak_offsets,
+        "name_accession": np.array(
+            [accession_index[accession] for _, accession, _ in compounds],
+            dtype=np.int64,
+        ),
+    }
+    columns = {
+        "accession": accessions,
+        "name": [name for name, _, _ in compounds],
+        "display": [display for _, _, display in compounds],
+    }
+    for column in _STRING_COLUMNS:
+        text, offsets = pack_strings(columns[column])
+        arrays[f"{column}_text"] = text
+        arrays[f"{column}_offsets"] = offsets
+
+    trigram_index = TrigramIndex.build(columns["name"])
+    arrays["trigrams"] = trigram_index.trigrams
+    arrays["trigram_offsets"] = trigram_index.offsets
+    arrays["trigram_postings"] = trigram_index.postings
+    arrays["trigram_counts"] = trigram_index.trigram_counts
+
+    meta = {
+        "format": STORE_FORMAT,
+        "accessions": len(accessions),
+        "compounds": len(compounds),
+        "peaks": int(peak_offsets[-1]),
+    }
+
+    directory = os.path.abspath(directory)
+    building = f"{directory}.building"
+    shutil.rmtree(building, ignore_errors=True)
+    os.makedirs(building)
+    for name, array in arrays.items():
+        np.save(os.path.join(building, f"{name}.npy"), array)
+    with open(os.path.join(building, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    previous = f"{directory}.previous"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(directory):
+        os.rename(directory, previous)
+    os.rename(building, directory)
+    shutil.rmtree(previous, ignore_errors=True)
+    return meta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m db.peak_store",
+        description="Build the memory-mapped peak store from the MassBank database",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="export spectrum_data into a new store")
+    build.add_argument(
+        "directory",
+        nargs="?",
+        default=os.getenv("PEAK_STORE_DIR"),
+        help="store directory (default: PEAK_STORE_DIR)",
+    )
+    args = parser.parse_args(argv)
+    if not args.directory:
+        parser.error("no store directory given and PEAK_STORE_DIR is not set")
+
+    from db import get_connection, init_pool, return_connection
+
+    init_pool()
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            meta = build_peak_store(args.directory, cursor)
+    finally:
+        return_connection(conn)
+
+    print(
+        f"Built peak store in {args.directory}: {meta['compounds']} compounds, "
+        f"{meta['accessions']} accessions, {meta['peaks']} peaks"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
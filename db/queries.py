@@ -1,4 +1,5 @@
 from db import get_connection, return_connection
+from utils.metrics import query_timer
 
 
 def log_search(compound, accession):
@@ -8,15 +9,16 @@ def log_search(compound, accession):
         conn = get_connection()
         cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            INSERT INTO search_history (accession, compound)
-            VALUES (%s, %s)
-            """,
-            (accession, compound),
-        )
+        with query_timer("log_search"):
+            cursor.execute(
+                """
+                INSERT INTO search_history (accession, compound)
+                VALUES (%s, %s)
+                """,
+                (accession, compound),
+            )
 
-        conn.commit()
+            conn.commit()
 
     except Exception as e:
         print(f"Failed to log search: {e}")
@@ -36,17 +38,18 @@ def get_search_history(limit):
         conn = get_connection()
         cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            SELECT accession, compound, created_at
-            FROM search_history
-            ORDER BY created_at DESC
-            LIMIT %s
-            """,
-            (limit,),
-        )
+        with query_timer("search_history"):
+            cursor.execute(
+                """
+                SELECT accession, compound, created_at
+                FROM search_history
+                ORDER BY created_at DESC
+                LIMIT %s
+                """,
+                (limit,),
+            )
 
-        rows = cursor.fetchall()
+            rows = cursor.fetchall()
 
         return [
             {"accession": row[0], "compound": row[1], "created_at": row[2].isoformat()}
@@ -70,19 +73,20 @@ def get_popular_compounds(limit):
         conn = get_connection()
         cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            SELECT compound, COUNT(*) as search_count
-            FROM search_history
-            WHERE compound IS NOT NULL
-            GROUP BY compound
-            ORDER BY search_count DESC
-            LIMIT %s
-            """,
-            (limit,),
-        )
-
-        rows = cursor.fetchall()
+        with query_timer("popular_compounds"):
+            cursor.execute(
+                """
+                SELECT compound, COUNT(*) as search_count
+                FROM search_history
+                WHERE compound IS NOT NULL
+                GROUP BY compound
+                ORDER BY search_count DESC
+                LIMIT %s
+                """,
+                (limit,),
+            )
+
+            rows = cursor.fetchall()
 
         return [{"compound": row[0], "search_count": row[1]} for row in rows]
 
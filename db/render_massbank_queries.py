@@ -1,52 +1,134 @@
+import os
+
+import numpy as np
+
 from db import get_connection, return_connection
+from utils.metrics import query_timer
+from utils.timing import timed
+
+from .queries import get_popular_compounds
+from .spectrum_cache import DEFAULT_WARM_COUNT, spectrum_cache
+
+
+# Peaks of one accession as a single bytea: big-endian float8 m/z, intensity, m/z, ...
+# (DISTINCT to handle any duplicates); NULL when the accession has no peaks
+PEAKS_LATERAL = """
+LEFT JOIN LATERAL (
+    SELECT string_agg(
+        float8send(mz::float8) || float8send(intensity::float8), ''::bytea
+        ORDER BY mz, intensity
+    ) AS peaks
+    FROM (
+        SELECT DISTINCT mz, intensity
+        FROM spectrum_data
+        WHERE accession = compound.accession
+        AND intensity > 0
+    ) AS distinct_peaks
+) AS peak_data ON TRUE
+"""
 
 
 def get_massbank_peaks(compound_name):
     """
     Get mass spectrum peaks from local PostgreSQL database
-    Two-step search like MassBank API: find compounds first, then get peaks
-    Returns: (spectrum, accession, compound_actual)
+    Two-step search like MassBank API (find the compound, then its peaks), done in one
+    query: the peaks come back packed as float8 bytes and are decoded by NumPy at once
+    Names found before are answered from the spectrum cache without a query
+    Returns: (spectrum, accession, compound_actual), spectrum a read-only (n, 2) float64 array
     """
+    cached = spectrum_cache.get(compound_name)
+    if cached is not None:
+        return cached
+
     conn = None
     cursor = None
     try:
         conn = get_connection()
         cursor = conn.cursor()
 
-        # Step 1: Search the fast compound_accessions table (case-insensitive)
-        search_query = """
-        SELECT accession, compound_name
-        FROM compound_accessions
-        WHERE LOWER(compound_name) = LOWER(%s)
-        ORDER BY accession
-        LIMIT 1
+        # First accession of the name in the fast compound_accessions table
+        # (case-insensitive), joined with all of its peaks
+        search_query = f"""
+        SELECT compound.accession, compound.compound_name, peak_data.peaks
+        FROM (
+            SELECT accession, compound_name
+            FROM compound_accessions
+            WHERE LOWER(compound_name) = LOWER(%s)
+            ORDER BY accession
+            LIMIT 1
+        ) AS compound
+        {PEAKS_LATERAL}
         """
 
-        cursor.execute(search_query, (compound_name,))
-        result = cursor.fetchone()
+        with timed("massbank_query"), query_timer("compound_peaks"):
+            cursor.execute(search_query, (compound_name,))
+            result = cursor.fetchone()
 
         if not result:
             raise ValueError("No records found")
 
-        # Use the first result
-        accession, compound_actual = result
+        accession, compound_actual, peaks = result
+        spectrum = decode_peaks(peaks)
+        spectrum_cache.put(compound_name, spectrum, accession, compound_actual)
 
-        # Step 2: Get all peaks for this specific accession (with DISTINCT to handle any duplicates)
-        peaks_query = """
-        SELECT DISTINCT mz, intensity
-        FROM spectrum_data
-        WHERE accession = %s
-        AND intensity > 0
-        ORDER BY mz
-        """
+        return spectrum, accession, compound_actual
+
+    except Exception as e:
+        raise ValueError(e)
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            return_connection(conn)
 
-        cursor.execute(peaks_query, (accession,))
-        peak_data = cursor.fetchall()
 
-        # Convert to the format expected by converter.py
-        spectrum = [(float(mz), float(intensity)) for mz, intensity in peak_data]
+def get_massbank_peaks_bulk(compound_names):
+    """
+    Bulk version of get_massbank_peaks: the same single query for the whole list of names
+    that are not in the spectrum cache
+    Returns: {lowercased name: (spectrum, accession, compound_actual)}, names that were not
+    found are left out
+    """
+    found = {}
+    lowered_names = []
+    for lowered_name in sorted({name.lower() for name in compound_names}):
+        cached = spectrum_cache.get(lowered_name)
+        if cached is None:
+            lowered_names.append(lowered_name)
+        else:
+            found[lowered_name] = cached
+    if not lowered_names:
+        return found
 
-        return spectrum, accession, compound_actual
+    conn = None
+    cursor = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        # First accession (by accession order) of every requested name, each joined with
+        # all of its peaks
+        search_query = f"""
+        SELECT compound.lowered_name, compound.accession, compound.compound_name, peak_data.peaks
+        FROM (
+            SELECT DISTINCT ON (LOWER(compound_name))
+                LOWER(compound_name) AS lowered_name, accession, compound_name
+            FROM compound_accessions
+            WHERE LOWER(compound_name) = ANY(%s)
+            ORDER BY LOWER(compound_name), accession
+        ) AS compound
+        {PEAKS_LATERAL}
+        """
+
+        with query_timer("compound_peaks_bulk"):
+            cursor.execute(search_query, (lowered_names,))
+            matches = cursor.fetchall()
+
+        for lowered_name, accession, compound_actual, peaks in matches:
+            spectrum = decode_peaks(peaks)
+            spectrum_cache.put(lowered_name, spectrum, accession, compound_actual)
+            found[lowered_name] = (spectrum, accession, compound_actual)
+        return found
 
     except Exception as e:
         raise ValueError(e)
@@ -55,3 +137,33 @@ def get_massbank_peaks(compound_name):
             cursor.close()
         if conn:
             return_connection(conn)
+
+
+def decode_peaks(peaks):
+    """(n, 2) float64 array from the packed big-endian float8 bytes of PEAKS_LATERAL"""
+    if peaks is None:
+        return np.empty((0, 2), dtype=np.float64)
+    # frombuffer only views the bytea; astype makes one native-endian contiguous copy
+    return np.frombuffer(peaks, dtype=">f8").astype(np.float64).reshape(-1, 2)
+
+
+def warm_spectrum_cache(limit=None):
+    """
+    Load the most searched compounds into the spectrum cache with one bulk lookup, so they
+    never reach the database (run when a worker starts)
+    limit: Defaults to SPECTRUM_CACHE_WARM_COUNT, then 100; capped at the cache size
+    Returns: Number of compounds cached
+    """
+    if limit is None:
+        limit = int(os.getenv("SPECTRUM_CACHE_WARM_COUNT", DEFAULT_WARM_COUNT))
+    limit = min(limit, spectrum_cache.max_entries)
+    if limit <= 0:
+        return 0
+
+    popular = get_popular_compounds(limit=limit)
+    try:
+        found = get_massbank_peaks_bulk([row["compound"] for row in popular])
+    except ValueError as e:
+        print(f"Failed to warm spectrum cache: {e}")
+        return 0
+    return len(found)
@@ -0,0 +1,82 @@
+"""
+Spectrum Cache (lower-cased compound name -> (peaks, accession, compound_name)):
+- compound_accessions and spectrum_data only change when MassBank is reimported, so a resolved
+  lookup stays valid for the life of the worker; hot compounds never reach the database
+- Bounded by entry count (SPECTRUM_CACHE_MAX_ENTRIES), least recently used evicted first
+- Peaks are read-only (n, 2) float64 arrays shared by every request that hits the entry
+- Only found compounds are cached: misses are unbounded user input
+- After a reimport restart the workers (kill -HUP on the gunicorn master); that is the only
+  invalidation, and it drops the per-worker render cache and name index along with this cache
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from utils.metrics import SPECTRUM_CACHE_REQUESTS
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_WARM_COUNT = 100
+
+
+class SpectrumCache:
+    """Entry-count-bounded LRU cache of resolved compound spectra, shared by all threads"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, compound_name):
+        """Return (peaks, accession, compound_name) for a name (any case) or None"""
+        key = compound_name.lower()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        SPECTRUM_CACHE_REQUESTS.labels("miss" if entry is None else "hit").inc()
+        return entry
+
+    def put(self, compound_name, peaks, accession, compound_actual):
+        """Store a resolved lookup; peaks are made read-only since every hit shares them"""
+        if self.max_entries <= 0:
+            return
+        peaks.flags.writeable = False
+        key = compound_name.lower()
+        with self._lock:
+            self._entries[key] = (peaks, accession, compound_actual)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+spectrum_cache = SpectrumCache(
+    int(os.getenv("SPECTRUM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+)
+
+
+def invalidate_spectrum_cache():
+    """Forget every cached spectrum of this process (tests; servers restart their workers)"""
+    spectrum_cache.clear()
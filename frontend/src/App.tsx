@@ -7,7 +7,6 @@ import CompoundSearch from "./Components/FormComponents/CompoundSearch";
 import AudioPlayer from "./Components/AudioPlayer";
 import NameAndAccession from "./Components/NameAndAccession";
 import StatusMessage from "./Components/StatusMessage";
-import base64ToBlob from "./utils";
 import SpectrumTables from "./Components/SpectrumComponents/SpectrumTables";
 import AlgorithmSelector from "./Components/FormComponents/AlgorithmSelector";
 import LinearParameters from "./Components/FormComponents/LinearParameters";
@@ -19,10 +18,12 @@ import MostGenerated from "./Components/MostGeneratedComponents/MostGenerated";
 import InfoModal from "./Components/InfoModal";
 import ModuloParameters from "./Components/FormComponents/ModuloParameters";
 import { type Algorithm, type SpectrumData } from "./types";
+import { spectrumRows } from "./spectrum";
 import EmptyDataPlaceholder from "./Components/SpectrumComponents/EmptyDataPlaceholder";
 
 function App() {
   const [compound, setCompound] = useState<string>("");
+  const [pickingCompound, setPickingCompound] = useState<boolean>(false);
   const [status, setStatus] = useState<string>("");
   const [audioUrl, setAudioUrl] = useState<string>("");
   const [compoundName, setCompoundName] = useState<string>("");
@@ -125,26 +126,32 @@ function App() {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
+          // Metadata and raw WAV bytes as separate parts (no base64 in JSON)
+          Accept: "multipart/form-data",
         },
         body: JSON.stringify(requestBody),
       });
 
       if (!response.ok) {
         const errorData = await response.json();
-        setStatus(`Error: ${errorData.error}`);
+        const suggestions: string[] = errorData.suggestions ?? [];
+        setStatus(
+          suggestions.length > 0
+            ? `Error: ${errorData.error}. Did you mean ${suggestions.slice(0, 3).join(", ")}?`
+            : `Error: ${errorData.error}`
+        );
         return;
       }
 
-      const data = await response.json();
-
-      // Convert base64 audio to blob
-      const audioBlob = base64ToBlob(data.audio_base64);
+      const form = await response.formData();
+      const data = JSON.parse(form.get("metadata") as string);
+      const audioBlob = form.get("audio") as Blob;
       const url = URL.createObjectURL(audioBlob);
 
       setCompoundName(data.compound);
       setAccession(data.accession);
       setAudioUrl(url);
-      setSpectrumData(data.spectrum);
+      setSpectrumData(spectrumRows(data.spectrum));
       setStatus("Success!");
       refetchHistory();
     } catch (err) {
@@ -311,6 +318,7 @@ function App() {
                     <CompoundSearch
                       compound={compound}
                       onCompoundChange={setCompound}
+                      onPickingChange={setPickingCompound}
                     />
                   ) : (
                     <div className="form-control mb-4">
@@ -361,7 +369,7 @@ function App() {
                   <button
                     type="submit"
                     className="btn btn-primary mb-4 w-full"
-                    disabled={status === "Fetching audio..."}
+                    disabled={status === "Fetching audio..." || pickingCompound}
                   >
                     Generate Audio
                   </button>
@@ -1,19 +1,46 @@
-import { useEffect, useState } from "react";
-import { type CompoundSearchProps } from "../../types";
+import { useEffect, useRef, useState } from "react";
+import {
+  type CompoundSearchProps,
+  type CompoundSearchResult,
+} from "../../types";
+
+const SUGGESTION_LIMIT = 50;
+
+const searchCompounds = async (
+  prefix: string,
+  limit: number,
+  offset: number = 0,
+  signal?: AbortSignal
+): Promise<CompoundSearchResult> => {
+  const params = new URLSearchParams({
+    prefix,
+    limit: String(limit),
+    offset: String(offset),
+  });
+  const res = await fetch(
+    `${import.meta.env.VITE_API_URL}/compounds?${params}`,
+    { signal }
+  );
+  if (!res.ok) {
+    throw new Error(`Compound search failed: ${res.status}`);
+  }
+  return res.json();
+};
 
 export default function CompoundSearch({
   compound,
   onCompoundChange,
+  onPickingChange,
 }: CompoundSearchProps) {
   const [suggestions, setSuggestions] = useState<string[]>([]);
   const [showSuggestions, setShowSuggestions] = useState(false);
-  const [compounds, setCompounds] = useState<string[]>([]);
+  const [compoundCount, setCompoundCount] = useState(0);
   const [selectedIndex, setSelectedIndex] = useState<number>(-1);
+  const pendingSearch = useRef<AbortController | null>(null);
 
   useEffect(() => {
-    fetch("/compounds.json")
-      .then((res) => res.json())
-      .then((data) => setCompounds(data))
+    searchCompounds("", 1)
+      .then((data) => setCompoundCount(data.total))
       .catch((err) => console.error("Failed to load compounds:", err));
   }, []);
 
@@ -37,12 +64,22 @@ export default function CompoundSearch({
     onCompoundChange(value);
     setSelectedIndex(-1);
 
+    // Only the latest keystroke's suggestions are shown
+    pendingSearch.current?.abort();
+
     if (value.length > 0) {
-      const filtered = compounds.filter((comp) =>
-        comp.toLowerCase().startsWith(value.toLowerCase())
-      );
-      setSuggestions(filtered);
-      setShowSuggestions(true);
+      const controller = new AbortController();
+      pendingSearch.current = controller;
+      searchCompounds(value, SUGGESTION_LIMIT, 0, controller.signal)
+        .then((data) => {
+          setSuggestions(data.compounds);
+          setShowSuggestions(true);
+        })
+        .catch((err) => {
+          if (err.name !== "AbortError") {
+            console.error("Failed to search compounds:", err);
+          }
+        });
     } else {
       setShowSuggestions(false);
     }
@@ -83,10 +120,20 @@ export default function CompoundSearch({
     }
   };
 
-  const handleRandomCompound = () => {
-    const randomIndex = Math.floor(Math.random() * compounds.length);
-    const randomCompound = compounds[randomIndex];
-    onCompoundChange(randomCompound);
+  const handleRandomCompound = async () => {
+    const randomIndex = Math.floor(Math.random() * compoundCount);
+    // Generating is disabled until the picked name is in the input
+    onPickingChange(true);
+    try {
+      const data = await searchCompounds("", 1, randomIndex);
+      if (data.compounds.length > 0) {
+        onCompoundChange(data.compounds[0]);
+      }
+    } catch (err) {
+      console.error("Failed to get a random compound:", err);
+    } finally {
+      onPickingChange(false);
+    }
     setShowSuggestions(false);
     setSelectedIndex(-1);
   };
@@ -113,7 +160,7 @@ export default function CompoundSearch({
         <button
           type="button"
           onClick={handleRandomCompound}
-          disabled={compounds.length === 0}
+          disabled={compoundCount === 0}
           className="btn btn-ghost btn-square text-xl"
           title="Random compound"
           data-random-button="true"
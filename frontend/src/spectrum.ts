@@ -0,0 +1,13 @@
+import { type SpectrumColumns, type SpectrumData } from "./types";
+
+// One SpectrumData row per peak from the API's columnar spectrum
+export function spectrumRows(columns: SpectrumColumns): SpectrumData[] {
+  return columns.mz.map((mz, i) => ({
+    mz,
+    frequency: columns.frequency[i],
+    intensity: columns.intensity[i],
+    amplitude_linear: columns.amplitude_linear[i],
+    amplitude_db: columns.amplitude_db[i],
+    rendered: columns.rendered[i],
+  }));
+}
@@ -40,8 +40,14 @@ export interface SpectrumData {
   intensity: number;
   amplitude_linear: number;
   amplitude_db: number;
+  rendered: boolean;
 }
 
+// Columnar spectrum as sent by the API: one array per field, one entry per peak
+export type SpectrumColumns = {
+  [Field in keyof SpectrumData]: Array<SpectrumData[Field]>;
+};
+
 export interface SpectrumTablesProps {
   spectrumData: SpectrumData[] | null;
 }
@@ -107,9 +113,19 @@ export type SamplePianoProps = {
 // Display
 // =====================================
 
+// GET /compounds: one page of the names starting with a prefix
+export interface CompoundSearchResult {
+  compounds: string[];
+  total: number;
+  limit: number;
+  offset: number;
+}
+
 export interface CompoundSearchProps {
   compound: string;
   onCompoundChange: (value: string) => void;
+  // true while a random compound is being fetched, false once its name is set
+  onPickingChange: (picking: boolean) => void;
 }
 
 export interface NameAndAccessionProps {
@@ -0,0 +1,25 @@
+"""
+gunicorn settings loaded automatically from the working directory.
+
+Prometheus multiprocess mode: every worker writes its metrics to PROMETHEUS_MULTIPROC_DIR,
+which has to start empty, and a dead worker's live gauges have to be dropped.
+
+The worker count is passed to the workers as WEB_CONCURRENCY: preview handles need a shared
+render store (RENDER_STORE_DIR) when there is more than one worker.
+"""
+
+import os
+
+
+def on_starting(server):
+    from utils.metrics import clear_multiprocess_dir
+
+    clear_multiprocess_dir()
+    os.environ["WEB_CONCURRENCY"] = str(server.cfg.workers)
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,5 +1,13 @@
 from .audio_service import AudioGenerationService
 from .compound_service import CompoundDataService
 from .notification_service import NotificationService
+from .render_cache import RenderCache
+from .render_store import RenderStore
 
-__all__ = ["AudioGenerationService", "CompoundDataService", "NotificationService"]
+__all__ = [
+    "AudioGenerationService",
+    "CompoundDataService",
+    "NotificationService",
+    "RenderCache",
+    "RenderStore",
+]
@@ -1,51 +1,487 @@
-import base64
-from audio import generate_combined_wav_bytes_and_data
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from audio import (
+    generate_combined_wav_bytes_and_data,
+    generate_transformed_data,
+    generate_wav_stream_and_data,
+    wav_file_size,
+    DEFAULT_BLOCK_SIZE,
+    FREQUENCY_ALGORITHMS,
+    PRECISIONS,
+    QUALITY_PRESETS,
+    SYNTHESIS_ENGINES,
+)
+from utils.metrics import RENDER_CACHE_REQUESTS, observe_render
+from utils.timing import timed
+from .render_cache import RenderCache
+from .render_store import RenderStore, render_store_key
+
+DEFAULT_RENDER_CACHE_BYTES = 64 * 1024 * 1024
+DEFAULT_RENDER_STORE_BYTES = 1024 * 1024 * 1024
+
+# Preview renders: short, low-rate, float32 and "draft" peak planning. 2 s at 8 kHz is
+# 16,000 samples, which renders in tens of milliseconds even for 2,000-peak spectra
+# ("auto" switches to the ifft engine at that size)
+PREVIEW_MAX_DURATION = 2.0
+PREVIEW_SAMPLE_RATE = 8000
+PREVIEW_PRECISION = "float32"
+PREVIEW_QUALITY = "draft"
+
+# Failed background renders remembered so their handles can report the error
+MAX_FAILED_RENDERS = 256
+# Full renders queued by previews and not started yet, beyond which the oldest are cancelled:
+# previews are for browsing, and whoever started those has most likely moved on
+MAX_QUEUED_FULL_RENDERS = 32
+CANCELLED_RENDER_ERROR = "Render cancelled: too many full renders were queued"
 
 
 class AudioGenerationService:
     """Handles the core business logic for audio generation from spectra"""
 
-    def generate_audio_from_spectrum(self, spectrum, algorithm, parameters):
+    def __init__(
+        self,
+        engine=None,
+        block_size=DEFAULT_BLOCK_SIZE,
+        precision=None,
+        quality=None,
+        cache_max_bytes=None,
+        store_directory=None,
+        store_max_bytes=None,
+        workers=None,
+        batch_workers=None,
+        server_workers=None,
+    ):
+        """
+        Args:
+            engine: Synthesis engine name (see audio.SYNTHESIS_ENGINES), e.g. 'blocked'
+                for exact output or 'phasor' to avoid per-sample trig calls. 'auto' picks
+                by peak count and duration, using 'ifft' for large spectra.
+                Defaults to the AUDIO_ENGINE environment variable, then 'auto'
+            block_size: Peaks rendered per batch, bounds scratch memory
+            precision: Deployment default 'float64' or 'float32', used when a request
+                does not set one. Defaults to AUDIO_PRECISION, then 'float64'
+            quality: Deployment default peak planning preset (see audio.QUALITY_PRESETS),
+                used when a request does not set one. Defaults to AUDIO_QUALITY, then 'exact'
+            cache_max_bytes: Size bound of the in-process render cache, 0 disables it.
+                Defaults to RENDER_CACHE_MAX_BYTES, then 64 MiB
+            store_directory: Directory of the on-disk render store shared by all workers.
+                Defaults to RENDER_STORE_DIR; the store is disabled when neither is set
+            store_max_bytes: Size cap of the on-disk store. Defaults to
+                RENDER_STORE_MAX_BYTES, then 1 GiB
+            workers: Processes per render (0 = one per CPU, 1 = serial). Small renders
+                stay serial regardless. Defaults to AUDIO_WORKERS, then 1
+            batch_workers: Threads rendering the items of batch requests, shared by all
+                batches of this service. Defaults to AUDIO_BATCH_WORKERS, then the CPU count
+            server_workers: Server processes answering requests; a full render handle
+                only works across them with a render store, so previews are refused
+                without one when there are several. Defaults to WEB_CONCURRENCY (set by
+                gunicorn.conf.py), then 1
+        """
+        if engine is None:
+            engine = os.getenv("AUDIO_ENGINE", "auto")
+        if precision is None:
+            precision = os.getenv("AUDIO_PRECISION", "float64")
+        if quality is None:
+            quality = os.getenv("AUDIO_QUALITY", "exact")
+        if cache_max_bytes is None:
+            cache_max_bytes = int(
+                os.getenv("RENDER_CACHE_MAX_BYTES", DEFAULT_RENDER_CACHE_BYTES)
+            )
+        if store_directory is None:
+            store_directory = os.getenv("RENDER_STORE_DIR")
+        if store_max_bytes is None:
+            store_max_bytes = int(
+                os.getenv("RENDER_STORE_MAX_BYTES", DEFAULT_RENDER_STORE_BYTES)
+            )
+        if workers is None:
+            workers = int(os.getenv("AUDIO_WORKERS", 1))
+        if batch_workers is None:
+            batch_workers = int(os.getenv("AUDIO_BATCH_WORKERS", os.cpu_count() or 1))
+        if server_workers is None:
+            server_workers = int(os.getenv("WEB_CONCURRENCY", 1))
+
+        if engine != "auto" and engine not in SYNTHESIS_ENGINES:
+            raise ValueError(f"Unknown synthesis engine: '{engine}'")
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision: '{precision}'")
+        if quality not in QUALITY_PRESETS:
+            raise ValueError(f"Unknown quality: '{quality}'")
+        if workers < 0:
+            raise ValueError(f"Invalid worker count: {workers}")
+        if batch_workers < 1:
+            raise ValueError(f"Invalid batch worker count: {batch_workers}")
+
+        self.engine = engine
+        self.block_size = block_size
+        self.precision = precision
+        self.quality = quality
+        self.workers = workers
+        self.server_workers = server_workers
+        self.batch_pool = ThreadPoolExecutor(
+            max_workers=batch_workers, thread_name_prefix="batch-render"
+        )
+        self._pending_renders = {}
+        self._failed_renders = OrderedDict()
+        self._renders_lock = threading.Lock()
+        self.render_cache = RenderCache(cache_max_bytes) if cache_max_bytes > 0 else None
+        self.render_store = (
+            RenderStore(store_directory, store_max_bytes) if store_directory else None
+        )
+
+    def generate_audio_from_spectrum(self, spectrum, algorithm, parameters, accession=None):
         """
         Generate audio from a compound's spectrum.
 
+        Renders of MassBank spectra (accession given) are cached in-process, so repeat
+        requests skip both synthesis and encoding. Cached results are shared: treat them
+        as read-only. When the on-disk render store is enabled, any spectrum whose WAV
+        was rendered before by any worker skips synthesis too.
+
         Args:
-            spectrum: List of (m/z, intensity) tuples
+            spectrum: (n, 2) array or list of (m/z, intensity) pairs
             algorithm: Algorithm type ('linear', 'inverse', 'modulo')
             parameters: Dict containing all generation parameters
+            accession: MassBank accession of the spectrum, None for custom spectra
+
+        Returns:
+            Dict containing transformed_data and wav_bytes (the WAV file)
+        """
+        cache_key = None
+        if accession is not None and self.render_cache is not None:
+            cache_key = self.render_cache_key(accession, algorithm, parameters)
+            cached = self.render_cache.get(cache_key)
+            RENDER_CACHE_REQUESTS.labels("miss" if cached is None else "hit").inc()
+            if cached is not None:
+                return cached
+
+        result = None
+        store_key = None
+        if self.render_store is not None:
+            with timed("render_store"):
+                store_key = render_store_key(
+                    spectrum, self._output_options(algorithm, parameters)
+                )
+                result = self._load_from_store(
+                    store_key, spectrum, algorithm, parameters
+                )
+
+        if result is None:
+            options = self._render_options(algorithm, parameters)
+            start = time.perf_counter()
+            wav_buffer, transformed_data = generate_combined_wav_bytes_and_data(
+                spectrum, workers=self.workers, **options
+            )
+            observe_render(
+                time.perf_counter() - start,
+                len(transformed_data),
+                int(options["sample_rate"] * options["duration"]),
+            )
+            # A view of the rendered file, shared by the store, cache and response
+            wav_bytes = wav_buffer.getbuffer()
+            if store_key is not None:
+                with timed("render_store"):
+                    self.render_store.put(store_key, wav_bytes)
+
+            result = {
+                "transformed_data": transformed_data,
+                "wav_bytes": wav_bytes,
+            }
+
+        if cache_key is not None:
+            self.render_cache.put(cache_key, result)
+
+        return result
+
+    def generate_audio_batch(self, jobs):
+        """
+        Render many spectra on the shared batch pool (NumPy releases the GIL while synthesizing).
+
+        Args:
+            jobs: List of (spectrum, algorithm, parameters, accession) tuples, the
+                arguments of generate_audio_from_spectrum
+
+        Yields:
+            (index, result, error) in completion order: result is what
+            generate_audio_from_spectrum returns, error the exception it raised
+        """
+        futures = {
+            self.batch_pool.submit(self.generate_audio_from_spectrum, *job): index
+            for index, job in enumerate(jobs)
+        }
+        try:
+            for future in as_completed(futures):
+                # Dropped before yielding: a finished future holds its WAV until released
+                index = futures.pop(future)
+                error = future.exception()
+                result = None if error else future.result()
+                yield index, result, error
+        finally:
+            # Client went away: do not render items nobody will read
+            for future in futures:
+                future.cancel()
+
+    def generate_preview_from_spectrum(
+        self, spectrum, algorithm, parameters, accession=None
+    ):
+        """
+        Render a quick preview now and start the full render in the background.
+
+        The preview is at most PREVIEW_MAX_DURATION seconds at PREVIEW_SAMPLE_RATE,
+        rendered in PREVIEW_PRECISION with PREVIEW_QUALITY peak planning. The full
+        render uses the requested parameters unchanged and is fetched later with
+        get_full_render(handle).
+
+        Returns:
+            Dict containing transformed_data (of the full render), wav_bytes (the
+            preview WAV), preview_settings and handle
+
+        Raises:
+            ValueError: when there is no render store and several server workers, as
+                the handle would only be found by the worker that started the render
+        """
+        if self.render_store is None and self.server_workers > 1:
+            raise ValueError(
+                "Previews are not available: the server runs several workers "
+                "without a shared render store (RENDER_STORE_DIR)"
+            )
+        preview_parameters = self.preview_parameters(parameters)
+        preview = self.generate_audio_from_spectrum(
+            spectrum, algorithm, preview_parameters, accession=accession
+        )
+        handle = self.start_full_render(spectrum, algorithm, parameters, accession)
+
+        return {
+            "transformed_data": self._transformed_data(spectrum, algorithm, parameters),
+            "wav_bytes": preview["wav_bytes"],
+            "preview_settings": {
+                "duration": preview_parameters["duration"],
+                "sample_rate": preview_parameters["sample_rate"],
+            },
+            "handle": handle,
+        }
+
+    def preview_parameters(self, parameters):
+        """Parameters of the preview render for a request's parameters"""
+        return dict(
+            parameters,
+            duration=min(parameters["duration"], PREVIEW_MAX_DURATION),
+            sample_rate=min(parameters["sample_rate"], PREVIEW_SAMPLE_RATE),
+            precision=PREVIEW_PRECISION,
+            quality=PREVIEW_QUALITY,
+        )
+
+    def start_full_render(self, spectrum, algorithm, parameters, accession=None):
+        """
+        Queue a full render on the batch pool, unless it is already done or queued.
+
+        At most MAX_QUEUED_FULL_RENDERS wait to start: past that the oldest waiting
+        ones are cancelled, and their handles report CANCELLED_RENDER_ERROR.
+
+        Returns:
+            The render's handle: its content address in the render store
+        """
+        handle = render_store_key(spectrum, self._output_options(algorithm, parameters))
+
+        with self._renders_lock:
+            if handle in self._pending_renders or self._has_full_render(handle):
+                return handle
+            self._failed_renders.pop(handle, None)
+            future = self.batch_pool.submit(
+                self._full_render, handle, spectrum, algorithm, parameters, accession
+            )
+            self._pending_renders[handle] = future
+            queued = [f for f in self._pending_renders.values() if not f.running()]
+            stale = queued[: max(0, len(queued) - MAX_QUEUED_FULL_RENDERS)]
+
+        future.add_done_callback(lambda done: self._finish_full_render(handle, done))
+        # Outside the lock: a cancelled future runs its done callback right away
+        for stale_future in stale:
+            stale_future.cancel()
+        return handle
+
+    def get_full_render(self, handle):
+        """
+        Look up a full render started by start_full_render.
 
         Returns:
-            Dict containing wav_buffer, transformed_data, and audio_base64
+            (status, value): ("done", WAV as a bytes-like object, see
+            _find_full_render), ("pending", None), ("failed", error message) or
+            ("unknown", None)
         """
-        wav_buffer, transformed_data = generate_combined_wav_bytes_and_data(
+        with self._renders_lock:
+            if handle in self._pending_renders:
+                return "pending", None
+            if handle in self._failed_renders:
+                return "failed", self._failed_renders[handle]
+
+        wav_bytes = self._find_full_render(handle)
+        if wav_bytes is not None:
+            return "done", wav_bytes
+        return "unknown", None
+
+    def _full_render(self, handle, spectrum, algorithm, parameters, accession):
+        result = self.generate_audio_from_spectrum(
+            spectrum, algorithm, parameters, accession=accession
+        )
+        # Without a render store, the cache is where the handle finds it again
+        if self.render_store is None and self.render_cache is not None:
+            self.render_cache.put(("full_render", handle), result)
+        # A render cache hit skips the store, which may have evicted the file since
+        elif self.render_store is not None and not self._has_full_render(handle):
+            with timed("render_store"):
+                self.render_store.put(handle, result["wav_bytes"])
+
+    def _finish_full_render(self, handle, future):
+        with self._renders_lock:
+            self._pending_renders.pop(handle, None)
+            if future.cancelled():
+                error = CANCELLED_RENDER_ERROR
+            elif future.exception() is None:
+                return
+            elif isinstance(future.exception(), ValueError):
+                error = str(future.exception())
+            else:
+                error = "Render failed"
+            self._failed_renders[handle] = error
+            while len(self._failed_renders) > MAX_FAILED_RENDERS:
+                self._failed_renders.popitem(last=False)
+
+    def _has_full_render(self, handle):
+        """Whether a full render is finished, without reading it"""
+        if self.render_store is not None:
+            return os.path.exists(self.render_store.path_for(handle))
+        return (
+            self.render_cache is not None
+            and self.render_cache.peek(("full_render", handle)) is not None
+        )
+
+    def _find_full_render(self, handle):
+        """
+        WAV of a finished full render, or None. From the render store it is a memory map
+        of the file (no copy), which the caller closes once the response is sent.
+        """
+        if self.render_store is not None:
+            return self.render_store.get(handle)
+        if self.render_cache is not None:
+            # Polling for a render is not a cache lookup: keep it out of the counters
+            cached = self.render_cache.peek(("full_render", handle))
+            if cached is not None:
+                return cached["wav_bytes"]
+        return None
+
+    def _load_from_store(self, store_key, spectrum, algorithm, parameters):
+        """
+        Stored WAV plus freshly computed transformed_data (no synthesis), or None.
+
+        wav_bytes is the memory map of the stored file, not a copy. It may end up in the
+        render cache as well as in the response, so it is not closed explicitly: the
+        mapping goes away with its last reference.
+        """
+        wav = self.render_store.get(store_key)
+        if wav is None:
+            return None
+
+        return {
+            "transformed_data": self._transformed_data(spectrum, algorithm, parameters),
+            "wav_bytes": wav,
+        }
+
+    def _transformed_data(self, spectrum, algorithm, parameters):
+        """transformed_data of a render, without synthesizing it"""
+        options = self._render_options(algorithm, parameters)
+        return generate_transformed_data(
             spectrum,
             algorithm=algorithm,
-            offset=parameters["offset"],
-            scale=parameters["scale"],
-            shift=parameters["shift"],
-            factor=parameters["factor"],
-            modulus=parameters["modulus"],
-            base=parameters["base"],
-            duration=parameters["duration"],
-            sample_rate=parameters["sample_rate"],
+            offset=options["offset"],
+            scale=options["scale"],
+            shift=options["shift"],
+            factor=options["factor"],
+            modulus=options["modulus"],
+            base=options["base"],
+            duration=options["duration"],
+            sample_rate=options["sample_rate"],
+            quality=options["quality"],
         )
 
+    def render_cache_key(self, accession, algorithm, parameters):
+        """Everything that determines a MassBank render's output"""
+        return (
+            accession,
+            tuple(sorted(self._output_options(algorithm, parameters).items())),
+        )
+
+    def _output_options(self, algorithm, parameters):
+        """Render options that change the WAV (algorithm-irrelevant parameters left out)"""
+        options = self._render_options(algorithm, parameters)
+        return {
+            "algorithm": algorithm,
+            **self.get_algorithm_parameters(algorithm, parameters),
+            "duration": options["duration"],
+            "sample_rate": options["sample_rate"],
+            "engine": options["engine"],
+            "precision": options["precision"],
+            "quality": options["quality"],
+        }
+
+    def cache_stats(self):
+        """Hit/miss/eviction counters of the render cache (None when disabled)"""
+        if self.render_cache is None:
+            return None
+        return self.render_cache.stats()
+
+    def stream_audio_from_spectrum(
+        self, spectrum, algorithm, parameters, normalization="exact"
+    ):
+        """
+        Generate audio from a compound's spectrum as a stream of WAV chunks.
+
+        Memory stays constant per request regardless of duration and sample rate.
+
+        Args:
+            spectrum: (n, 2) array or list of (m/z, intensity) pairs
+            algorithm: Algorithm type ('linear', 'inverse', 'modulo')
+            parameters: Dict containing all generation parameters
+            normalization: 'exact' (two passes) or 'bound' (one pass, never clips)
+
+        Returns:
+            Dict containing wav_chunks (generator of bytes), wav_size, and transformed_data
+        """
+        wav_chunks, transformed_data = generate_wav_stream_and_data(
+            spectrum,
+            normalization=normalization,
+            **self._render_options(algorithm, parameters),
+        )
+
+        num_samples = int(parameters["sample_rate"] * parameters["duration"])
         return {
-            "wav_buffer": wav_buffer,
+            "wav_chunks": wav_chunks,
+            "wav_size": wav_file_size(num_samples),
             "transformed_data": transformed_data,
-            "audio_base64": base64.b64encode(wav_buffer.getvalue()).decode(),
+        }
+
+    def _render_options(self, algorithm, parameters):
+        """Keyword arguments shared by every render entry point"""
+        return {
+            "algorithm": algorithm,
+            "offset": parameters["offset"],
+            "scale": parameters["scale"],
+            "shift": parameters["shift"],
+            "factor": parameters["factor"],
+            "modulus": parameters["modulus"],
+            "base": parameters["base"],
+            "duration": parameters["duration"],
+            "sample_rate": parameters["sample_rate"],
+            "engine": self.engine,
+            "block_size": self.block_size,
+            "precision": parameters.get("precision") or self.precision,
+            "quality": parameters.get("quality") or self.quality,
         }
 
     def get_algorithm_parameters(self, algorithm, params):
         """Extract only the relevant parameters for the specified algorithm"""
-        if algorithm == "linear":
-            return {"offset": params["offset"]}
-        elif algorithm == "inverse":
-            return {"scale": params["scale"], "shift": params["shift"]}
-        elif algorithm == "modulo":
-            return {
-                "factor": params["factor"],
-                "modulus": params["modulus"],
-                "base": params["base"],
-            }
-        return {}
+        if algorithm not in FREQUENCY_ALGORITHMS:
+            return {}
+        return {name: params[name] for name in FREQUENCY_ALGORITHMS[algorithm].parameters}
@@ -1,26 +1,164 @@
+import os
 import threading
-from db import get_massbank_peaks, log_search
+
+from db import (
+    PeakStore,
+    get_massbank_peaks,
+    get_massbank_peaks_bulk,
+    load_compound_index,
+    log_search,
+)
+from utils.metrics import start_background_task
+from utils.timing import timed
 
 
 class CompoundDataService:
     """Handles all compound data operations"""
 
-    def get_compound_spectrum(self, compound_name):
+    def __init__(self, peak_store_directory=None):
+        """
+        Args:
+            peak_store_directory: Directory of a peak store built with
+                `python -m db.peak_store build`; compounds are read from it instead of
+                Postgres. Defaults to PEAK_STORE_DIR; Postgres is used when neither is set
+                or no store has been built there
+        """
+        if peak_store_directory is None:
+            peak_store_directory = os.getenv("PEAK_STORE_DIR")
+        self.peak_store = PeakStore.open(peak_store_directory)
+        if peak_store_directory and self.peak_store is None:
+            print(
+                f"No peak store in {peak_store_directory}, reading peaks from the database"
+            )
+        # Names of every compound: part of the peak store, else loaded from the database
+        # on first use (or by load_name_index when the worker starts)
+        self._name_index = self.peak_store.name_index if self.peak_store else None
+        self._name_index_lock = threading.Lock()
+
+    def load_name_index(self):
+        """Return the compound name index, loading it first if needed"""
+        if self._name_index is None:
+            with self._name_index_lock:
+                if self._name_index is None:
+                    self._name_index = load_compound_index()
+        return self._name_index
+
+    def prepare_name_index(self):
+        """Load the name index and build its trigram index (run when the worker starts)"""
+        self.load_name_index().trigram_index()
+
+    def suggest_compounds(self, compound_name, limit=5):
+        """
+        Compound names similar to compound_name, e.g. to suggest after a typo.
+
+        Returns:
+            List of (compound name, similarity in (0, 1]), most similar first
+        """
+        return self.load_name_index().search_similar(compound_name, limit)
+
+    def search_compounds(self, prefix, limit, offset=0):
+        """
+        Compound names starting with prefix (case-insensitive), in alphabetical order.
+
+        Returns:
+            Dict with the page of names and the total number of matching names
+        """
+        names, total = self.load_name_index().search_prefix(prefix, limit, offset)
+        return {"compounds": names, "total": total}
+
+    def _is_unknown(self, compound_name):
+        """
+        True when the loaded name index shows a name does not exist (never loads it).
+        Only ASCII names are answered from the index: the database compares with
+        LOWER(), which lower-cases other characters differently from str.lower()
+        """
+        index = self._name_index
+        return (
+            index is not None
+            and compound_name.isascii()
+            and index.find(compound_name) is None
+        )
+
+    def get_compound_spectrum(self, compound_name, fuzzy=False):
         """
         Retrieve spectrum data for a compound.
 
+        Args:
+            compound_name: Compound name, any case
+            fuzzy: When no compound has that name, use the most similar name instead
+                (if any is similar enough, see suggest_compounds)
+
         Returns:
-            Dict containing spectrum, accession, and compound_name
+            Dict containing spectrum, accession, and compound_name, plus fuzzy_match
+            ({"requested": compound_name, "similarity": ...}) when a similar name was used
         """
-        spectrum, accession, compound_actual = get_massbank_peaks(compound_name)
-        return {
+        fuzzy_match = None
+        with timed("compound"):
+            try:
+                spectrum, accession, compound_actual = self._lookup(compound_name)
+            except ValueError as e:
+                if not fuzzy or "No records found" not in str(e):
+                    raise
+                matches = self.suggest_compounds(compound_name, limit=1)
+                if not matches:
+                    raise
+                match_name, similarity = matches[0]
+                spectrum, accession, compound_actual = self._lookup(match_name)
+                fuzzy_match = {"requested": compound_name, "similarity": similarity}
+
+        compound_data = {
             "spectrum": spectrum,
             "accession": accession,
             "compound_name": compound_actual,
         }
+        if fuzzy_match is not None:
+            compound_data["fuzzy_match"] = fuzzy_match
+        return compound_data
+
+    def get_compound_spectra(self, compound_names):
+        """
+        Retrieve spectrum data for many compounds with one bulk lookup.
+
+        Returns:
+            Dict mapping each requested name to the same dict get_compound_spectrum
+            returns, or None when the compound was not found
+        """
+        if self.peak_store is not None:
+            found = {}
+            for compound_name in compound_names:
+                match = self.peak_store.lookup(compound_name)
+                if match is not None:
+                    found[compound_name.lower()] = match
+        else:
+            found = get_massbank_peaks_bulk(
+                [name for name in compound_names if not self._is_unknown(name)]
+            )
+        spectra = {}
+        for compound_name in compound_names:
+            match = found.get(compound_name.lower())
+            if match is None:
+                spectra[compound_name] = None
+                continue
+            spectrum, accession, compound_actual = match
+            spectra[compound_name] = {
+                "spectrum": spectrum,
+                "accession": accession,
+                "compound_name": compound_actual,
+            }
+        return spectra
+
+    def _lookup(self, compound_name):
+        """(spectrum, accession, compound_actual) from the peak store or the database"""
+        if self.peak_store is None:
+            # Unknown names are answered without a query once the name index is loaded
+            if self._is_unknown(compound_name):
+                raise ValueError("No records found")
+            return get_massbank_peaks(compound_name)
+        match = self.peak_store.lookup(compound_name)
+        if match is None:
+            raise ValueError("No records found")
+        return match
 
     def log_compound_search(self, compound_name, accession):
         """Log that a compound was searched (runs asynchronously)"""
-        threading.Thread(
-            target=log_search, args=(compound_name, accession), daemon=True
-        ).start()
+        start_background_task("log_search", log_search, compound_name, accession)
@@ -1,4 +1,4 @@
-import threading
+from utils.metrics import start_background_task
 from utils.webhook import send_webhook_notification
 
 
@@ -19,4 +19,4 @@ class NotificationService:
                 sample_rate,
             )
 
-        threading.Thread(target=send_async, daemon=True).start()
+        start_background_task("webhook", send_async)
@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict
+
+
+def estimate_render_size(render):
+    """Approximate bytes held by a cached render (WAV file + transformed_data columns)"""
+    return len(render["wav_bytes"]) + render["transformed_data"].nbytes
+
+
+class RenderCache:
+    """Byte-size-bounded LRU cache of finished renders, shared by the worker's threads"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached render for key (most recently used now) or None"""
+        with self._lock:
+            render = self._entries.get(key)
+            if render is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return render
+
+    def peek(self, key):
+        """Return the cached render for key or None, without counting a hit or miss"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key, render):
+        """Store a render, evicting least recently used entries to stay under max_bytes"""
+        size = estimate_render_size(render)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._sizes.pop(key)
+                del self._entries[key]
+
+            while self._entries and self._total_bytes + size > self.max_bytes:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(evicted_key)
+                self.evictions += 1
+
+            self._entries[key] = render
+            self._sizes[key] = size
+            self._total_bytes += size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        """Hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+
+# Every worker counts its own writes; each one also rescans the directory this often, so
+# the store stays near max_bytes however many workers write to it
+RESCAN_INTERVAL_SECONDS = 60
+# A temp file this old belongs to a writer that crashed before publishing it
+TEMP_FILE_MAX_AGE_SECONDS = 3600
+
+
+def render_store_key(spectrum, render_options):
+    """
+    Content address of a render: SHA-256 of the spectrum's float64 peaks plus every
+    option that affects the WAV, so identical inputs map to the same file in every worker.
+    """
+    digest = hashlib.sha256()
+    peaks = np.ascontiguousarray(np.asarray(spectrum, dtype=np.float64))
+    digest.update(peaks.tobytes())
+    digest.update(json.dumps(render_options, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class RenderStore:
+    """
+    Disk-backed, content-addressed WAV store shared by all gunicorn workers.
+
+    - Files live at <directory>/<key[:2]>/<key>.wav
+    - Writes go to a temp file in the same directory and are published with os.replace,
+      so readers never see a partial WAV
+    - Reads memory-map the file; a hit refreshes its mtime, which is the LRU clock
+    - When the total size passes max_bytes, the least recently used files are deleted.
+      The total is this worker's last scan of the directory plus its own writes since;
+      scans happen at least every RESCAN_INTERVAL_SECONDS and delete abandoned temp files
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._rescan()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.wav")
+
+    def get(self, key):
+        """Memory-mapped WAV for key, or None. The caller closes the returned mmap."""
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                wav = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            # ValueError: empty file, which a crashed writer cannot leave but be safe
+            return None
+        return wav
+
+    def put(self, key, wav_bytes):
+        """Atomically store wav_bytes (any bytes-like object) under key"""
+        size = len(memoryview(wav_bytes).cast("B"))
+        if size > self.max_bytes:
+            return
+
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(wav_bytes)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        with self._lock:
+            if time.monotonic() - self._scanned_at > RESCAN_INTERVAL_SECONDS:
+                self._rescan()
+            self._approx_bytes += size
+            if self._approx_bytes > self.max_bytes:
+                self._evict()
+
+    def _rescan(self):
+        """Recount the store from the directory, which every worker writes to"""
+        self._approx_bytes = sum(size for _, _, size in self._scan())
+        self._scanned_at = time.monotonic()
+
+    def _scan(self):
+        """
+        (mtime, path, size) of every stored WAV. Temp files older than
+        TEMP_FILE_MAX_AGE_SECONDS are deleted on the way.
+        """
+        entries = []
+        abandoned = time.time() - TEMP_FILE_MAX_AGE_SECONDS
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                is_wav = entry.name.endswith(".wav")
+                if not is_wav and not entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                    if is_wav:
+                        entries.append((stat.st_mtime, entry.path, stat.st_size))
+                    elif stat.st_mtime < abandoned:
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+        return entries
+
+    def _evict(self):
+        """Delete least recently used files until the store fits in max_bytes"""
+        entries = sorted(self._scan())
+        total = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # another worker evicted it first
+            total -= size
+        self._approx_bytes = total
+        self._scanned_at = time.monotonic()
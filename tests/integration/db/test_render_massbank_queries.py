@@ -1,5 +1,7 @@
+import numpy as np
 import pytest
-from db import get_massbank_peaks
+from db import get_massbank_peaks, invalidate_spectrum_cache, warm_spectrum_cache
+from db.spectrum_cache import spectrum_cache
 
 
 def test_get_massbank_peaks():
@@ -19,7 +21,24 @@ def test_get_massbank_peaks_not_found():
 def test_get_massbank_peaks_case_insensitive():
     spectrum_lower = get_massbank_peaks("caffeine")[0]
     spectrum_upper = get_massbank_peaks("CAFFEINE")[0]
-    assert spectrum_lower == spectrum_upper
+    assert np.array_equal(spectrum_lower, spectrum_upper)
+
+
+def test_get_massbank_peaks_is_cached():
+    invalidate_spectrum_cache()
+    first = get_massbank_peaks("caffeine")
+    hits = spectrum_cache.stats()["hits"]
+
+    second = get_massbank_peaks("Caffeine")
+    assert spectrum_cache.stats()["hits"] == hits + 1
+    assert second[0] is first[0]
+    assert second[1:] == first[1:]
+
+
+def test_warm_spectrum_cache_loads_popular_compounds():
+    invalidate_spectrum_cache()
+    cached = warm_spectrum_cache(limit=5)
+    assert cached == spectrum_cache.stats()["entries"]
 
 
 # docker-compose exec app python -m pytest tests/ -v
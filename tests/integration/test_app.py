@@ -1,3 +1,8 @@
+import base64
+import email
+import json
+import time
+import numpy as np
 import pytest
 from app import app
 
@@ -104,6 +109,94 @@ def test_generate_audio_with_nonexistent_compound(client):
 
     assert "error" in data
     assert "No records found" in data["error"]
+    assert isinstance(data["suggestions"], list)
+
+
+def test_generate_audio_suggests_similar_compounds(client):
+    response = client.post("/massbank/linear", json={"compound": "cafeine"})
+
+    assert response.status_code == 404
+    assert "Caffeine" in response.get_json()["suggestions"]
+
+
+def test_generate_audio_with_fuzzy_uses_the_most_similar_compound(client):
+    response = client.post(
+        "/massbank/linear", json={"compound": "cafeine", "fuzzy": True, "duration": 1}
+    )
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["compound"].lower() == "caffeine"
+    assert data["fuzzy_match"]["requested"] == "cafeine"
+    assert 0 < data["fuzzy_match"]["similarity"] < 1
+
+
+def test_stream_audio_with_data(client):
+    """Test streaming endpoint returns a complete WAV body"""
+    response = client.post(
+        "/massbank/linear/stream",
+        json={"compound": "caffeine", "duration": 1, "sample_rate": 8000},
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == "audio/wav"
+    assert "caffeine" in response.headers["X-Compound"].lower()
+    assert response.headers["X-Accession"]
+
+    body = response.get_data()
+    assert body[:4] == b"RIFF"
+    assert len(body) == int(response.headers["Content-Length"]) == 44 + 2 * 8000
+
+
+def test_stream_audio_with_data_invalid_normalization(client):
+    response = client.post(
+        "/massbank/linear/stream",
+        json={"compound": "caffeine", "normalization": "loud"},
+        content_type="application/json",
+    )
+
+    assert response.status_code == 400
+    assert "Unsupported normalization" in response.get_json()["error"]
+
+
+def test_batch_audio_with_data(client):
+    """Test batch endpoint streams one NDJSON result per item"""
+    response = client.post(
+        "/massbank/linear/batch",
+        json={
+            "compounds": ["caffeine", "nonexistentcompound"],
+            "parameter_sets": [{"offset": 300}, {"offset": 400}],
+            "duration": 1,
+            "sample_rate": 8000,
+        },
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+
+    lines = response.get_data(as_text=True).splitlines()
+    results = [json.loads(line) for line in lines]
+    assert sorted(result["index"] for result in results) == [0, 1, 2, 3]
+
+    by_index = {result["index"]: result for result in results}
+    assert by_index[0]["status"] == 200
+    assert "caffeine" in by_index[0]["compound"].lower()
+    assert by_index[1]["parameters"]["offset"] == 400
+    assert by_index[2]["status"] == 404
+    assert "No records found" in by_index[3]["error"]
+
+
+def test_batch_audio_with_data_invalid_item(client):
+    response = client.post(
+        "/massbank/linear/batch",
+        json={"compounds": ["caffeine"], "parameter_sets": [{"duration": 100}]},
+        content_type="application/json",
+    )
+
+    assert response.status_code == 400
+    assert "Item 0" in response.get_json()["error"]
 
 
 def test_popular_endpoint_returns_success(client):
@@ -120,6 +213,25 @@ def test_popular_endpoint_returns_success(client):
         assert isinstance(data["popular"][0]["search_count"], int)
 
 
+def test_compounds_endpoint_searches_by_prefix(client):
+    response = client.get("/compounds?prefix=CAFF&limit=5")
+    assert response.status_code == 200
+
+    data = response.get_json()
+    assert "Caffeine" in [name for name in data["compounds"]]
+    assert all(name.lower().startswith("caff") for name in data["compounds"])
+    assert len(data["compounds"]) <= 5
+    assert data["total"] >= len(data["compounds"])
+
+    next_page = client.get("/compounds?prefix=caff&limit=5&offset=5").get_json()
+    assert not set(next_page["compounds"]) & set(data["compounds"])
+
+
+def test_compounds_endpoint_invalid_limit(client):
+    response = client.get("/compounds?limit=1000")
+    assert response.status_code == 400
+
+
 def test_history_endpoint_returns_success(client):
     response = client.get("/history")
     assert response.status_code == 200
@@ -156,7 +268,97 @@ def test_custom_linear_endpoint_success(client):
     assert data["compound"] == "Custom Compound"
     assert data["accession"] == "CUSTOM-001"
     assert "spectrum" in data
-    assert len(data["spectrum"]) == 2
+    assert len(data["spectrum"]["mz"]) == 2
+
+
+def test_custom_endpoint_spectrum_formats(client):
+    """Test that rows and packed binary carry the same spectrum as the columns"""
+    request_json = {"spectrum_text": "73.04 16.07\n75.05 2.04", "duration": 1}
+
+    columns = client.post("/custom/linear", json=request_json).get_json()["spectrum"]
+    rows = client.post(
+        "/custom/linear", json={**request_json, "spectrum_format": "rows"}
+    ).get_json()["spectrum"]
+    binary = client.post(
+        "/custom/linear", json={**request_json, "spectrum_format": "binary"}
+    ).get_json()["spectrum"]
+
+    assert rows == [
+        {name: values[i] for name, values in columns.items()} for i in range(2)
+    ]
+    assert binary["length"] == 2
+    assert [column["name"] for column in binary["columns"]][0] == "mz"
+    packed = base64.b64decode(binary["data"])
+    assert np.frombuffer(packed, dtype="<f8", count=2).tolist() == columns["mz"]
+
+
+def test_custom_endpoint_raw_wav_response(client):
+    """Test that Accept: audio/wav returns the WAV bytes without JSON"""
+    request_json = {"spectrum_text": "73.04 16.07\n75.05 2.04", "duration": 1}
+
+    json_response = client.post("/custom/linear", json=request_json)
+    wav_response = client.post(
+        "/custom/linear", json=request_json, headers={"Accept": "audio/wav"}
+    )
+
+    assert wav_response.status_code == 200
+    assert wav_response.mimetype == "audio/wav"
+    assert wav_response.headers["X-Accession"] == "CUSTOM-001"
+    assert wav_response.get_data() == base64.b64decode(
+        json_response.get_json()["audio_base64"]
+    )
+
+
+def test_generate_audio_multipart_response(client):
+    """Test that Accept: multipart/form-data returns metadata and WAV parts"""
+    response = client.post(
+        "/massbank/linear",
+        json={"compound": "caffeine", "duration": 1},
+        headers={"Accept": "multipart/form-data"},
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == "multipart/form-data"
+
+    message = email.message_from_bytes(
+        f"Content-Type: {response.headers['Content-Type']}\r\n\r\n".encode()
+        + response.get_data()
+    )
+    metadata_part, audio_part = message.get_payload()
+    metadata = json.loads(metadata_part.get_payload())
+
+    assert "caffeine" in metadata["compound"].lower()
+    assert "audio_base64" not in metadata
+    assert audio_part.get_content_type() == "audio/wav"
+    assert audio_part.get_payload(decode=True)[:4] == b"RIFF"
+
+
+def test_preview_then_full_render(client):
+    """Test that a preview links to the full render, fetchable once finished"""
+    response = client.post(
+        "/massbank/linear",
+        json={"compound": "caffeine", "duration": 10, "preview": True},
+    )
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["preview"] == {"duration": 2.0, "sample_rate": 8000}
+    assert data["audio_settings"]["duration"] == 10
+
+    for _ in range(50):
+        full_render = client.get(data["full_render"]["url"])
+        if full_render.status_code != 202:
+            break
+        time.sleep(0.2)
+
+    assert full_render.status_code == 200
+    assert full_render.mimetype == "audio/wav"
+    assert len(full_render.get_data()) == 44 + 2 * 44100 * 10
+
+
+def test_unknown_render_handle(client):
+    response = client.get("/renders/" + "0" * 64)
+    assert response.status_code == 404
 
 
 def test_custom_endpoint_missing_spectrum_text(client):
@@ -0,0 +1,113 @@
+import copy
+import hashlib
+import json
+import os
+import platform
+
+import numpy as np
+import pytest
+import scipy
+
+# Opt in with AUDIO_BENCHMARKS=1; AUDIO_BENCHMARK_UPDATE=1 rewrites the baseline, and
+# AUDIO_BENCHMARK_REQUIRE_TIMINGS=1 (CI) fails cases this machine has no timings for
+BENCHMARKS_ENABLED = os.getenv("AUDIO_BENCHMARKS") == "1"
+UPDATE_BASELINE = os.getenv("AUDIO_BENCHMARK_UPDATE") == "1"
+REQUIRE_TIMINGS = os.getenv("AUDIO_BENCHMARK_REQUIRE_TIMINGS") == "1"
+BASELINE_PATH = os.getenv(
+    "AUDIO_BENCHMARK_BASELINE",
+    os.path.join(os.path.dirname(__file__), "baseline.json"),
+)
+
+
+def cpu_model():
+    """CPU model name (platform.processor() is only the architecture on Linux)"""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def machine_fingerprint():
+    """
+    Timings are only comparable between runs on the same kind of machine. Python is
+    major.minor only, so a patch release (setup-python in CI) keeps the same timings.
+    """
+    return {
+        "machine": platform.machine(),
+        "cpu": cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "python": ".".join(platform.python_version_tuple()[:2]),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+    }
+
+
+def machine_key(fingerprint):
+    """Short stable id of a fingerprint, the key of its timings in the baseline"""
+    encoded = json.dumps(fingerprint, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:12]
+
+
+class BenchmarkBaseline:
+    """
+    Stored results plus the results of this run to write back. The file holds the peak
+    memory of every case, which is the same on any machine, and the timings of every case
+    per machine fingerprint:
+
+        {"peak_bytes": {case: bytes},
+         "seconds": {machine key: {"machine": fingerprint, "cases": {case: [seconds]}}}}
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.machine = machine_fingerprint()
+        self.key = machine_key(self.machine)
+        self.require_timings = REQUIRE_TIMINGS
+        self.stored = {"peak_bytes": {}, "seconds": {}}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.stored = json.load(f)
+        self.results = copy.deepcopy(self.stored)
+        if UPDATE_BASELINE:
+            # Re-record this machine's timings and every peak; other machines' timings stay
+            self.stored = {"peak_bytes": {}, "seconds": {}}
+            self.results["peak_bytes"] = {}
+            self.results["seconds"].pop(self.key, None)
+
+    def peak_bytes(self, case_id):
+        """Stored peak memory of a case, or None"""
+        return self.stored["peak_bytes"].get(case_id)
+
+    def seconds(self, case_id):
+        """Stored timings of a case on this machine, or None"""
+        timings = self.stored["seconds"].get(self.key, {"cases": {}})
+        return timings["cases"].get(case_id)
+
+    def record_peak_bytes(self, case_id, peak_bytes):
+        self.results["peak_bytes"][case_id] = peak_bytes
+
+    def record_seconds(self, case_id, seconds):
+        timings = self.results["seconds"].setdefault(
+            self.key, {"machine": self.machine, "cases": {}}
+        )
+        timings["cases"][case_id] = seconds
+
+    def save(self):
+        if self.results == self.stored:
+            return
+        with open(self.path, "w") as f:
+            json.dump(self.results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+@pytest.fixture(scope="session")
+def benchmark_baseline():
+    if not BENCHMARKS_ENABLED:
+        pytest.skip("benchmarks are opt-in: set AUDIO_BENCHMARKS=1")
+    baseline = BenchmarkBaseline(BASELINE_PATH)
+    yield baseline
+    baseline.save()
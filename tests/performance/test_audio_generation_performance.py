@@ -1,51 +1,146 @@
+"""
+Synthetic audio generation benchmarks (no database):
+- Seeded random spectra from 10 to 10,000 peaks, rendered across durations, sample rates,
+  algorithms and engines
+- Each case is timed REPEATS times after a warm-up run, and its peak traced memory is measured
+  in a separate run (tracemalloc slows allocation down, so it never overlaps the timing)
+- Results are compared with tests/performance/baseline.json (AUDIO_BENCHMARK_BASELINE), which
+  is committed:
+  - memory: fails when the peak grew by more than MAX_MEMORY_GROWTH; peaks are stored once,
+    they do not depend on the machine
+  - time: fails when a one-sided Welch's t-test says this run is slower (p < MAX_P_VALUE) AND
+    the median slowed down by more than MAX_SLOWDOWN; timings are stored per machine
+    fingerprint (conftest.machine_fingerprint), so only runs on a recorded machine are timed
+- Cases or machines missing from the baseline are recorded on the first run; commit the
+  updated baseline.json with the change that added them
+- CI runs the suite in the "benchmarks" job with AUDIO_BENCHMARK_REQUIRE_TIMINGS=1, so a
+  runner without timings in the baseline fails instead of silently skipping the time check;
+  the job uploads the baseline it ends with as an artifact, and committing that file adds the
+  runner's timings. After an intended slowdown or memory growth, re-record with
+  AUDIO_BENCHMARK_UPDATE=1 and commit the result (other machines' timings are kept)
+
+python -m pytest tests/performance -v                        (skipped, opt-in)
+AUDIO_BENCHMARKS=1 python -m pytest tests/performance -v      (compare / record)
+AUDIO_BENCHMARKS=1 AUDIO_BENCHMARK_UPDATE=1 python -m pytest tests/performance (re-record)
+"""
+
+import statistics
 import time
-from audio import generate_combined_wav_bytes_and_data
-from db import get_massbank_peaks
+import tracemalloc
 
+import numpy as np
+import pytest
+from scipy import stats
 
-# audio generation 9 peaks
-def test_caffeine_performance():
-    spectrum, _, _ = get_massbank_peaks("caffeine")
+from audio import FREQUENCY_ALGORITHMS, generate_combined_wav_bytes_and_data
+
+REPEATS = 7
+MAX_P_VALUE = 0.01
+MAX_SLOWDOWN = 0.15
+MAX_MEMORY_GROWTH = 0.10
 
-    start_time = time.perf_counter()
-    _, transformation_data = generate_combined_wav_bytes_and_data(
-        spectrum, algorithm="linear"
-    )
-    end_time = time.perf_counter()
-    execution_time = end_time - start_time
-    print("caffeine: ", execution_time)
 
-    assert execution_time < 0.2
-    assert len(transformation_data) == len(spectrum)
+def benchmark_cases():
+    """(peaks, duration, sample_rate, algorithm, engine) of every case"""
+    cases = [
+        (peaks, 5, 44100, algorithm, "auto")
+        for peaks in [10, 100, 1000, 10000]
+        for algorithm in FREQUENCY_ALGORITHMS
+    ]
+    cases += [(1000, duration, 44100, "linear", "auto") for duration in [1, 30]]
+    cases += [(1000, 5, sample_rate, "linear", "auto") for sample_rate in [8000, 96000]]
+    cases += [
+        (peaks, 1, 44100, "linear", engine)
+        for peaks in [100, 1000]
+        for engine in ["blocked", "wavetable", "phasor"]
+    ]
+    return cases
 
 
-# 88 peaks
-def test_ajmalin_performance():
-    spectrum, _, _ = get_massbank_peaks("Ajmalin")
+def case_id(case):
+    peaks, duration, sample_rate, algorithm, engine = case
+    return f"{peaks}peaks-{duration}s-{sample_rate}Hz-{algorithm}-{engine}"
 
-    start_time = time.perf_counter()
-    _, transformation_data = generate_combined_wav_bytes_and_data(
-        spectrum, algorithm="linear"
+
+def synthetic_spectrum(num_peaks):
+    """Seeded MassBank-like spectrum: sorted m/z in 30-1000, log-normal intensities"""
+    rng = np.random.default_rng(num_peaks)
+    mz = np.sort(rng.uniform(30, 1000, num_peaks))
+    intensities = rng.lognormal(mean=0, sigma=2, size=num_peaks)
+    return np.column_stack([mz, intensities])
+
+
+def render(spectrum, duration, sample_rate, algorithm, engine):
+    return generate_combined_wav_bytes_and_data(
+        spectrum,
+        duration=duration,
+        sample_rate=sample_rate,
+        algorithm=algorithm,
+        engine=engine,
     )
-    end_time = time.perf_counter()
-    execution_time = end_time - start_time
-    print("Ajmalin: ", execution_time)
 
-    assert execution_time < 0.5
-    assert len(transformation_data) == len(spectrum)
 
+def measure(case):
+    """Wall-clock seconds of every repeat and the peak traced memory in bytes"""
+    peaks, duration, sample_rate, algorithm, engine = case
+    spectrum = synthetic_spectrum(peaks)
+
+    render(spectrum, duration, sample_rate, algorithm, engine)  # warm-up
+    seconds = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        render(spectrum, duration, sample_rate, algorithm, engine)
+        seconds.append(time.perf_counter() - start)
 
-# 1933 peaks
-def test_cyclopyrroxanthin_performance():
-    spectrum, _, _ = get_massbank_peaks("Cyclopyrroxanthin")
+    tracemalloc.start()
+    try:
+        render(spectrum, duration, sample_rate, algorithm, engine)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
 
-    start_time = time.perf_counter()
-    _, transformation_data = generate_combined_wav_bytes_and_data(
-        spectrum, algorithm="linear"
+    return {"seconds": seconds, "peak_bytes": peak_bytes}
+
+
+@pytest.mark.parametrize("case", benchmark_cases(), ids=case_id)
+def test_audio_generation_benchmark(case, benchmark_baseline):
+    result = measure(case)
+    baseline_peak_bytes = benchmark_baseline.peak_bytes(case_id(case))
+    baseline_seconds = benchmark_baseline.seconds(case_id(case))
+
+    median = statistics.median(result["seconds"])
+    print(
+        f"{case_id(case)}: median {median * 1000:.1f} ms, "
+        f"peak {result['peak_bytes'] / 2**20:.1f} MiB"
     )
-    end_time = time.perf_counter()
-    execution_time = end_time - start_time
-    print("Cyclopyrroxanthin: ", execution_time)
 
-    assert execution_time < 9
-    assert len(transformation_data) == len(spectrum)
+    # Record what is missing first, so a failing check still leaves a complete baseline
+    if baseline_peak_bytes is None:
+        benchmark_baseline.record_peak_bytes(case_id(case), result["peak_bytes"])
+    if baseline_seconds is None:
+        benchmark_baseline.record_seconds(case_id(case), result["seconds"])
+
+    if baseline_peak_bytes is not None:
+        memory_limit = baseline_peak_bytes * (1 + MAX_MEMORY_GROWTH)
+        assert result["peak_bytes"] <= memory_limit, (
+            f"peak memory {result['peak_bytes']} B exceeds baseline "
+            f"{baseline_peak_bytes} B by more than {MAX_MEMORY_GROWTH:.0%}"
+        )
+
+    if baseline_seconds is None:
+        if benchmark_baseline.require_timings:
+            pytest.fail(
+                f"no baseline timings for this machine ({benchmark_baseline.key}): "
+                "commit the baseline.json this run recorded to enable the time check"
+            )
+        return
+
+    baseline_median = statistics.median(baseline_seconds)
+    slowdown = median / baseline_median - 1
+    _, p_value = stats.ttest_ind(
+        result["seconds"], baseline_seconds, equal_var=False, alternative="greater"
+    )
+    assert not (p_value < MAX_P_VALUE and slowdown > MAX_SLOWDOWN), (
+        f"median {median * 1000:.1f} ms is {slowdown:.0%} slower than the baseline "
+        f"{baseline_median * 1000:.1f} ms (Welch's t-test p = {p_value:.2g})"
+    )
@@ -0,0 +1,31 @@
+import io
+import pytest
+from flask import Flask
+from api.routes import BODY_CHUNK_BYTES, audio_response, bytes_chunks
+
+METADATA = {"compound": "Caffeine", "accession": "MSBNK-1", "spectrum": {}}
+
+
+def test_bytes_chunks_of_a_memoryview_are_bytes():
+    wav = io.BytesIO(bytes(range(256)) * (BODY_CHUNK_BYTES // 100)).getbuffer()
+
+    chunks = list(bytes_chunks(wav))
+
+    assert all(type(chunk) is bytes for chunk in chunks)
+    assert len(chunks) == 3
+    assert b"".join(chunks) == wav.tobytes()
+    wav.release()  # no view of the buffer is left behind
+
+
+@pytest.mark.parametrize("accept", ["audio/wav", "multipart/form-data"])
+def test_audio_response_bodies_only_hold_bytes(accept):
+    """WSGI servers (gunicorn, werkzeug) refuse body chunks that are not bytes"""
+    wav = io.BytesIO(b"RIFF....WAVE").getbuffer()
+
+    with Flask(__name__).test_request_context(headers={"Accept": accept}):
+        response = audio_response(dict(METADATA), wav, spectrum_bytes=b"\0" * 8)
+        chunks = list(response.iter_encoded())
+
+    assert all(type(chunk) is bytes for chunk in chunks)
+    assert sum(len(chunk) for chunk in chunks) == int(response.headers["Content-Length"])
+    assert b"RIFF....WAVE" in b"".join(chunks)
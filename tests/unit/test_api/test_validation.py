@@ -2,6 +2,10 @@ from api import (
     validate_algorithm,
     validate_and_parse_parameters,
     validate_spectrum_text_range,
+    validate_normalization,
+    validate_batch_request,
+    validate_render_handle,
+    validate_compound_search,
 )
 
 
@@ -358,6 +362,50 @@ def test_validate_and_parse_parameters_sample_rate_too_high():
         assert "Sample rate must be between 3500 and 192000." == str(e)
 
 
+def test_validate_and_parse_parameters_precision():
+    assert validate_and_parse_parameters({"compound": "Caffeine"})["precision"] is None
+
+    data = {"compound": "Caffeine", "precision": "float32"}
+    assert validate_and_parse_parameters(data)["precision"] == "float32"
+
+
+def test_validate_and_parse_parameters_invalid_precision():
+    data = {"compound": "Caffeine", "precision": "float16"}
+    try:
+        validate_and_parse_parameters(data)
+        assert False, "Expected ValueError to be raised"
+    except ValueError as e:
+        assert "Invalid precision. Must be 'float64' or 'float32'." == str(e)
+
+
+def test_validate_and_parse_parameters_quality():
+    assert validate_and_parse_parameters({"compound": "Caffeine"})["quality"] is None
+
+    data = {"compound": "Caffeine", "quality": "balanced"}
+    assert validate_and_parse_parameters(data)["quality"] == "balanced"
+
+
+def test_validate_and_parse_parameters_invalid_quality():
+    data = {"compound": "Caffeine", "quality": "lossless"}
+    try:
+        validate_and_parse_parameters(data)
+        assert False, "Expected ValueError to be raised"
+    except ValueError as e:
+        assert (
+            "Invalid quality. Must be 'exact', 'high', 'balanced', or 'draft'." == str(e)
+        )
+
+
+
+def test_validate_and_parse_parameters_non_string_precision_and_quality():
+    for value in [[], {}, 32, ["float32"]]:
+        for name in ["precision", "quality"]:
+            try:
+                validate_and_parse_parameters({"compound": "Caffeine", name: value})
+                assert False, "Expected ValueError to be raised"
+            except ValueError as e:
+                assert str(e).startswith(f"Invalid {name}. Must be ")
+
 # Custom compound validation tests
 
 
@@ -381,3 +429,158 @@ def test_validate_spectrum_text_range_too_long():
         assert False, "Expected ValueError to be raised"
     except ValueError as e:
         assert "Spectrum data must be between 3 and 100,000 characters." == str(e)
+
+
+# Stream validation tests
+
+
+def test_validate_normalization_valid():
+    validate_normalization("exact")
+    validate_normalization("bound")
+
+
+def test_validate_normalization_invalid():
+    try:
+        validate_normalization("loud")
+        assert False, "Expected ValueError to be raised"
+    except ValueError as e:
+        assert "Unsupported normalization" in str(e)
+
+
+# Batch validation tests
+
+
+def test_validate_batch_request_combines_compounds_and_parameter_sets():
+    items = validate_batch_request(
+        {
+            "compounds": ["caffeine", "biotin"],
+            "parameter_sets": [{"offset": 100}, {"offset": 200}],
+            "duration": 2,
+        }
+    )
+
+    assert [(item["compound"], item["offset"]) for item in items] == [
+        ("caffeine", 100),
+        ("caffeine", 200),
+        ("biotin", 100),
+        ("biotin", 200),
+    ]
+    assert all(item["duration"] == 2 for item in items)
+
+
+def test_validate_batch_request_parameter_sets_name_compounds():
+    items = validate_batch_request(
+        {"parameter_sets": [{"compound": "caffeine"}, {"compound": "biotin"}]}
+    )
+
+    assert [item["compound"] for item in items] == ["caffeine", "biotin"]
+
+
+def test_validate_batch_request_reports_failing_item():
+    try:
+        validate_batch_request({"compounds": ["caffeine", ""]})
+        assert False, "Expected ValueError to be raised"
+    except ValueError as e:
+        assert "Item 1: No compound provided" == str(e)
+
+
+def test_validate_batch_request_too_large():
+    try:
+        validate_batch_request({"compounds": ["caffeine"] * 51})
+        assert False, "Expected ValueError to be raised"
+    except ValueError as e:
+        assert "Batch is too large. Maximum is 50 items." == str(e)
+
+
+def test_validate_batch_request_requires_items():
+    try:
+        validate_batch_request({"duration": 2})
+        assert False, "Expected ValueError to be raised"
+    except ValueError as e:
+        assert "No compounds or parameter_sets provided" == str(e)
+
+
+# Preview validation tests
+
+
+def test_validate_preview_defaults_to_false():
+    result = validate_and_parse_parameters({"compound": "caffeine"})
+    assert result["preview"] is False
+
+
+def test_validate_preview_invalid():
+    try:
+        validate_and_parse_parameters({"compound": "caffeine", "preview": "yes"})
+        assert False, "Expected ValueError to be raised"
+    except ValueError as e:
+        assert "Invalid preview. Must be a boolean." == str(e)
+
+
+# Spectrum format validation tests
+
+
+def test_validate_spectrum_format_defaults_to_columns():
+    result = validate_and_parse_parameters({"compound": "caffeine"})
+    assert result["spectrum_format"] == "columns"
+
+    result = validate_and_parse_parameters(
+        {"compound": "caffeine", "spectrum_format": "rows"}
+    )
+    assert result["spectrum_format"] == "rows"
+
+
+def test_validate_spectrum_format_invalid():
+    try:
+        validate_and_parse_parameters({"compound": "caffeine", "spectrum_format": "csv"})
+        assert False, "Expected ValueError to be raised"
+    except ValueError as e:
+        assert (
+            "Invalid spectrum_format. Must be 'columns', 'rows', or 'binary'." == str(e)
+        )
+
+
+def test_validate_render_handle():
+    validate_render_handle("0123456789abcdef" * 4)
+    for handle in ["", "../etc/passwd", "0123456789ABCDEF" * 4]:
+        try:
+            validate_render_handle(handle)
+            assert False, "Expected ValueError to be raised"
+        except ValueError as e:
+            assert "Invalid render handle" == str(e)
+
+
+def test_validate_compound_search_defaults():
+    assert validate_compound_search({}) == {"prefix": "", "limit": 20, "offset": 0}
+    assert validate_compound_search(
+        {"prefix": "caff", "limit": "100", "offset": "40"}
+    ) == {"prefix": "caff", "limit": 100, "offset": 40}
+
+
+def test_validate_compound_search_invalid():
+    cases = [
+        ({"limit": "0"}, "Limit must be between 1 and 100."),
+        ({"limit": "101"}, "Limit must be between 1 and 100."),
+        ({"offset": "-1"}, "Offset must not be negative."),
+        ({"limit": "ten"}, "Invalid limit or offset. Must be integers."),
+        ({"prefix": "a" * 350}, "Prefix must be at most 349 characters."),
+    ]
+    for args, message in cases:
+        try:
+            validate_compound_search(args)
+            assert False, "Expected ValueError to be raised"
+        except ValueError as e:
+            assert message == str(e)
+
+
+def test_validate_fuzzy_defaults_to_false():
+    params = validate_and_parse_parameters({"compound": "caffeine"})
+    assert params["fuzzy"] is False
+    assert validate_and_parse_parameters({"compound": "x", "fuzzy": True})["fuzzy"]
+
+
+def test_validate_fuzzy_invalid():
+    try:
+        validate_and_parse_parameters({"compound": "caffeine", "fuzzy": "yes"})
+        assert False, "Expected ValueError to be raised"
+    except ValueError as e:
+        assert "Invalid fuzzy. Must be a boolean." == str(e)
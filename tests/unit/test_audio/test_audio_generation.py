@@ -1,6 +1,12 @@
+import pytest
 from audio import (
     generate_sine_wave,
     generate_combined_wav_bytes_and_data,
+    generate_wav_stream_and_data,
+    wav_file_size,
+    wav_header,
+    encode_wav,
+    TransformedSpectrum,
 )
 import numpy as np
 
@@ -49,7 +55,7 @@ def test_generate_combined_wav_bytes_and_data_basic():
     assert len(content) > 0
 
     # Should return transformation data
-    assert isinstance(transformed_data, list)
+    assert isinstance(transformed_data, TransformedSpectrum)
     assert len(transformed_data) == 2  # Same length as input spectrum
 
     # Each data point should have expected fields
@@ -59,3 +65,99 @@ def test_generate_combined_wav_bytes_and_data_basic():
         assert "intensity" in item
         assert "amplitude_linear" in item
         assert "amplitude_db" in item
+
+
+def test_generate_combined_wav_bytes_and_data_blocked_matches_loop():
+    """Test that the blocked engine produces byte-identical WAV output to the per-peak loop"""
+    spectrum_data = [(50 + 7.3 * i, (i * 37) % 101 + 1) for i in range(150)]
+    spectrum_data.append((-400, 50))  # non-positive frequency, never rendered
+
+    loop_wav, loop_data = generate_combined_wav_bytes_and_data(
+        spectrum_data, duration=0.1, sample_rate=8000, engine="loop"
+    )
+
+    for block_size, chunk_size in [(1, 100), (7, 333), (64, 4096), (500, 10000)]:
+        blocked_wav, blocked_data = generate_combined_wav_bytes_and_data(
+            spectrum_data,
+            duration=0.1,
+            sample_rate=8000,
+            engine="blocked",
+            block_size=block_size,
+            chunk_size=chunk_size,
+        )
+        assert blocked_wav.getvalue() == loop_wav.getvalue()
+        assert blocked_data == loop_data
+
+
+def test_generate_combined_wav_bytes_and_data_unknown_engine():
+    """Test that an unknown synthesis engine raises ValueError"""
+    with pytest.raises(ValueError, match="Unknown synthesis engine"):
+        generate_combined_wav_bytes_and_data([(100, 1)], engine="bogus")
+
+
+# streaming tests
+def test_generate_wav_stream_and_data_matches_in_memory_wav():
+    """Test that the exact-normalized stream yields the same bytes as the in-memory WAV"""
+    spectrum_data = [(100, 0.5), (200, 0.3), (333.3, 1.0)]
+
+    wav_buffer, transformed_data = generate_combined_wav_bytes_and_data(
+        spectrum_data, duration=0.5, sample_rate=8000
+    )
+    wav_chunks, stream_data = generate_wav_stream_and_data(
+        spectrum_data, duration=0.5, sample_rate=8000, chunk_size=1000
+    )
+
+    chunks = list(wav_chunks)
+    assert len(chunks) == 1 + 4  # header, then 4000 samples in 1000-sample chunks
+    assert b"".join(chunks) == wav_buffer.getvalue()
+    assert stream_data == transformed_data
+
+
+def test_generate_wav_stream_and_data_bound_normalization():
+    """Test that bound normalization never exceeds the exact peak and keeps the WAV size"""
+    spectrum_data = [(100, 0.5), (200, 0.3), (333.3, 1.0)]
+
+    exact_chunks, _ = generate_wav_stream_and_data(
+        spectrum_data, duration=0.5, sample_rate=8000
+    )
+    bound_chunks, _ = generate_wav_stream_and_data(
+        spectrum_data, duration=0.5, sample_rate=8000, normalization="bound"
+    )
+
+    exact = b"".join(exact_chunks)
+    bound = b"".join(bound_chunks)
+    assert len(bound) == len(exact) == wav_file_size(4000)
+    assert bound[:44] == exact[:44]
+
+    bound_samples = np.frombuffer(bound[44:], dtype=np.int16)
+    exact_samples = np.frombuffer(exact[44:], dtype=np.int16)
+    assert np.max(np.abs(bound_samples)) <= np.max(np.abs(exact_samples))
+
+
+def test_generate_wav_stream_and_data_unknown_normalization():
+    """Test that an unknown normalization raises ValueError"""
+    with pytest.raises(ValueError, match="Unknown normalization"):
+        generate_wav_stream_and_data([(100, 1)], normalization="loud")
+
+
+# encode wav tests
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_encode_wav_matches_scipy(dtype):
+    """Test that in-place encoding gives the bytes scipy's writer gave for the same wave"""
+    import io
+    from scipy.io.wavfile import write
+
+    wave = (np.random.default_rng(3).standard_normal(5000) * 1234).astype(dtype)
+    expected = io.BytesIO()
+    write(
+        expected,
+        8000,
+        np.int16(wave / np.max(np.abs(wave)) * np.iinfo(np.int16).max),
+    )
+
+    assert encode_wav(wave.copy(), 8000).getvalue() == expected.getvalue()
+
+
+def test_encode_wav_silence_and_empty():
+    assert encode_wav(np.zeros(10), 8000).getvalue()[44:] == bytes(20)
+    assert encode_wav(np.zeros(0), 8000).getvalue() == wav_header(0, 8000)
@@ -1,7 +1,12 @@
+import pytest
+import numpy as np
 from audio import (
     mz_to_frequency_linear,
     mz_to_frequency_inverse,
     mz_to_frequency_modulo,
+    FREQUENCY_ALGORITHMS,
+    algorithm_parameter_defaults,
+    get_frequency_algorithm,
 )
 
 
@@ -90,3 +95,46 @@ def test_mz_to_frequency_modulo_custom_all():
     assert (
         mz_to_frequency_modulo(8, factor=7, modulus=50, base=300) == 306
     )  # ((8 * 7) % 50) + 300
+
+
+# registry tests
+def test_registry_declares_algorithm_parameters():
+    """Test that every algorithm declares its parameters and defaults"""
+    assert list(FREQUENCY_ALGORITHMS) == ["linear", "inverse", "modulo"]
+    assert FREQUENCY_ALGORITHMS["inverse"].parameters == {"scale": 100000, "shift": 1}
+    assert algorithm_parameter_defaults() == {
+        "offset": 300,
+        "scale": 100000,
+        "shift": 1,
+        "factor": 10,
+        "modulus": 500,
+        "base": 100,
+    }
+
+
+def test_vectorized_mapping_matches_scalar_functions():
+    """Test that mapping a whole m/z array equals mapping one value at a time"""
+    mz = np.array([0.0, 20.5, 99.0, 1234.5678])
+
+    linear = get_frequency_algorithm("linear").to_frequencies(mz, offset=12.5)
+    inverse = get_frequency_algorithm("inverse").to_frequencies(mz, scale=5000)
+    modulo = get_frequency_algorithm("modulo").to_frequencies(mz, modulus=-70, base=1)
+
+    assert linear.tolist() == [mz_to_frequency_linear(m, offset=12.5) for m in mz]
+    assert inverse.tolist() == [mz_to_frequency_inverse(m, scale=5000) for m in mz]
+    assert modulo.tolist() == [
+        mz_to_frequency_modulo(m, modulus=-70, base=1) for m in mz.tolist()
+    ]
+
+
+def test_non_finite_frequencies_rejected():
+    """Test that a zero modulus or mz = -shift raises instead of producing NaN/inf"""
+    with pytest.raises(ValueError, match="non-finite frequencies"):
+        get_frequency_algorithm("modulo").to_frequencies(np.array([10.0]), modulus=0)
+    with pytest.raises(ValueError, match="non-finite frequencies"):
+        get_frequency_algorithm("inverse").to_frequencies(np.array([1.0]), shift=-1)
+
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError, match="Unknown algorithm: fourier"):
+        get_frequency_algorithm("fourier")
@@ -0,0 +1,112 @@
+import os
+import pytest
+import numpy as np
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+from audio import generate_combined_wav_bytes_and_data
+from audio.parallel import (
+    get_process_pool,
+    partition_samples,
+    render_oscillator_bank_parallel,
+)
+
+
+# partitioning tests
+def test_partitions_cover_samples_on_chunk_boundaries():
+    """Test that partitions are contiguous, complete and start on chunk boundaries"""
+    partitions = partition_samples(100_000, workers=3, chunk_size=4096)
+
+    assert partitions[0][0] == 0
+    assert partitions[-1][1] == 100_000
+    for (_, stop), (start, _) in zip(partitions, partitions[1:]):
+        assert stop == start
+    assert all(start % 4096 == 0 for start, _ in partitions)
+    assert len(partitions) == 3
+
+
+def test_partition_size_is_configurable():
+    """Test that an explicit partition size is rounded up to whole chunks"""
+    partitions = partition_samples(10_000, workers=2, chunk_size=1000, partition_size=2500)
+
+    assert partitions == [(0, 3000), (3000, 6000), (6000, 9000), (9000, 10_000)]
+
+
+# parallel render tests
+@pytest.mark.parametrize("engine,dtype", [("blocked", np.float64), ("phasor", np.float32)])
+def test_parallel_render_matches_serial(engine, dtype):
+    """Test that the process pool produces exactly the serial waveform"""
+    rng = np.random.default_rng(0)
+    frequencies = rng.uniform(20, 5000, 40)
+    intensities = rng.uniform(0, 1, 40)
+    num_samples = 20_000
+    options = {"chunk_size": 1024, "dtype": dtype}
+
+    serial = render_oscillator_bank_parallel(
+        engine, frequencies, intensities, 1 / 8000, num_samples, workers=1, **options
+    )
+    with patch("audio.parallel.PARALLEL_MIN_WORK", 0):
+        parallel = render_oscillator_bank_parallel(
+            engine, frequencies, intensities, 1 / 8000, num_samples, workers=2, **options
+        )
+
+    assert parallel.dtype == serial.dtype
+    np.testing.assert_array_equal(parallel, serial)
+
+
+def test_broken_process_pool_is_replaced():
+    """Test that a pool whose process died is dropped and the render still succeeds"""
+    rng = np.random.default_rng(1)
+    frequencies = rng.uniform(20, 5000, 20)
+    intensities = rng.uniform(0, 1, 20)
+    args = ("blocked", frequencies, intensities, 1 / 8000, 10_000)
+
+    broken = get_process_pool(2)
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(os._exit, 1).result()
+
+    serial = render_oscillator_bank_parallel(*args, workers=1, chunk_size=1024)
+    with patch("audio.parallel.PARALLEL_MIN_WORK", 0):
+        parallel = render_oscillator_bank_parallel(*args, workers=2, chunk_size=1024)
+
+    np.testing.assert_array_equal(parallel, serial)
+    assert get_process_pool(2) is not broken
+
+
+def test_render_falls_back_to_serial_when_every_pool_breaks():
+    """Test that two broken pools in a row end in a serial render, not an error"""
+    rng = np.random.default_rng(2)
+    frequencies = rng.uniform(20, 5000, 20)
+    intensities = rng.uniform(0, 1, 20)
+    args = ("blocked", frequencies, intensities, 1 / 8000, 10_000)
+
+    class BrokenPool:
+        def submit(self, *args, **kwargs):
+            raise BrokenProcessPool("a child process terminated abruptly")
+
+        def shutdown(self, **kwargs):
+            pass
+
+    serial = render_oscillator_bank_parallel(*args, workers=1, chunk_size=1024)
+    with patch("audio.parallel.PARALLEL_MIN_WORK", 0), patch(
+        "audio.parallel.get_process_pool", return_value=BrokenPool()
+    ) as get_pool:
+        parallel = render_oscillator_bank_parallel(*args, workers=2, chunk_size=1024)
+
+    np.testing.assert_array_equal(parallel, serial)
+    assert get_pool.call_count == 2
+
+
+def test_small_renders_stay_serial():
+    """Test that renders below the work threshold never touch the process pool"""
+    with patch("audio.parallel.get_process_pool") as get_pool:
+        wav_buffer, _ = generate_combined_wav_bytes_and_data(
+            [(100, 100), (200, 50)], duration=0.1, sample_rate=8000, workers=4
+        )
+
+    get_pool.assert_not_called()
+    assert len(wav_buffer.getvalue()) == 44 + 2 * 800
+
+
+def test_negative_workers_rejected():
+    with pytest.raises(ValueError, match="workers"):
+        render_oscillator_bank_parallel("blocked", [100.0], [1.0], 1 / 8000, 800, workers=-1)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from audio import plan_peaks, generate_combined_wav_bytes_and_data
+
+
+def test_plan_peaks_exact_only_skips_non_positive_frequencies():
+    """Test that the exact preset renders every peak with freq > 0, in order"""
+    frequencies = [300, -5, 0, 30000, 400]
+    intensities = [1.0, 0.5, 0.5, 1e-9, 0.2]
+
+    rendered_frequencies, rendered_intensities, rendered = plan_peaks(
+        frequencies, intensities, 44100, 5, quality="exact"
+    )
+
+    assert rendered.tolist() == [True, False, False, True, True]
+    assert rendered_frequencies.tolist() == [300, 30000, 400]
+    assert rendered_intensities.tolist() == [1.0, 1e-9, 0.2]
+
+
+def test_plan_peaks_drops_inaudible_and_aliased_peaks():
+    """Test that peaks below the floor or above Nyquist are not rendered"""
+    frequencies = [300, 500, 30000, 700]
+    intensities = [1.0, 1e-6, 0.5, 0.1]
+
+    rendered_frequencies, _, rendered = plan_peaks(
+        frequencies, intensities, 44100, 5, quality="balanced"
+    )
+
+    assert rendered.tolist() == [True, False, False, True]
+    assert rendered_frequencies.tolist() == [300, 700]
+
+
+def test_plan_peaks_merges_unresolvable_peaks():
+    """Test that peaks closer than 1 / duration Hz are merged into one partial"""
+    frequencies = [400.0, 400.1, 400.3, 410.0]
+    intensities = [0.5, 0.25, 0.25, 1.0]
+
+    rendered_frequencies, rendered_intensities, rendered = plan_peaks(
+        frequencies, intensities, 44100, 2, quality="balanced"
+    )
+
+    assert rendered.all()
+    assert rendered_frequencies.tolist() == pytest.approx([400.1, 410.0])
+    assert rendered_intensities.tolist() == pytest.approx([1.0, 1.0])
+
+
+def test_plan_peaks_unknown_quality():
+    """Test that an unknown quality preset raises ValueError"""
+    with pytest.raises(ValueError, match="Unknown quality"):
+        plan_peaks([300], [1.0], 44100, 5, quality="lossless")
+
+
+def test_generate_combined_wav_bytes_and_data_reports_rendered_flags():
+    """Test that every original peak is reported, flagged by whether it was rendered"""
+    spectrum_data = [(100, 100), (100.01, 50), (25000, 80), (200, 0.00001)]
+
+    _, transformed_data = generate_combined_wav_bytes_and_data(
+        spectrum_data, duration=0.5, sample_rate=8000, quality="balanced"
+    )
+
+    assert len(transformed_data) == 4
+    assert [row["rendered"] for row in transformed_data] == [True, True, False, False]
+
+
+def test_plan_peaks_close_to_exact_output_on_dense_spectrum():
+    """Test that a planned render of a dense spectrum stays close to the exact render"""
+    rng = np.random.default_rng(0)
+    mz = np.sort(rng.uniform(50, 500, 1000))
+    intensity = rng.pareto(1.5, 1000)
+    spectrum_data = list(zip(mz.tolist(), intensity.tolist()))
+
+    exact_wav, _ = generate_combined_wav_bytes_and_data(
+        spectrum_data, duration=0.5, sample_rate=8000, quality="exact"
+    )
+    planned_wav, planned_data = generate_combined_wav_bytes_and_data(
+        spectrum_data, duration=0.5, sample_rate=8000, quality="high"
+    )
+
+    exact = np.frombuffer(exact_wav.getvalue()[44:], dtype=np.int16) / 32767
+    planned = np.frombuffer(planned_wav.getvalue()[44:], dtype=np.int16) / 32767
+    assert np.sqrt(np.mean((exact - planned) ** 2)) < 0.05
+    assert sum(row["rendered"] for row in planned_data) < len(planned_data)
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from audio import parse_spectrum_text, generate_combined_wav_bytes_and_data
+from audio.spectrum_parsing import detect_spectrum_layout
+
+EXPECTED = [[73.04, 16.07], [75.05, 2.04]]
+
+
+@pytest.mark.parametrize(
+    "layout, text",
+    [
+        ("pairs", "73.04 16.07\n75.05 2.04"),
+        ("pairs", "  73.04 16.07 75.05\r\n2.04\n"),
+        (
+            "massbank",
+            "ACCESSION: MSBNK-TEST\nCH$NAME: 1,3,7-Trimethylxanthine\n"
+            "PK$NUM_PEAK: 2\nPK$PEAK: m/z int. rel.int.\n"
+            "  73.04 16.07 999\n  75.05 2.04 127\n//\n",
+        ),
+        (
+            "mgf",
+            "BEGIN IONS\nTITLE=caffeine\nPEPMASS=195.09 1000\nCHARGE=1+\n\n"
+            "73.04 16.07\n75.05\t2.04\nEND IONS\n",
+        ),
+        ("csv", "mz,intensity\n73.04,16.07\n75.05, 2.04\n"),
+        ("csv", "73.04;16.07\r\n75.05;2.04\r\n"),
+    ],
+)
+def test_parse_spectrum_text_layouts(layout, text):
+    """Test that every supported layout parses to the same contiguous float64 array"""
+    peaks = parse_spectrum_text(text)
+
+    assert detect_spectrum_layout(text)[0] == layout
+    assert isinstance(peaks, np.ndarray)
+    assert peaks.dtype == np.float64
+    assert peaks.flags["C_CONTIGUOUS"]
+    assert peaks.tolist() == EXPECTED
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ("73.04 16.07\n75.05 abc", "'abc' (token 4, line 2, column 7) is not a number"),
+        ("73.04 16.07 75.05", "must have an even number of values"),
+        ("mz,int\n1,2\n3,x\n", "'x' (intensity of peak 2, line 3, column 3)"),
+        ("mz,int\n1,2\n3\n", "line 3 needs an m/z and an intensity value"),
+        ("100, 200 300, 400", "line 1 has 4 values, expected an m/z and an intensity"),
+        ("1;2\n3;4;5\n", "line 2 has 3 values"),
+        ("BEGIN IONS\n1 2\n3 4 1+\nEND IONS\n", "line 3 has 3 values"),
+        (
+            "PK$PEAK: m/z int. rel.int.\n  1 2 3\n  4 5 6 7\n//\n",
+            "line 3 has 4 values",
+        ),
+        (
+            "BEGIN IONS\n1 2\nEND IONS\nBEGIN IONS\n1 2\nEND IONS\n",
+            "MGF text holds more than one spectrum",
+        ),
+    ],
+)
+def test_parse_spectrum_text_reports_offending_token(text, message):
+    with pytest.raises(ValueError, match="Invalid spectrum data format") as error:
+        parse_spectrum_text(text)
+    assert message in str(error.value)
+
+
+def test_parsed_array_renders_like_tuples():
+    """Test that the pipeline takes the parsed array as-is, with identical output"""
+    text = "\n".join(f"{50 + 3.7 * i} {(i * 37) % 101 + 1}" for i in range(60))
+    peaks = parse_spectrum_text(text)
+    tuples = [tuple(peak) for peak in peaks.tolist()]
+
+    array_wav, array_data = generate_combined_wav_bytes_and_data(
+        peaks, duration=0.1, sample_rate=8000
+    )
+    tuple_wav, tuple_data = generate_combined_wav_bytes_and_data(
+        tuples, duration=0.1, sample_rate=8000
+    )
+
+    assert array_wav.getvalue() == tuple_wav.getvalue()
+    assert array_data == tuple_data
@@ -0,0 +1,249 @@
+import pytest
+import numpy as np
+from audio import (
+    generate_combined_wav_bytes_and_data,
+    measure_snr_db,
+    PHASOR_ERROR_BOUND,
+)
+from audio.synthesis import (
+    BlockSineBank,
+    IfftSineBank,
+    PhasorSineBank,
+    WavetableSineBank,
+    render_oscillator_bank,
+    select_engine,
+)
+
+
+def wav_samples(wav_buffer):
+    """int16 samples of a 44-byte-header mono WAV"""
+    return np.frombuffer(wav_buffer.getvalue()[44:], dtype=np.int16)
+
+
+# phasor engine tests
+def test_phasor_bank_within_error_bound():
+    """Test that the phasor engine stays within its documented bound of the exact engine"""
+    rng = np.random.default_rng(0)
+    frequencies = rng.uniform(20, 20000, 200)
+    intensities = rng.uniform(0, 1, 200)
+    num_samples = 48000 * 2
+    time_step = 2 / num_samples
+
+    exact = render_oscillator_bank(
+        BlockSineBank(frequencies, intensities, time_step), num_samples
+    )
+    phasor = render_oscillator_bank(
+        PhasorSineBank(frequencies, intensities, time_step), num_samples
+    )
+
+    bound = PHASOR_ERROR_BOUND * np.iinfo(np.int16).max * intensities.sum()
+    assert np.max(np.abs(phasor - exact)) <= bound
+
+
+def test_phasor_bank_range_independent():
+    """Test that rendering a range on its own matches the same range of a full render"""
+    bank = PhasorSineBank([440.0, 1234.5], [1.0, 0.5], 1 / 8000, table_size=64)
+    full = render_oscillator_bank(bank, 8000, chunk_size=1000)
+
+    part = np.zeros(777)
+    bank.render_into(part, 3001)
+
+    np.testing.assert_allclose(part, full[3001:3778], rtol=0, atol=1e-6)
+
+
+def test_phasor_engine_int16_within_one_lsb():
+    """Test that the phasor engine's WAV output is within 1 LSB of the exact path"""
+    spectrum_data = [(50 + 11.7 * i, (i * 37) % 101 + 1) for i in range(300)]
+
+    exact_wav, exact_data = generate_combined_wav_bytes_and_data(
+        spectrum_data, duration=1, sample_rate=22050, engine="blocked"
+    )
+    phasor_wav, phasor_data = generate_combined_wav_bytes_and_data(
+        spectrum_data, duration=1, sample_rate=22050, engine="phasor"
+    )
+
+    exact = wav_samples(exact_wav).astype(np.int32)
+    phasor = wav_samples(phasor_wav).astype(np.int32)
+    assert np.max(np.abs(exact - phasor)) <= 1
+    assert phasor_data == exact_data
+
+
+# inverse-FFT engine tests
+def test_ifft_bank_within_error_bound():
+    """Test that the ifft engine renders off-bin frequencies within the phasor bound"""
+    rng = np.random.default_rng(0)
+    frequencies = rng.uniform(20, 20000, 200)
+    frequencies[:2] = [-440.3, 31234.5]  # negative and above Nyquist
+    intensities = rng.uniform(0, 1, 200)
+    num_samples = 48000 * 2 - 1
+    time_step = 2 / num_samples
+
+    exact = render_oscillator_bank(
+        BlockSineBank(frequencies, intensities, time_step), num_samples
+    )
+    ifft = render_oscillator_bank(
+        IfftSineBank(frequencies, intensities, time_step, num_samples=num_samples),
+        num_samples,
+    )
+
+    bound = PHASOR_ERROR_BOUND * np.iinfo(np.int16).max * intensities.sum()
+    assert np.max(np.abs(ifft - exact)) <= bound
+
+
+def test_ifft_bank_snr_against_exact_engine():
+    """Test that the ifft engine is as accurate as the phasor bound (>= 120 dB)"""
+    rng = np.random.default_rng(1)
+    frequencies = rng.uniform(20, 20000, 1000)
+    intensities = rng.lognormal(0, 2, 1000)
+    num_samples = 44100
+    time_step = 1 / num_samples
+    exact = BlockSineBank(frequencies, intensities, time_step)
+
+    snr = measure_snr_db(
+        IfftSineBank(frequencies, intensities, time_step, num_samples=num_samples),
+        exact,
+        num_samples,
+    )
+
+    assert snr >= -20 * np.log10(PHASOR_ERROR_BOUND)
+
+
+def test_ifft_bank_renders_exact_pitch():
+    """Test that an off-bin frequency is not moved to the nearest FFT bin"""
+    num_samples = 4000
+    time_step = 1 / 8000
+    bank = IfftSineBank([440.1], [1.0], time_step, num_samples=num_samples)
+
+    expected = np.iinfo(np.int16).max * np.sin(
+        2 * np.pi * 440.1 * np.arange(num_samples) * time_step
+    )
+    np.testing.assert_allclose(bank.waveform, expected, rtol=0, atol=1e-6)
+
+
+def test_select_engine():
+    """Test that auto selection depends on peak count and duration"""
+    assert select_engine(10, 44100 * 30) == "blocked"
+    assert select_engine(2000, 44100 * 5) == "ifft"
+    assert select_engine(2000, 192000 * 30) == "phasor"
+
+
+def test_generate_combined_wav_bytes_and_data_auto_engine():
+    """Test that the auto engine renders a spectrum with valid output"""
+    spectrum_data = [(50 + 0.5 * i, i + 1) for i in range(400)]
+
+    wav_buffer, transformed_data = generate_combined_wav_bytes_and_data(
+        spectrum_data, duration=0.5, sample_rate=8000, engine="auto"
+    )
+
+    samples = wav_samples(wav_buffer)
+    assert len(samples) == 4000
+    assert np.max(np.abs(samples)) == np.iinfo(np.int16).max
+    assert len(transformed_data) == 400
+
+
+# wavetable engine tests
+def test_wavetable_bank_snr_against_exact_engine():
+    """Test that both interpolations are far above int16 resolution (~96 dB)"""
+    rng = np.random.default_rng(0)
+    frequencies = rng.uniform(20, 20000, 100)
+    intensities = rng.uniform(0, 1, 100)
+    num_samples = 48000
+    time_step = 1 / num_samples
+    exact = BlockSineBank(frequencies, intensities, time_step)
+
+    linear = measure_snr_db(
+        WavetableSineBank(frequencies, intensities, time_step), exact, num_samples
+    )
+    cubic = measure_snr_db(
+        WavetableSineBank(frequencies, intensities, time_step, interpolation="cubic"),
+        exact,
+        num_samples,
+    )
+
+    assert linear > 120
+    assert cubic > linear
+
+
+def test_wavetable_bank_negative_frequencies():
+    """Test that negative frequencies render as sign-flipped sines, like np.sin"""
+    frequencies = np.array([-440.0, 1000.0])
+    intensities = np.array([1.0, 0.5])
+    exact = BlockSineBank(frequencies, intensities, 1 / 8000)
+    wavetable = WavetableSineBank(frequencies, intensities, 1 / 8000)
+
+    assert measure_snr_db(wavetable, exact, 8000) > 120
+
+
+def test_wavetable_engine_int16_within_one_lsb():
+    """Test that the selectable wavetable engine matches the exact path to 1 LSB"""
+    spectrum_data = [(20 + 13.1 * i, (i * 53) % 97 + 1) for i in range(100)]
+
+    exact, _ = generate_combined_wav_bytes_and_data(
+        spectrum_data, duration=1, sample_rate=22050
+    )
+    wavetable, _ = generate_combined_wav_bytes_and_data(
+        spectrum_data, duration=1, sample_rate=22050, engine="wavetable"
+    )
+
+    difference = wav_samples(wavetable).astype(int) - wav_samples(exact).astype(int)
+    assert np.max(np.abs(difference)) <= 1
+
+
+def test_wavetable_bank_rejects_unknown_interpolation():
+    with pytest.raises(ValueError, match="Unknown interpolation"):
+        WavetableSineBank([440.0], [1.0], 1 / 8000, interpolation="sinc")
+
+
+# float32 precision tests
+def test_float32_int16_within_one_lsb_of_float64():
+    """Test that float32 synthesis stays within 1 LSB of the float64 path for every engine"""
+    spectrum_data = [(20 + 13.1 * i, (i * 53) % 97 + 1) for i in range(300)]
+    spectrum_data.append((999_000, 80))  # high frequency, large phase values
+
+    for engine in ["blocked", "phasor", "ifft"]:
+        wav64, data64 = generate_combined_wav_bytes_and_data(
+            spectrum_data, duration=2, sample_rate=22050, engine=engine
+        )
+        wav32, data32 = generate_combined_wav_bytes_and_data(
+            spectrum_data,
+            duration=2,
+            sample_rate=22050,
+            engine=engine,
+            precision="float32",
+        )
+
+        samples64 = wav_samples(wav64).astype(np.int32)
+        samples32 = wav_samples(wav32).astype(np.int32)
+        assert np.max(np.abs(samples64 - samples32)) <= 1, engine
+        assert data32 == data64
+
+
+def test_float32_phase_accurate_for_long_durations():
+    """Test that float32 phase stays accurate at the end of a 30 s render"""
+    frequencies = [19_999.9, 440.0]
+    intensities = [1.0, 0.5]
+    num_samples = 48000 * 30
+    time_step = 30 / num_samples
+
+    exact = np.zeros(4800)
+    reduced = np.zeros(4800, dtype=np.float32)
+    BlockSineBank(frequencies, intensities, time_step).render_into(
+        exact, num_samples - 4800
+    )
+    BlockSineBank(frequencies, intensities, time_step, dtype=np.float32).render_into(
+        reduced, num_samples - 4800
+    )
+
+    assert np.max(np.abs(reduced - exact)) < 1.0  # int16 units
+
+
+def test_loop_engine_rejects_float32():
+    """Test that the float64 reference engine refuses reduced precision"""
+    with pytest.raises(ValueError, match="only renders in float64"):
+        generate_combined_wav_bytes_and_data([(100, 1)], engine="loop", precision="float32")
+
+
+def test_unknown_precision():
+    """Test that an unknown precision raises ValueError"""
+    with pytest.raises(ValueError, match="Unknown precision"):
+        generate_combined_wav_bytes_and_data([(100, 1)], precision="float16")
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from audio import TransformedSpectrum, generate_transformed_data, transform_spectrum
+
+
+def test_transform_spectrum_returns_columns():
+    """Test that every field is a NumPy column with one entry per peak"""
+    transformed_data, _, _ = transform_spectrum([(100, 50), (200, 100), (300, 0)])
+
+    assert isinstance(transformed_data, TransformedSpectrum)
+    assert len(transformed_data) == 3
+    assert transformed_data.mz.tolist() == [100, 200, 300]
+    assert transformed_data.frequency.tolist() == [400, 500, 600]
+    assert transformed_data.amplitude_linear.tolist() == [0.5, 1.0, 0.0]
+    assert transformed_data.amplitude_db[1] == 0
+    assert transformed_data.amplitude_db[2] == -np.inf
+    assert transformed_data.rendered is None
+
+
+def test_transformed_spectrum_rows_match_columns():
+    """Test that the rows compatibility shape holds the same values as the columns"""
+    transformed_data = generate_transformed_data([(100, 50), (200, 100)])
+    columns = transformed_data.to_columns()
+    rows = transformed_data.to_rows()
+
+    assert list(columns) == [
+        "mz",
+        "frequency",
+        "intensity",
+        "amplitude_linear",
+        "amplitude_db",
+        "rendered",
+    ]
+    assert rows == [
+        {name: values[i] for name, values in columns.items()} for i in range(2)
+    ]
+    assert rows[1] == transformed_data[1]
+    assert list(transformed_data) == rows
+    assert rows[0]["rendered"] is True
+
+
+def test_transformed_spectrum_binary_round_trip():
+    """Test that packed columns decode back to the same spectrum"""
+    transformed_data = generate_transformed_data(
+        [(50 + 3.1 * i, i % 7) for i in range(40)], quality="draft"
+    )
+    packed = transformed_data.to_bytes()
+
+    assert len(packed) == 40 * (5 * 8 + 1)
+    assert TransformedSpectrum.from_bytes(packed, 40) == transformed_data
+    assert np.frombuffer(packed, dtype="<f8", count=40).tolist() == (
+        transformed_data.mz.tolist()
+    )
+
+
+def test_transformed_spectrum_encode():
+    transformed_data = generate_transformed_data([(100, 1)])
+
+    assert transformed_data.encode("columns") == transformed_data.to_columns()
+    assert transformed_data.encode("rows") == transformed_data.to_rows()
+    assert transformed_data.encode("binary") == {
+        "length": 1,
+        "columns": [
+            {"name": "mz", "dtype": "<f8"},
+            {"name": "frequency", "dtype": "<f8"},
+            {"name": "intensity", "dtype": "<f8"},
+            {"name": "amplitude_linear", "dtype": "<f8"},
+            {"name": "amplitude_db", "dtype": "<f8"},
+            {"name": "rendered", "dtype": "|u1"},
+        ],
+    }
+    with pytest.raises(ValueError, match="Unknown spectrum format"):
+        transformed_data.encode("csv")
@@ -0,0 +1,155 @@
+import pytest
+import services.compound_service as compound_service
+from db import CompoundNameIndex
+from db.compound_index import TrigramIndex, trigram_keys
+from services import CompoundDataService
+
+ROWS = [
+    ("caffeine", "MSBNK-2", "Caffeine"),
+    ("caffeic acid", "MSBNK-1", "Caffeic acid"),
+    ("camphor", "MSBNK-3", "CAMPHOR"),
+    ("acetanilide", "MSBNK-1", "Acetanilide"),
+    ("ß-alanine", "MSBNK-4", "ß-Alanine"),
+]
+
+
+def test_resolve_ignores_case():
+    index = CompoundNameIndex.from_rows(ROWS)
+
+    assert len(index) == 5
+    assert index.resolve("CAFFEINE") == ("MSBNK-2", "Caffeine")
+    assert index.resolve("ß-ALANINE") == ("MSBNK-4", "ß-Alanine")
+    assert index.resolve("caffein") is None
+    assert index.find("camphor") is not None
+
+
+def test_names_are_keyed_by_python_lower_case():
+    # Postgres LOWER() of "ΟΞΟΣ" ends in "σ"; str.lower() ends in the final sigma "ς"
+    index = CompoundNameIndex.from_rows(
+        [("οξοσ", "MSBNK-6", "ΟΞΟΣ"), ("οξοσ", "MSBNK-5", "ΟΞΟΣ")]
+    )
+
+    assert len(index) == 1
+    assert index.resolve("ΟΞΟΣ") == ("MSBNK-5", "ΟΞΟΣ")
+    assert index.resolve("οξος") == ("MSBNK-5", "ΟΞΟΣ")
+
+
+def test_search_prefix_pages_through_sorted_matches():
+    index = CompoundNameIndex.from_rows(ROWS)
+
+    assert index.search_prefix("CAF", limit=10) == (["Caffeic acid", "Caffeine"], 2)
+    assert index.search_prefix("ca", limit=2) == (["Caffeic acid", "Caffeine"], 3)
+    assert index.search_prefix("ca", limit=2, offset=2) == (["CAMPHOR"], 3)
+    assert index.search_prefix("ca", limit=2, offset=10) == ([], 3)
+    assert index.search_prefix("x", limit=10) == ([], 0)
+
+
+def test_empty_prefix_matches_every_name():
+    names, total = CompoundNameIndex.from_rows(ROWS).search_prefix("", limit=1)
+    assert names == ["Acetanilide"]
+    assert total == 5
+
+
+def test_empty_index():
+    index = CompoundNameIndex.from_rows([])
+    assert index.resolve("caffeine") is None
+    assert index.search_prefix("", limit=10) == ([], 0)
+
+
+def test_unknown_names_are_rejected_without_the_database(monkeypatch):
+    def get_massbank_peaks(compound_name):
+        raise AssertionError("the database was queried")
+
+    monkeypatch.setattr(compound_service, "get_massbank_peaks", get_massbank_peaks)
+    monkeypatch.setattr(
+        compound_service, "load_compound_index", lambda: CompoundNameIndex.from_rows(ROWS)
+    )
+    service = CompoundDataService(peak_store_directory="")
+    service.load_name_index()
+
+    with pytest.raises(ValueError, match="No records found"):
+        service.get_compound_spectrum("caffein")
+    assert service.search_compounds("caf", limit=1) == {
+        "compounds": ["Caffeic acid"],
+        "total": 2,
+    }
+
+
+def test_non_ascii_index_misses_fall_through_to_the_database(monkeypatch):
+    queried = []
+
+    def get_massbank_peaks(compound_name):
+        queried.append(compound_name)
+        return [(195.08, 999)], "MSBNK-7", "ΟΞΟΣ"
+
+    monkeypatch.setattr(compound_service, "get_massbank_peaks", get_massbank_peaks)
+    monkeypatch.setattr(
+        compound_service, "load_compound_index", lambda: CompoundNameIndex.from_rows(ROWS)
+    )
+    service = CompoundDataService(peak_store_directory="")
+    service.load_name_index()
+
+    assert service.get_compound_spectrum("οξοσ")["accession"] == "MSBNK-7"
+    assert queried == ["οξοσ"]
+
+
+def test_trigrams_of_similar_names_overlap():
+    keys, positions = trigram_keys(["ab", "ab"])
+    assert len(keys) == 2 * 3  # "  a", " ab", "ab "
+    assert list(positions) == [0, 0, 0, 1, 1, 1]
+    assert list(keys[:3]) == list(keys[3:])
+
+
+def test_search_similar_ranks_near_matches():
+    index = CompoundNameIndex.from_rows(ROWS)
+
+    matches = index.search_similar("cafeine", limit=5)
+    assert [name for name, _ in matches] == ["Caffeine"]
+    assert 0.3 <= matches[0][1] < 1
+    assert index.search_similar("CAFFEINE", limit=1) == [("Caffeine", 1.0)]
+    assert index.search_similar("zzzzzz", limit=5) == []
+    assert CompoundNameIndex.from_rows([]).search_similar("caffeine", limit=5) == []
+
+
+def test_search_similar_limits_results():
+    index = CompoundNameIndex.from_rows(ROWS)
+
+    matches = index.search_similar("ca", limit=2, min_similarity=0.01)
+    assert len(matches) == 2
+    assert matches[0][1] >= matches[1][1]
+
+
+def test_fuzzy_lookup_uses_the_most_similar_name(monkeypatch):
+    spectra = {"caffeine": ([[195.08, 999.0]], "MSBNK-2", "Caffeine")}
+
+    def get_massbank_peaks(compound_name):
+        if compound_name.lower() not in spectra:
+            raise ValueError("No records found")
+        return spectra[compound_name.lower()]
+
+    monkeypatch.setattr(compound_service, "get_massbank_peaks", get_massbank_peaks)
+    monkeypatch.setattr(
+        compound_service, "load_compound_index", lambda: CompoundNameIndex.from_rows(ROWS)
+    )
+    service = CompoundDataService(peak_store_directory="")
+
+    data = service.get_compound_spectrum("cafeine", fuzzy=True)
+    assert data["compound_name"] == "Caffeine"
+    assert data["fuzzy_match"]["requested"] == "cafeine"
+
+    assert "fuzzy_match" not in service.get_compound_spectrum("caffeine", fuzzy=True)
+    with pytest.raises(ValueError, match="No records found"):
+        service.get_compound_spectrum("cafeine")
+    with pytest.raises(ValueError, match="No records found"):
+        service.get_compound_spectrum("zzzzzz", fuzzy=True)
+
+
+def test_chunked_trigram_build_matches_a_single_chunk():
+    index = CompoundNameIndex.from_rows(ROWS)
+
+    whole = TrigramIndex.build(index.names, chunk_size=len(index))
+    chunked = TrigramIndex.build(index.names, chunk_size=2)
+    for field in ["trigrams", "offsets", "postings", "trigram_counts"]:
+        assert (getattr(whole, field) == getattr(chunked, field)).all()
+    assert chunked.postings.dtype == chunked.trigram_counts.dtype == "int32"
+    assert chunked.search("cafeine", 5, 0.3) == whole.search("cafeine", 5, 0.3)
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from db import PeakStore, build_peak_store
+from db.compound_index import TrigramIndex
+from services import CompoundDataService
+
+
+def packed(*peaks):
+    return memoryview(np.array(peaks, dtype=">f8").tobytes())
+
+
+class FakeCursor:
+    """Answers the two export queries of build_peak_store"""
+
+    def __init__(self):
+        self.rows = []
+
+    def execute(self, query):
+        if "spectrum_data" in query:
+            self.rows = [
+                ("MSBNK-2", packed(138.06, 12.5, 195.0877, 999)),
+                ("MSBNK-1", packed(110.07, 40)),
+            ]
+        else:
+            self.rows = [
+                ("caffeine", "MSBNK-2", "Caffeine"),
+                ("acetanilide", "MSBNK-1", "Acetanilide"),
+                ("no peaks", "MSBNK-3", "No Peaks"),
+            ]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def fetchall(self):
+        return list(self.rows)
+
+
+@pytest.fixture
+def store_directory(tmp_path):
+    directory = tmp_path / "peaks"
+    build_peak_store(str(directory), FakeCursor())
+    return str(directory)
+
+
+def test_peak_store_lookup_ignores_case(store_directory):
+    store = PeakStore(store_directory)
+
+    spectrum, accession, compound_name = store.lookup("CAFFEINE")
+    assert np.array_equal(spectrum, [[138.06, 12.5], [195.0877, 999]])
+    assert spectrum.dtype == np.float64
+    assert not spectrum.flags.writeable
+    assert (accession, compound_name) == ("MSBNK-2", "Caffeine")
+    assert store.lookup("aspirin") is None
+
+
+def test_peak_store_keeps_accessions_without_peaks(store_directory):
+    store = PeakStore(store_directory)
+
+    spectrum, accession, _ = store.lookup("No Peaks")
+    assert spectrum.shape == (0, 2)
+    assert accession == "MSBNK-3"
+    assert np.array_equal(store.get_peaks("MSBNK-1"), [[110.07, 40]])
+    assert store.get_peaks("MSBNK-9") is None
+    assert store.meta["peaks"] == 3
+
+
+def test_peak_store_holds_the_trigram_index(store_directory, monkeypatch):
+    def build(*args, **kwargs):
+        raise AssertionError("the trigram index was built")
+
+    monkeypatch.setattr(TrigramIndex, "build", build)
+    store = PeakStore(store_directory)
+
+    assert store.name_index.search_similar("cafeine", limit=5)[0][0] == "Caffeine"
+
+
+def test_rebuilding_replaces_the_store(store_directory):
+    meta = build_peak_store(store_directory, FakeCursor())
+    assert meta["compounds"] == 3
+    assert PeakStore(store_directory).lookup("acetanilide") is not None
+
+
+def test_open_without_a_store_returns_none(tmp_path):
+    assert PeakStore.open(None) is None
+    assert PeakStore.open(str(tmp_path)) is None
+
+
+def test_compound_service_reads_from_the_peak_store(store_directory):
+    service = CompoundDataService(peak_store_directory=store_directory)
+
+    data = service.get_compound_spectrum("Caffeine")
+    assert data["accession"] == "MSBNK-2"
+    assert len(data["spectrum"]) == 2
+
+    with pytest.raises(ValueError, match="No records found"):
+        service.get_compound_spectrum("aspirin")
+
+    spectra = service.get_compound_spectra(["ACETANILIDE", "aspirin"])
+    assert spectra["ACETANILIDE"]["compound_name"] == "Acetanilide"
+    assert spectra["aspirin"] is None
+
+    assert service.search_compounds("a", limit=10) == {
+        "compounds": ["Acetanilide"],
+        "total": 1,
+    }
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+import db.render_massbank_queries as render_queries
+from db import SpectrumCache, get_massbank_peaks, invalidate_spectrum_cache
+from db.spectrum_cache import spectrum_cache
+
+
+def peaks(*rows):
+    return np.array(rows, dtype=np.float64).reshape(-1, 2)
+
+
+@pytest.fixture
+def no_database(monkeypatch):
+    def get_connection():
+        raise AssertionError("the database was queried")
+
+    monkeypatch.setattr(render_queries, "get_connection", get_connection)
+    invalidate_spectrum_cache()
+    yield
+    invalidate_spectrum_cache()
+
+
+def test_spectrum_cache_lookups_ignore_case():
+    cache = SpectrumCache(max_entries=10)
+    cache.put("Caffeine", peaks((195.08, 999)), "MSBNK-1", "Caffeine")
+
+    spectrum, accession, compound_name = cache.get("CAFFEINE")
+    assert np.array_equal(spectrum, peaks((195.08, 999)))
+    assert (accession, compound_name) == ("MSBNK-1", "Caffeine")
+    assert cache.get("aspirin") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_spectrum_cache_evicts_least_recently_used():
+    cache = SpectrumCache(max_entries=2)
+    cache.put("a", peaks((1, 1)), "A", "a")
+    cache.put("b", peaks((2, 2)), "B", "b")
+    cache.get("a")
+    cache.put("c", peaks((3, 3)), "C", "c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cached_peaks_are_read_only():
+    cache = SpectrumCache(max_entries=1)
+    cache.put("caffeine", peaks((195.08, 999)), "MSBNK-1", "Caffeine")
+
+    spectrum, _, _ = cache.get("caffeine")
+    with pytest.raises(ValueError):
+        spectrum[0, 1] = 0
+
+
+def test_disabled_spectrum_cache_stores_nothing():
+    cache = SpectrumCache(max_entries=0)
+    cache.put("caffeine", peaks((195.08, 999)), "MSBNK-1", "Caffeine")
+    assert cache.get("caffeine") is None
+
+
+def test_get_massbank_peaks_answers_cached_names_without_the_database(no_database):
+    spectrum_cache.put("caffeine", peaks((195.08, 999)), "MSBNK-1", "Caffeine")
+
+    spectrum, accession, compound_name = get_massbank_peaks("CAFFEINE")
+    assert np.array_equal(spectrum, peaks((195.08, 999)))
+    assert (accession, compound_name) == ("MSBNK-1", "Caffeine")
+
+    found = render_queries.get_massbank_peaks_bulk(["caffeine", "Caffeine"])
+    assert list(found) == ["caffeine"]
+
+
+def test_invalidate_spectrum_cache_forgets_every_name(no_database):
+    spectrum_cache.put("caffeine", peaks((195.08, 999)), "MSBNK-1", "Caffeine")
+    invalidate_spectrum_cache()
+
+    with pytest.raises(ValueError):
+        get_massbank_peaks("caffeine")
+
+
+def test_decode_peaks_reads_packed_big_endian_float8():
+    packed = memoryview(np.array([195.0877, 999, 138.06, 12.5], dtype=">f8").tobytes())
+
+    spectrum = render_queries.decode_peaks(packed)
+    assert spectrum.dtype == np.float64
+    assert spectrum.flags.c_contiguous
+    assert np.array_equal(spectrum, peaks((195.0877, 999), (138.06, 12.5)))
+
+
+def test_decode_peaks_of_an_accession_without_peaks():
+    assert render_queries.decode_peaks(None).shape == (0, 2)
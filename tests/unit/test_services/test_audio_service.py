@@ -0,0 +1,149 @@
+import threading
+import weakref
+import pytest
+import services.audio_service as audio_service
+from services import AudioGenerationService
+
+PARAMETERS = {
+    "offset": 300,
+    "scale": 100000,
+    "shift": 1,
+    "factor": 10,
+    "modulus": 500,
+    "base": 100,
+    "duration": 0.1,
+    "sample_rate": 8000,
+    "precision": None,
+    "quality": None,
+}
+
+
+# batch rendering tests
+def test_audio_service_batch_yields_every_item():
+    service = AudioGenerationService(cache_max_bytes=0, batch_workers=2)
+    jobs = [
+        ([(100.0, 1.0)], "linear", PARAMETERS, None),
+        ([(200.0, 1.0)], "linear", dict(PARAMETERS, duration=0.2), None),
+        ([(100.0, 1.0)], "unknown", PARAMETERS, None),
+    ]
+
+    results = {
+        index: (result, error)
+        for index, result, error in service.generate_audio_batch(jobs)
+    }
+
+    assert sorted(results) == [0, 1, 2]
+    assert results[0][1] is None
+    assert results[0][0] == service.generate_audio_from_spectrum(*jobs[0])
+    assert results[2][0] is None
+    assert isinstance(results[2][1], Exception)
+
+
+
+def test_audio_service_batch_releases_yielded_results(monkeypatch):
+    """Earlier results are freed while the batch is still streaming"""
+
+    class Result:
+        pass
+
+    service = AudioGenerationService(cache_max_bytes=0, batch_workers=1)
+    monkeypatch.setattr(service, "generate_audio_from_spectrum", lambda *job: Result())
+    batch = service.generate_audio_batch([()] * 3)
+
+    _, first, _ = next(batch)
+    released = weakref.ref(first)
+    del first
+    next(batch)
+
+    assert released() is None
+    batch.close()
+
+# preview rendering tests
+def test_preview_parameters_are_capped():
+    service = AudioGenerationService(cache_max_bytes=0)
+    full = dict(PARAMETERS, duration=30, sample_rate=96000)
+
+    preview = service.preview_parameters(full)
+
+    assert preview["duration"] == 2.0
+    assert preview["sample_rate"] == 8000
+    assert preview["quality"] == "draft"
+    assert full["duration"] == 30
+
+
+def test_preview_starts_full_render_fetchable_by_handle():
+    service = AudioGenerationService(cache_max_bytes=10_000_000, batch_workers=1)
+    spectrum = [(100.0, 1.0), (200.0, 0.5)]
+    full = dict(PARAMETERS, duration=3)
+
+    preview = service.generate_preview_from_spectrum(spectrum, "linear", full)
+    # One batch worker: this no-op runs after the background render finished
+    service.batch_pool.submit(lambda: None).result()
+
+    status, wav_bytes = service.get_full_render(preview["handle"])
+    expected = service.generate_audio_from_spectrum(spectrum, "linear", full)
+
+    assert len(preview["wav_bytes"]) == 44 + 2 * 8000 * 2
+    assert preview["transformed_data"] == expected["transformed_data"]
+    assert status == "done"
+    assert wav_bytes == expected["wav_bytes"]
+
+
+def test_unknown_full_render_handle():
+    service = AudioGenerationService(cache_max_bytes=10_000_000)
+
+    assert service.get_full_render("0" * 64) == ("unknown", None)
+    assert service.cache_stats()["misses"] == 0
+
+
+def test_previews_need_a_render_store_with_several_server_workers():
+    service = AudioGenerationService(cache_max_bytes=0, server_workers=2)
+
+    with pytest.raises(ValueError, match="RENDER_STORE_DIR"):
+        service.generate_preview_from_spectrum([(100.0, 1.0)], "linear", PARAMETERS)
+
+
+def test_oldest_queued_full_renders_are_cancelled(monkeypatch):
+    monkeypatch.setattr(audio_service, "MAX_QUEUED_FULL_RENDERS", 2)
+    service = AudioGenerationService(cache_max_bytes=10_000_000, batch_workers=1)
+    release = threading.Event()
+    busy = service.batch_pool.submit(release.wait, 5)
+
+    handles = [
+        service.start_full_render([(100.0 + i, 1.0)], "linear", PARAMETERS)
+        for i in range(3)
+    ]
+    release.set()
+    busy.result()
+    service.batch_pool.submit(lambda: None).result()
+
+    assert service.get_full_render(handles[0]) == (
+        "failed",
+        audio_service.CANCELLED_RENDER_ERROR,
+    )
+    assert [service.get_full_render(h)[0] for h in handles[1:]] == ["done", "done"]
+
+
+def test_full_render_is_stored_again_after_store_eviction(tmp_path):
+    """A render cache hit must still leave the full render in the store for its handle"""
+    service = AudioGenerationService(
+        cache_max_bytes=10_000_000, store_directory=str(tmp_path), batch_workers=1
+    )
+    spectrum = [(100.0, 1.0), (200.0, 0.5)]
+    full = dict(PARAMETERS, duration=3)
+    expected = service.generate_audio_from_spectrum(spectrum, "linear", full, "MSBNK-1")
+
+    # The store evicted the file, the render cache still holds the result
+    handle = audio_service.render_store_key(
+        spectrum, service._output_options("linear", full)
+    )
+    (tmp_path / handle[:2] / f"{handle}.wav").unlink()
+
+    preview = service.generate_preview_from_spectrum(spectrum, "linear", full, "MSBNK-1")
+    service.batch_pool.submit(lambda: None).result()
+
+    status, wav_bytes = service.get_full_render(preview["handle"])
+    assert preview["handle"] == handle
+    assert status == "done"
+    assert wav_bytes == expected["wav_bytes"]
+    wav_bytes.close()
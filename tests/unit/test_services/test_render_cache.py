@@ -0,0 +1,111 @@
+import numpy as np
+from audio import TransformedSpectrum
+from services import AudioGenerationService, RenderCache
+from services.render_cache import estimate_render_size
+
+
+def make_render(payload_bytes, rows=0):
+    transformed_data = TransformedSpectrum(*[np.zeros(rows)] * 5)
+    return {"wav_bytes": b"A" * payload_bytes, "transformed_data": transformed_data}
+
+
+# render cache tests
+def test_render_cache_hit_and_miss_counters():
+    cache = RenderCache(max_bytes=10_000)
+    render = make_render(100)
+
+    assert cache.get("caffeine") is None
+    cache.put("caffeine", render)
+    assert cache.get("caffeine") is render
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    assert stats["bytes"] == estimate_render_size(render)
+
+
+def test_render_cache_peek_is_not_counted():
+    cache = RenderCache(max_bytes=10_000)
+    render = make_render(100)
+
+    assert cache.peek("caffeine") is None
+    cache.put("caffeine", render)
+    assert cache.peek("caffeine") is render
+
+    stats = cache.stats()
+    assert stats["hits"] == 0
+    assert stats["misses"] == 0
+
+
+def test_render_cache_evicts_least_recently_used():
+    cache = RenderCache(max_bytes=3_000)
+    cache.put("a", make_render(1_000))
+    cache.put("b", make_render(1_000))
+    cache.put("c", make_render(1_000))
+
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("d", make_render(1_000))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= 3_000
+
+
+def test_render_cache_skips_oversized_entries():
+    cache = RenderCache(max_bytes=1_000)
+    cache.put("huge", make_render(2_000))
+
+    assert cache.get("huge") is None
+    assert cache.stats()["entries"] == 0
+
+
+# audio service caching tests
+PARAMETERS = {
+    "offset": 300,
+    "scale": 100000,
+    "shift": 1,
+    "factor": 10,
+    "modulus": 500,
+    "base": 100,
+    "duration": 0.1,
+    "sample_rate": 8000,
+    "precision": None,
+    "quality": None,
+}
+
+
+def test_audio_service_caches_massbank_renders():
+    service = AudioGenerationService(cache_max_bytes=1_000_000)
+    spectrum = [(100.0, 1.0), (200.0, 0.5)]
+
+    first = service.generate_audio_from_spectrum(
+        spectrum, "linear", PARAMETERS, accession="MSBNK-TEST"
+    )
+    second = service.generate_audio_from_spectrum(
+        spectrum, "linear", PARAMETERS, accession="MSBNK-TEST"
+    )
+
+    assert second is first
+    assert service.cache_stats()["hits"] == 1
+    assert service.cache_stats()["misses"] == 1
+
+
+def test_audio_service_cache_key_ignores_irrelevant_parameters():
+    service = AudioGenerationService(cache_max_bytes=1_000_000)
+
+    linear_key = service.render_cache_key("MSBNK-TEST", "linear", PARAMETERS)
+    other_scale = dict(PARAMETERS, scale=5)
+    other_offset = dict(PARAMETERS, offset=5)
+
+    assert service.render_cache_key("MSBNK-TEST", "linear", other_scale) == linear_key
+    assert service.render_cache_key("MSBNK-TEST", "linear", other_offset) != linear_key
+
+
+def test_audio_service_does_not_cache_custom_spectra():
+    service = AudioGenerationService(cache_max_bytes=1_000_000)
+    service.generate_audio_from_spectrum([(100.0, 1.0)], "linear", PARAMETERS)
+
+    assert service.cache_stats()["entries"] == 0
+    assert service.cache_stats()["misses"] == 0
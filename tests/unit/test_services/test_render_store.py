@@ -0,0 +1,111 @@
+import mmap
+import os
+import time
+from unittest.mock import patch
+import services.render_store as render_store
+from services import AudioGenerationService, RenderStore
+from services.render_store import render_store_key
+
+
+# render store tests
+def test_render_store_round_trip(tmp_path):
+    store = RenderStore(str(tmp_path), max_bytes=10_000)
+
+    assert store.get("ab" * 32) is None
+    store.put("ab" * 32, b"RIFF....WAVE")
+
+    with store.get("ab" * 32) as wav:
+        assert wav[:] == b"RIFF....WAVE"
+    # No temp files are left behind by the atomic write
+    assert os.listdir(tmp_path / "ab") == [f"{'ab' * 32}.wav"]
+
+
+def test_render_store_evicts_least_recently_used(tmp_path):
+    store = RenderStore(str(tmp_path), max_bytes=2_500)
+    store.put("aa" * 32, b"a" * 1_000)
+    store.put("bb" * 32, b"b" * 1_000)
+    os.utime(store.path_for("aa" * 32), (1, 1))
+    os.utime(store.path_for("bb" * 32), (2, 2))
+
+    store.get("aa" * 32).close()  # "bb" is now the least recently used
+    store.put("cc" * 32, b"c" * 1_000)
+
+    assert store.get("bb" * 32) is None
+    assert store.get("aa" * 32) is not None
+    assert store.get("cc" * 32) is not None
+
+
+def test_render_store_counts_files_written_by_other_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(render_store, "RESCAN_INTERVAL_SECONDS", 0)
+    first_worker = RenderStore(str(tmp_path), max_bytes=2_500)
+    second_worker = RenderStore(str(tmp_path), max_bytes=2_500)
+    first_worker.put("aa" * 32, b"a" * 1_000)
+    first_worker.put("bb" * 32, b"b" * 1_000)
+    os.utime(first_worker.path_for("aa" * 32), (1, 1))
+
+    second_worker.put("cc" * 32, b"c" * 1_000)
+
+    assert second_worker.get("aa" * 32) is None
+    assert second_worker.get("bb" * 32) is not None
+
+
+def test_render_store_deletes_abandoned_temp_files(tmp_path):
+    os.makedirs(tmp_path / "ab")
+    abandoned = tmp_path / "ab" / "crashed.tmp"
+    in_progress = tmp_path / "ab" / "writing.tmp"
+    abandoned.write_bytes(b"RIFF")
+    in_progress.write_bytes(b"RIFF")
+    old = time.time() - render_store.TEMP_FILE_MAX_AGE_SECONDS - 1
+    os.utime(abandoned, (old, old))
+
+    RenderStore(str(tmp_path), max_bytes=10_000)
+
+    assert sorted(os.listdir(tmp_path / "ab")) == ["writing.tmp"]
+
+
+def test_render_store_key_depends_on_spectrum_and_options():
+    options = {"algorithm": "linear", "duration": 1}
+
+    key = render_store_key([(100.0, 1.0)], options)
+
+    assert render_store_key([(100.0, 1.0)], dict(options)) == key
+    assert render_store_key([(100.0, 0.5)], options) != key
+    assert render_store_key([(100.0, 1.0)], dict(options, duration=2)) != key
+
+
+# audio service store tests
+PARAMETERS = {
+    "offset": 300,
+    "scale": 100000,
+    "shift": 1,
+    "factor": 10,
+    "modulus": 500,
+    "base": 100,
+    "duration": 0.1,
+    "sample_rate": 8000,
+    "precision": None,
+    "quality": None,
+}
+
+
+def test_audio_service_reuses_stored_renders_across_instances(tmp_path):
+    spectrum = [(100.0, 1.0), (200.0, 0.5)]
+    first_worker = AudioGenerationService(
+        cache_max_bytes=0, store_directory=str(tmp_path)
+    )
+    second_worker = AudioGenerationService(
+        cache_max_bytes=0, store_directory=str(tmp_path)
+    )
+
+    rendered = first_worker.generate_audio_from_spectrum(spectrum, "linear", PARAMETERS)
+    with patch(
+        "services.audio_service.generate_combined_wav_bytes_and_data"
+    ) as render:
+        stored = second_worker.generate_audio_from_spectrum(
+            spectrum, "linear", PARAMETERS
+        )
+
+    render.assert_not_called()
+    assert stored == rendered
+    # The stored file is mapped, not copied
+    assert isinstance(stored["wav_bytes"], mmap.mmap)
@@ -0,0 +1,129 @@
+import os
+import subprocess
+import sys
+import threading
+from flask import Flask, Response
+from prometheus_client import REGISTRY, multiprocess
+from utils.metrics import (
+    clear_multiprocess_dir,
+    init_request_metrics,
+    metrics_response,
+    query_timer,
+    size_bucket,
+    start_background_task,
+)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_size_bucket_rounds_up_to_a_power_of_ten():
+    assert size_bucket(0) == "10"
+    assert size_bucket(7) == "10"
+    assert size_bucket(10) == "10"
+    assert size_bucket(11) == "100"
+    assert size_bucket(220500) == "1000000"
+
+
+def test_query_timer_observes_the_named_query():
+    before = sample("db_query_duration_seconds_count", query="test_query")
+    with query_timer("test_query"):
+        pass
+    assert sample("db_query_duration_seconds_count", query="test_query") == before + 1
+
+
+def test_query_timer_observes_failed_queries():
+    before = sample("db_query_duration_seconds_count", query="test_failing")
+    try:
+        with query_timer("test_failing"):
+            raise RuntimeError("connection lost")
+    except RuntimeError:
+        pass
+    assert sample("db_query_duration_seconds_count", query="test_failing") == before + 1
+
+
+def test_background_task_is_counted_until_it_returns():
+    release = threading.Event()
+    done = threading.Event()
+
+    def task():
+        release.wait(5)
+        done.set()
+
+    start_background_task("test_task", task)
+    assert sample("background_tasks", task="test_task") == 1
+
+    release.set()
+    assert done.wait(5)
+    for _ in range(100):
+        if sample("background_tasks", task="test_task") == 0:
+            break
+        threading.Event().wait(0.01)
+    assert sample("background_tasks", task="test_task") == 0
+
+
+def test_request_latency_is_labelled_by_url_rule():
+    app = Flask(__name__)
+    init_request_metrics(app)
+
+    @app.route("/massbank/<algorithm>")
+    def render(algorithm):
+        return Response(iter([b"RIFF", b"data"]))
+
+    labels = {"method": "GET", "route": "/massbank/<algorithm>", "status": "200"}
+    before = sample("http_request_duration_seconds_count", **labels)
+
+    response = app.test_client().get("/massbank/linear")
+    assert response.data == b"RIFFdata"
+    response.close()
+
+    assert sample("http_request_duration_seconds_count", **labels) == before + 1
+    assert sample("http_request_duration_seconds_count", route="/massbank/linear") == 0
+
+
+def test_unmatched_requests_are_not_observed():
+    app = Flask(__name__)
+    init_request_metrics(app)
+
+    response = app.test_client().get("/no-such-route")
+    assert response.status_code == 404
+
+
+def test_metrics_response_is_prometheus_text():
+    body, content_type = metrics_response()
+    assert content_type.startswith("text/plain")
+    assert b"# TYPE http_request_duration_seconds histogram" in body
+    assert b"# TYPE db_pool_connections gauge" in body
+
+
+RECORD_METRICS = """
+from utils.metrics import BACKGROUND_TASKS, SPECTRUM_CACHE_REQUESTS
+SPECTRUM_CACHE_REQUESTS.labels("hit").inc(3)
+BACKGROUND_TASKS.labels("webhook").inc()
+"""
+
+
+def test_metrics_response_sums_every_worker_process(tmp_path, monkeypatch):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+    workers = [
+        subprocess.Popen([sys.executable, "-c", RECORD_METRICS], cwd=root, env=env)
+        for _ in range(2)
+    ]
+    for worker in workers:
+        assert worker.wait(60) == 0
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    body, _ = metrics_response()
+    assert b'spectrum_cache_requests_total{result="hit"} 6.0' in body
+    assert b'background_tasks{task="webhook"} 2.0' in body
+
+    # A dead worker's live gauges are dropped, its counters are kept
+    multiprocess.mark_process_dead(workers[0].pid, str(tmp_path))
+    body, _ = metrics_response()
+    assert b'spectrum_cache_requests_total{result="hit"} 6.0' in body
+    assert b'background_tasks{task="webhook"} 1.0' in body
+
+    clear_multiprocess_dir()
+    assert os.listdir(tmp_path) == []
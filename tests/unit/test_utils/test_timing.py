@@ -0,0 +1,66 @@
+import json
+import time
+from flask import Flask, Response
+from utils.timing import RequestTimings, init_request_timing, timed
+
+
+def make_app(enabled):
+    app = Flask(__name__)
+    init_request_timing(app, enabled=enabled)
+
+    @app.route("/render")
+    def render():
+        with timed("synthesis"):
+            time.sleep(0.01)
+
+        def body():
+            for _ in range(3):
+                with timed("base64"):
+                    chunk = b"AAAA"
+                yield chunk
+
+        return Response(body())
+
+    return app
+
+
+def test_timed_is_a_no_op_outside_timed_requests():
+    with timed("synthesis") as stage:
+        pass
+    assert not hasattr(stage, "timings")
+
+
+def test_request_timings_add_up_repeated_stages():
+    timings = RequestTimings()
+    timings.add("base64", 0.001)
+    timings.add("base64", 0.002)
+    timings.add("synthesis", 0.5)
+
+    assert list(timings.stages) == ["base64", "synthesis"]
+    assert timings.server_timing().startswith("base64;dur=3.00, synthesis;dur=500.00, ")
+    assert "total;dur=" in timings.server_timing()
+
+
+def test_server_timing_header_and_log_line(capsys):
+    response = make_app(enabled=True).test_client().get("/render")
+    assert response.get_data() == b"AAAA" * 3
+    response.close()
+
+    header = response.headers["Server-Timing"]
+    assert header.startswith("synthesis;dur=")
+    assert "total;dur=" in header
+
+    line = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert line["event"] == "request_timing"
+    assert line["path"] == "/render"
+    assert line["status"] == 200
+    assert line["stages_ms"]["synthesis"] >= 10
+    assert "base64" in line["stages_ms"]  # streamed after the header was sent
+
+
+def test_timing_disabled_adds_nothing(capsys):
+    response = make_app(enabled=False).test_client().get("/render")
+    response.close()
+
+    assert "Server-Timing" not in response.headers
+    assert capsys.readouterr().out == ""
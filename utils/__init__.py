@@ -1,3 +1,13 @@
 from .webhook import send_webhook_notification
+from .timing import timed, init_request_timing, RequestTimings
+from .metrics import init_request_metrics, metrics_response, start_background_task
 
-__all__ = ["send_webhook_notification"]
+__all__ = [
+    "send_webhook_notification",
+    "timed",
+    "init_request_timing",
+    "RequestTimings",
+    "init_request_metrics",
+    "metrics_response",
+    "start_background_task",
+]
@@ -0,0 +1,152 @@
+"""
+Prometheus Metrics (GET /metrics):
+- Every gunicorn worker keeps its own metric values; with PROMETHEUS_MULTIPROC_DIR set (see
+  gunicorn.conf.py) they are written to files in that directory and /metrics sums all workers'
+  files, so any worker answers for the whole server
+- Gauges are summed over live workers only ("livesum"): a dead worker's in-use connections or
+  queued threads are not counted again
+- Without PROMETHEUS_MULTIPROC_DIR (flask dev server, tests) the values of this process are
+  reported
+
+Label values are bounded: routes are URL rules ("/massbank/<algorithm>"), render sizes are
+powers of ten, queries are fixed names.
+"""
+
+import math
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Emptied by the server process when it starts (clear_multiprocess_dir); workers and other
+# importers (pytest) only need it to exist
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request until its response body is sent",
+    ["method", "route", "status"],
+)
+RENDER_DURATION = Histogram(
+    "audio_render_duration_seconds",
+    "Synthesis and encoding time of a render, by peak count and sample count",
+    ["peaks_le", "samples_le"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+RENDER_CACHE_REQUESTS = Counter(
+    "render_cache_requests_total",
+    "In-process render cache lookups",
+    ["result"],
+)
+SPECTRUM_CACHE_REQUESTS = Counter(
+    "spectrum_cache_requests_total",
+    "In-process compound spectrum cache lookups",
+    ["result"],
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Time spent executing and fetching a database query",
+    ["query"],
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Database connections in use, and threads waiting for one",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+BACKGROUND_TASKS = Gauge(
+    "background_tasks",
+    "Background threads started and not finished yet (search logging, webhooks)",
+    ["task"],
+    multiprocess_mode="livesum",
+)
+
+
+def clear_multiprocess_dir():
+    """
+    Delete the metric files of a previous run from PROMETHEUS_MULTIPROC_DIR. Called once
+    when the server starts, before any worker records a value: files left by dead processes
+    would otherwise be summed into /metrics, live gauges included.
+    """
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+
+
+def size_bucket(count):
+    """Smallest power of ten >= count, as a label value"""
+    return str(10 ** max(1, math.ceil(math.log10(max(count, 1)))))
+
+
+def observe_render(seconds, num_peaks, num_samples):
+    RENDER_DURATION.labels(size_bucket(num_peaks), size_bucket(num_samples)).observe(
+        seconds
+    )
+
+
+@contextmanager
+def query_timer(query):
+    """Time a database query under a fixed name"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        DB_QUERY_LATENCY.labels(query).observe(time.perf_counter() - start)
+
+
+def start_background_task(task, target, *args):
+    """Run target(*args) on a daemon thread, counted in background_tasks until it returns"""
+    gauge = BACKGROUND_TASKS.labels(task)
+    gauge.inc()
+
+    def run():
+        try:
+            target(*args)
+        finally:
+            gauge.dec()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def metrics_response():
+    """(body, content type) of the Prometheus text exposition for every worker"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        from prometheus_client import REGISTRY as registry
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_request_metrics(app):
+    """Observe the latency of every request of a Flask app, by URL rule"""
+    from flask import request
+
+    @app.before_request
+    def _start_request_timer():
+        request.environ["metrics.start"] = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        start = request.environ.get("metrics.start")
+        if start is None or request.url_rule is None:
+            return response
+        labels = REQUEST_LATENCY.labels(
+            request.method, request.url_rule.rule, str(response.status_code)
+        )
+        # Streamed bodies are still being sent: observe when the response is closed
+        response.call_on_close(lambda: labels.observe(time.perf_counter() - start))
+        return response
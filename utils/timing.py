@@ -0,0 +1,142 @@
+"""
+Request Timing (enabled with REQUEST_TIMING=1):
+- Code anywhere on a request's thread wraps a stage in `with timed("synthesis"):`; a stage that
+  runs more than once (e.g. base64 chunks) adds up under its name
+- The stages finished by the time the view returns go out in a Server-Timing header (browser
+  devtools show them under the request's Timing tab), plus "total"
+- When the response is closed, after streamed bodies are fully sent, one JSON line with every
+  stage (including those that ran while streaming) is printed
+
+Disabled, timed() is a context variable lookup returning a shared no-op context manager.
+"""
+
+import json
+import os
+import time
+from contextvars import ContextVar
+
+_request_timings = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """Seconds spent in each named stage of one request, in first-seen order"""
+
+    __slots__ = ("start", "stages")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        """Server-Timing header value, durations in milliseconds"""
+        entries = [
+            f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()
+        ]
+        entries.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(entries)
+
+    def log_line(self, **fields):
+        """One JSON log line with fields, every stage and the total, in milliseconds"""
+        return json.dumps(
+            {
+                "event": "request_timing",
+                **fields,
+                "stages_ms": {
+                    name: round(seconds * 1000, 3)
+                    for name, seconds in self.stages.items()
+                },
+                "total_ms": round(self.elapsed() * 1000, 3),
+            }
+        )
+
+
+class _Stage:
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timings.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def timed(name):
+    """Context manager timing a stage of the current request (no-op when not timing)"""
+    timings = _request_timings.get()
+    if timings is None:
+        return _NO_STAGE
+    return _Stage(timings, name)
+
+
+def start_request_timing():
+    """Start timing the current request; returns its RequestTimings"""
+    timings = RequestTimings()
+    _request_timings.set(timings)
+    return timings
+
+
+def stop_request_timing():
+    _request_timings.set(None)
+
+
+def init_request_timing(app, enabled=None):
+    """
+    Time every request of a Flask app.
+
+    Args:
+        app: Flask app
+        enabled: Defaults to the REQUEST_TIMING environment variable being "1"
+    """
+    if enabled is None:
+        enabled = os.getenv("REQUEST_TIMING") == "1"
+    if not enabled:
+        return
+
+    from flask import request
+
+    @app.before_request
+    def _start_timing():
+        start_request_timing()
+
+    @app.after_request
+    def _send_timing(response):
+        timings = _request_timings.get()
+        if timings is None:
+            return response
+        response.headers["Server-Timing"] = timings.server_timing()
+
+        method, path, status = request.method, request.path, response.status_code
+
+        def log_timing():
+            print(
+                timings.log_line(method=method, path=path, status=status), flush=True
+            )
+            stop_request_timing()
+
+        response.call_on_close(log_timing)
+        return response